@@ -2,26 +2,61 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
-from app.config import Config
-import cloudinary
+from jinja2 import FileSystemBytecodeCache
+from app.config import Config, configure_database_options
+from app.database import RoutingSession
 import os
 
 # Khởi tạo extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 
 
-def create_app(config_class=Config):
-    """Factory function để tạo Flask app"""
+def create_app(config_class=Config, admin_mode=None):
+    """
+    Factory function để tạo Flask app
+    - admin_mode: 'eager' | 'lazy' | 'off' (mặc định lấy từ config ADMIN_MODE)
+    """
     app = Flask(__name__)
     app.config.from_object(config_class)
+    configure_database_options(app.config)
+    admin_mode = admin_mode or app.config.get('ADMIN_MODE', 'eager')
+
+    # Jinja2 bytecode cache - phải gán trước khi jinja_env được tạo
+    template_cache_dir = app.config.get('TEMPLATE_CACHE_DIR')
+    if template_cache_dir:
+        os.makedirs(template_cache_dir, exist_ok=True)
+        app.jinja_options = {**app.jinja_options,
+                             'bytecode_cache': FileSystemBytecodeCache(template_cache_dir)}
+
+    # IP / scheme thật khi chạy sau reverse proxy
+    if app.config.get('TRUSTED_PROXIES'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
 
     # Khởi tạo extensions với app
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
 
+    # Event cho engine (PRAGMA SQLite, ...)
+    from app.database import configure_engines
+    configure_engines(app)
+
+    # Đo thời gian SQL/template của từng request
+    from app.profiling import init_profiling
+    init_profiling(app)
+
+    # Metrics Prometheus (/metrics)
+    from app.metrics import init_metrics
+    init_metrics(app)
+
+    # Phục vụ file của storage local (STORAGE_LOCAL_URL)
+    from app.storage import init_storage
+    init_storage(app)
+
     # Cấu hình Flask-Login
     login_manager.login_view = 'admin.login'  # Redirect đến trang login nếu chưa đăng nhập
     login_manager.login_message = 'Vui lòng đăng nhập để truy cập trang này.'
@@ -30,23 +65,39 @@ def create_app(config_class=Config):
     # Import models (để Flask-Migrate nhận diện)
     from app import models
 
+    # Hook duy trì số file của album + cột tìm kiếm media + hàng đợi xóa ảnh
+    # (phải đăng ký cả khi chạy CLI/worker, không chỉ admin)
+    from app import albums, media_library, asset_cleanup
+
     # Đăng ký blueprints
     from app.main.routes import main_bp
-    from app.admin.routes import admin_bp
-
     app.register_blueprint(main_bp)
-    app.register_blueprint(admin_bp, url_prefix='/admin')
+
+    if admin_mode == 'eager':
+        from app.admin.routes import admin_bp
+        app.register_blueprint(admin_bp, url_prefix='/admin')
+    elif admin_mode == 'lazy':
+        # Admin chỉ được load khi có request /admin đầu tiên
+        from app.dispatch import LazyAdminDispatcher
+        app.wsgi_app = LazyAdminDispatcher(
+            app.wsgi_app,
+            lambda: create_app(config_class, admin_mode='eager')
+        )
 
     # Khởi tạo cấu hình
     config_class.init_app(app)
 
+    # Lệnh CLI (flask warm, ...)
+    from app.commands import register_commands
+    register_commands(app)
+
     # Context processor - biến toàn cục cho templates
     @app.context_processor
     def inject_globals():
-        from app.models import Category
+        from app.cache import get_active_categories
         return {
             'site_name': app.config['SITE_NAME'],
-            'all_categories': Category.query.filter_by(is_active=True).all()
+            'all_categories': get_active_categories()
         }
 
     # Custom Jinja2 filters
@@ -64,11 +115,16 @@ def create_app(config_class=Config):
             return ''
         return text.replace('\n', '<br>\n')
 
-    cloudinary.config(
-        cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-        api_key=os.getenv('CLOUDINARY_API_KEY'),
-        api_secret=os.getenv('CLOUDINARY_API_SECRET'),
-        secure=True
-    )
+    @app.template_filter('thumbnail')
+    def thumbnail_filter(filepath, size=None):
+        """Ảnh nhỏ cho lưới / danh sách: {{ media.filepath|thumbnail }}, {{ product.image|thumbnail(100) }}"""
+        from app.media_library import thumbnail_url
+        return thumbnail_url(filepath, size)
+
+    @app.template_filter('preview')
+    def preview_filter(filepath, width=800):
+        """Ảnh xem trước cỡ vừa (Cloudinary c_limit): {{ media.filepath|preview }}"""
+        from app.media_library import preview_url
+        return preview_url(filepath, width)
 
     return app
\ No newline at end of file
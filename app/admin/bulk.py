@@ -0,0 +1,236 @@
+"""
+Thao tác hàng loạt cho các trang danh sách trong admin (sản phẩm, blog, liên hệ, media)
+
+- Mỗi action chạy bằng 1 câu UPDATE/DELETE theo tập (WHERE id IN (...)),
+  riêng action dùng template (alt text) thì 1 lần bulk_update_mappings
+- Danh sách id được chia thành từng đoạn BULK_CHUNK_SIZE (giới hạn số tham số của SQLite)
+- Thêm action mới: viết handler(model, ids, params, chunk_size) -> số dòng bị ảnh hưởng
+  rồi khai báo trong BULK_ENTITIES
+"""
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from app import db, counters, albums, media_library, asset_cleanup
+from app.models import Product, Blog, Contact, Category, Media
+
+
+class BulkActionError(ValueError):
+    """Tham số action không hợp lệ (hiển thị thẳng cho người dùng)"""
+
+
+BulkAction = namedtuple('BulkAction', ['label', 'handler', 'admin_only', 'confirm'])
+
+
+def parse_ids(values):
+    """Chuyển list id dạng chuỗi thành list int (bỏ giá trị lỗi, bỏ trùng, giữ thứ tự)"""
+    ids = []
+    seen = set()
+    for value in values:
+        try:
+            item = int(value)
+        except (TypeError, ValueError):
+            continue
+        if item not in seen:
+            seen.add(item)
+            ids.append(item)
+    return ids
+
+
+def iter_chunks(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _touch(model, values):
+    """Cập nhật updated_at (UPDATE theo tập không chạy onupdate của từng object)"""
+    if hasattr(model, 'updated_at'):
+        values = {**values, model.updated_at: datetime.utcnow()}
+    return values
+
+
+# ==================== HANDLER CHUNG ====================
+def bulk_update(model, ids, values, chunk_size):
+    """UPDATE model SET values WHERE id IN (chunk)"""
+    values = _touch(model, values)
+    updated = 0
+    for chunk in iter_chunks(ids, chunk_size):
+        updated += model.query.filter(model.id.in_(chunk)).update(values, synchronize_session=False)
+    return updated
+
+
+def bulk_delete(model, ids, chunk_size):
+    """DELETE FROM model WHERE id IN (chunk)"""
+    deleted = 0
+    for chunk in iter_chunks(ids, chunk_size):
+        deleted += model.query.filter(model.id.in_(chunk)).delete(synchronize_session=False)
+    return deleted
+
+
+def bulk_apply_template(model, ids, column, render, fields, chunk_size, extra=None):
+    """
+    Ghi giá trị tính từ template cho từng dòng
+    - Đọc các cột cần cho template theo từng chunk (1 SELECT)
+    - Ghi lại bằng 1 lần bulk_update_mappings cho mỗi chunk
+    render(row, index) -> giá trị mới, index là vị trí (bắt đầu từ 1) trong danh sách đã chọn
+    """
+    positions = {item: index for index, item in enumerate(ids, start=1)}
+    columns = [model.id] + [getattr(model, name) for name in fields]
+    extra = dict(_touch(model, {}), **(extra or {}))
+    extra = {getattr(key, 'key', key): value for key, value in extra.items()}
+    updated = 0
+
+    for chunk in iter_chunks(ids, chunk_size):
+        rows = db.session.query(*columns).filter(model.id.in_(chunk)).all()
+        mappings = [{'id': row.id, column: render(row, positions[row.id]), **extra} for row in rows]
+        db.session.bulk_update_mappings(model, mappings)
+        updated += len(mappings)
+    return updated
+
+
+# ==================== CÁC ACTION ====================
+def _set(**values):
+    """Handler UPDATE các cột cố định (vd: is_active=True)"""
+    def handler(model, ids, params, chunk_size):
+        return bulk_update(model, ids, {getattr(model, key): value for key, value in values.items()}, chunk_size)
+    return handler
+
+
+def _delete(model, ids, params, chunk_size):
+    """Xóa theo tập, ảnh của các dòng bị xóa vào hàng đợi xóa khi commit"""
+    asset_cleanup.schedule_rows(model, ids, chunk_size)
+    return bulk_delete(model, ids, chunk_size)
+
+
+def _mark_contacts(is_read):
+    """
+    Đánh dấu đã đọc / chưa đọc: chỉ UPDATE các dòng thực sự đổi trạng thái,
+    số dòng đổi chính là lượng cần cộng/trừ vào counter liên hệ chưa đọc
+    """
+    def handler(model, ids, params, chunk_size):
+        changed = 0
+        for chunk in iter_chunks(ids, chunk_size):
+            changed += model.query.filter(model.id.in_(chunk), model.is_read.is_(not is_read)).update(
+                {model.is_read: is_read}, synchronize_session=False
+            )
+        counters.adjust(counters.CONTACTS_UNREAD, -changed if is_read else changed)
+        return changed
+    return handler
+
+
+def _delete_contacts(model, ids, params, chunk_size):
+    """Xóa liên hệ và trừ counter theo số liên hệ chưa đọc bị xóa"""
+    unread = 0
+    for chunk in iter_chunks(ids, chunk_size):
+        unread += model.query.filter(model.id.in_(chunk), model.is_read.is_(False)).count()
+    deleted = bulk_delete(model, ids, chunk_size)
+    counters.adjust(counters.CONTACTS_UNREAD, -unread)
+    return deleted
+
+
+def _move_category(model, ids, params, chunk_size):
+    category_id = params.get('category_id', type=int)
+    if not category_id or not db.session.get(Category, category_id):
+        raise BulkActionError('Vui lòng chọn danh mục hợp lệ')
+    return bulk_update(model, ids, {model.category_id: category_id}, chunk_size)
+
+
+def _set_album(model, ids, params, chunk_size):
+    """Chuyển album theo tập: UPDATE album_id + cộng/trừ media_count của album cũ/mới (app/albums.py)"""
+    album_name = params.get('album_name')
+    return sum(albums.move_media(chunk, album_name) for chunk in iter_chunks(ids, chunk_size))
+
+
+def _set_alt_text(model, ids, params, chunk_size):
+    """
+    Alt text theo template, placeholders: {filename}, {album}, {index}
+    VD: "Cát sấy {album} - ảnh {index}"
+    """
+    template = (params.get('alt_text_template') or '').strip()
+    if not template:
+        raise BulkActionError('Vui lòng nhập template Alt Text')
+
+    def render(row, index):
+        name = row.original_filename or row.filename or ''
+        alt_text = (template.replace('{filename}', name)
+                    .replace('{album}', row.album or '')
+                    .replace('{index}', str(index)))
+        return ' '.join(alt_text.split())[:255]
+
+    # seo_last_checked = None để điểm SEO được tính lại ở lần xem tiếp theo
+    updated = bulk_apply_template(model, ids, 'alt_text', render,
+                                  ['original_filename', 'filename', 'album'], chunk_size,
+                                  extra={'seo_last_checked': None})
+    # bulk_update_mappings không chạy mapper event -> cập nhật cột tìm kiếm
+    media_library.reindex_ids(ids, chunk_size)
+    return updated
+
+
+BULK_ENTITIES = {
+    'products': {
+        'model': Product,
+        'endpoint': 'admin.products',
+        'actions': {
+            'activate': BulkAction('Hiển thị', _set(is_active=True), False, None),
+            'deactivate': BulkAction('Ẩn', _set(is_active=False), False, None),
+            'move_category': BulkAction('Chuyển danh mục', _move_category, False, None),
+            'delete': BulkAction('Xóa', _delete, True, 'Xóa các sản phẩm đã chọn?'),
+        }
+    },
+    'blogs': {
+        'model': Blog,
+        'endpoint': 'admin.blogs',
+        'actions': {
+            'activate': BulkAction('Hiển thị', _set(is_active=True), False, None),
+            'deactivate': BulkAction('Ẩn', _set(is_active=False), False, None),
+            'delete': BulkAction('Xóa', _delete, False, 'Xóa các bài viết đã chọn?'),
+        }
+    },
+    'contacts': {
+        'model': Contact,
+        'endpoint': 'admin.contacts',
+        'actions': {
+            'mark_read': BulkAction('Đánh dấu đã đọc', _mark_contacts(True), True, None),
+            'mark_unread': BulkAction('Đánh dấu chưa đọc', _mark_contacts(False), True, None),
+            'delete': BulkAction('Xóa', _delete_contacts, True, 'Xóa các liên hệ đã chọn?'),
+        }
+    },
+    'media': {
+        'model': Media,
+        'endpoint': 'admin.media',
+        'actions': {
+            'set_alt_text': BulkAction('Đặt Alt Text theo template', _set_alt_text, False, None),
+            'set_album': BulkAction('Chuyển album', _set_album, False, None),
+        }
+    },
+}
+
+
+def get_actions(entity, user):
+    """Các action người dùng hiện tại được phép dùng (để hiển thị trên trang danh sách)"""
+    actions = BULK_ENTITIES[entity]['actions']
+    return [(key, action) for key, action in actions.items() if user.is_admin or not action.admin_only]
+
+
+def run_bulk_action(entity, action_key, ids, params, user):
+    """
+    Chạy 1 action và commit
+    Returns: số dòng bị ảnh hưởng
+    Raises: BulkActionError nếu entity/action/tham số không hợp lệ hoặc không đủ quyền
+    """
+    config = BULK_ENTITIES.get(entity)
+    action = config['actions'].get(action_key) if config else None
+    if action is None:
+        raise BulkActionError('Action không hợp lệ')
+    if action.admin_only and not user.is_admin:
+        raise BulkActionError('Bạn không có quyền thực hiện chức năng này!')
+    if not ids:
+        raise BulkActionError('Chưa chọn mục nào')
+
+    chunk_size = current_app.config.get('BULK_CHUNK_SIZE', 500)
+    try:
+        count = action.handler(config['model'], ids, params, chunk_size)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return count
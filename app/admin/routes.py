@@ -1,21 +1,37 @@
 import os
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify
+from flask import (Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify, abort,
+                   Response, stream_with_context)
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 from app import db
 from app.models import User, Product, Category, Banner, Blog, FAQ, Contact, Media
 from app.forms import (LoginForm, CategoryForm, ProductForm, BannerForm,
-                       BlogForm, FAQForm, UserForm)
-from app.utils import save_upload_file, delete_file, get_albums, optimize_image
+                       BlogForm, FAQForm, UserForm, BulkActionForm, ImportForm)
+from app.utils import save_upload_file, optimize_image
+from app.albums import get_albums
+from app import albums as album_store
+from app import media_library, asset_cleanup, chunked_uploads, direct_uploads
+from app.chunked_uploads import UploadError
+from app.storage import StorageError
 from app.decorators import admin_required
+from app.cache import invalidate_categories, get_active_categories, get_cache
+from app.admin.bulk import BULK_ENTITIES, BulkActionError, parse_ids, get_actions, run_bulk_action
+from app.database import stick_to_primary, enable_replica_reads
+from app.query_profiles import BLOG_ADMIN_ROW, PRODUCT_ADMIN_ROW, count_products_by_category
+from app.metrics import record_seo_rescore
+from app.contact_intake import flush_pending as flush_pending_contacts
+from app import counters
 import shutil
 import re
+import json
+import hashlib
 from html import unescape
-from app.seo_config import MEDIA_KEYWORDS, KEYWORD_SCORES
+from app.seo_config import MEDIA_KEYWORDS, KEYWORD_SCORES, MEDIA_KEYWORD_MATCHERS
 
 # ==================== Tính điểm SEO ảnh ====================
 def calculate_seo_score(media):
     """Tính SEO score - dùng config từ seo_config.py"""
+    record_seo_rescore('media')
     score = 0
     issues = []
     recommendations = []
@@ -38,10 +54,10 @@ def calculate_seo_score(media):
             checklist.append(('danger', f'✗ Alt Text chưa tối ưu'))
 
         # 1.2. Keywords (20 điểm) - ĐỌC TỪ CONFIG
-        has_primary = any(kw in alt_lower for kw in MEDIA_KEYWORDS['primary'])
-        has_secondary = any(kw in alt_lower for kw in MEDIA_KEYWORDS['secondary'])
-        has_brand = any(kw in alt_lower for kw in MEDIA_KEYWORDS['brand'])
-        has_general = any(kw in alt_lower for kw in MEDIA_KEYWORDS['general'])
+        has_primary = MEDIA_KEYWORD_MATCHERS['primary'].search(alt_lower) is not None
+        has_secondary = MEDIA_KEYWORD_MATCHERS['secondary'].search(alt_lower) is not None
+        has_brand = MEDIA_KEYWORD_MATCHERS['brand'].search(alt_lower) is not None
+        has_general = MEDIA_KEYWORD_MATCHERS['general'].search(alt_lower) is not None
 
         if has_primary:
             score += KEYWORD_SCORES['primary']
@@ -187,6 +203,7 @@ def calculate_blog_seo_score(blog):
     Tính toán điểm SEO cho blog post
     Returns: dict với score, grade, issues, recommendations, checklist
     """
+    record_seo_rescore('blog')
     score = 0
     issues = []
     recommendations = []
@@ -456,6 +473,22 @@ def calculate_blog_seo_score(blog):
 admin_bp = Blueprint('admin', __name__)
 
 
+@admin_bp.context_processor
+def inject_admin_counters():
+    """Số liên hệ chưa đọc cho badge ở sidebar (đọc counter duy trì sẵn, không COUNT bảng contacts)"""
+    if not current_user.is_authenticated:
+        return {}
+    return {'total_contacts': counters.get(counters.CONTACTS_UNREAD)}
+
+
+@admin_bp.after_request
+def stick_admin_to_primary(response):
+    """Sau khi admin lưu dữ liệu thành công, đọc từ primary để thấy ngay thay đổi"""
+    if db.session().wrote_primary and response.status_code < 400:
+        stick_to_primary()
+    return response
+
+
 # ==================== Render ảnh từ library ====================
 def get_image_from_form(form_image_field, field_name='image', folder='uploads'):
     """
@@ -553,7 +586,10 @@ def dashboard():
     total_products = Product.query.count()
     total_categories = Category.query.count()
     total_blogs = Blog.query.count()
-    total_contacts = Contact.query.filter_by(is_read=False).count()
+
+    # Ghi các liên hệ còn trong hàng đợi để số liệu và danh sách bên dưới đầy đủ
+    flush_pending_contacts()
+    total_contacts = counters.get(counters.CONTACTS_UNREAD)
 
     # Sản phẩm mới nhất
     recent_products = Product.query.order_by(Product.created_at.desc()).limit(5).all()
@@ -570,6 +606,23 @@ def dashboard():
                            recent_contacts=recent_contacts)
 
 
+# ==================== HIỆU NĂNG ====================
+@admin_bp.route('/perf')
+@admin_required
+def perf():
+    """Thống kê thời gian xử lý theo endpoint (p50/p95/p99, SQL, template, N+1)"""
+    from app.profiling import perf_stats
+
+    if request.args.get('reset'):
+        perf_stats.reset()
+        flash('Đã xóa số liệu hiệu năng!', 'success')
+        return redirect(url_for('admin.perf'))
+
+    return render_template('admin/perf.html',
+                           rows=perf_stats.summary(),
+                           enabled=current_app.config.get('PROFILING_ENABLED', True))
+
+
 # ==================== QUẢN LÝ DANH MỤC ====================
 @admin_bp.route('/categories')
 @admin_required
@@ -579,7 +632,8 @@ def categories():
     categories = Category.query.order_by(Category.created_at.desc()).paginate(
         page=page, per_page=20, error_out=False
     )
-    return render_template('admin/categories.html', categories=categories)
+    product_counts = count_products_by_category([cat.id for cat in categories.items])
+    return render_template('admin/categories.html', categories=categories, product_counts=product_counts)
 
 
 @admin_bp.route('/categories/add', methods=['GET', 'POST'])
@@ -605,6 +659,7 @@ def add_category():
 
         db.session.add(category)
         db.session.commit()
+        invalidate_categories()
 
         flash('Đã thêm danh mục thành công!', 'success')
         return redirect(url_for('admin.categories'))
@@ -632,6 +687,7 @@ def edit_category(id):
         category.is_active = form.is_active.data
 
         db.session.commit()
+        invalidate_categories()
 
         flash('Đã cập nhật danh mục thành công!', 'success')
         return redirect(url_for('admin.categories'))
@@ -652,6 +708,8 @@ def delete_category(id):
 
     db.session.delete(category)
     db.session.commit()
+    invalidate_categories()
+    asset_cleanup.maybe_flush()
 
     flash('Đã xóa danh mục thành công!', 'success')
     return redirect(url_for('admin.categories'))
@@ -663,10 +721,13 @@ def delete_category(id):
 def products():
     """Danh sách sản phẩm"""
     page = request.args.get('page', 1, type=int)
-    products = Product.query.order_by(Product.created_at.desc()).paginate(
+    products = Product.query.options(*PRODUCT_ADMIN_ROW).order_by(Product.created_at.desc()).paginate(
         page=page, per_page=20, error_out=False
     )
-    return render_template('admin/products.html', products=products)
+    return render_template('admin/products.html', products=products,
+                           bulk_form=BulkActionForm(),
+                           bulk_actions=get_actions('products', current_user),
+                           categories=get_active_categories())
 
 
 @admin_bp.route('/products/add', methods=['GET', 'POST'])
@@ -738,6 +799,7 @@ def delete_product(id):
     product = Product.query.get_or_404(id)
     db.session.delete(product)
     db.session.commit()
+    asset_cleanup.maybe_flush()
 
     flash('Đã xóa sản phẩm thành công!', 'success')
     return redirect(url_for('admin.products'))
@@ -819,6 +881,7 @@ def delete_banner(id):
     banner = Banner.query.get_or_404(id)
     db.session.delete(banner)
     db.session.commit()
+    asset_cleanup.maybe_flush()
 
     flash('Đã xóa banner thành công!', 'success')
     return redirect(url_for('admin.banners'))
@@ -830,10 +893,12 @@ def delete_banner(id):
 def blogs():
     """Danh sách blog"""
     page = request.args.get('page', 1, type=int)
-    blogs = Blog.query.order_by(Blog.created_at.desc()).paginate(
+    blogs = Blog.query.options(*BLOG_ADMIN_ROW).order_by(Blog.created_at.desc()).paginate(
         page=page, per_page=20, error_out=False
     )
-    return render_template('admin/blogs.html', blogs=blogs)
+    return render_template('admin/blogs.html', blogs=blogs,
+                           bulk_form=BulkActionForm(),
+                           bulk_actions=get_actions('blogs', current_user))
 
 
 @admin_bp.route('/blogs/add', methods=['GET', 'POST'])
@@ -954,6 +1019,7 @@ def delete_blog(id):
     blog = Blog.query.get_or_404(id)
     db.session.delete(blog)
     db.session.commit()
+    asset_cleanup.maybe_flush()
 
     flash('Đã xóa bài viết thành công!', 'success')
     return redirect(url_for('admin.blogs'))
@@ -1106,11 +1172,14 @@ def delete_user(id):
 @admin_required
 def contacts():
     """Danh sách liên hệ"""
+    flush_pending_contacts()
     page = request.args.get('page', 1, type=int)
     contacts = Contact.query.order_by(Contact.created_at.desc()).paginate(
         page=page, per_page=20, error_out=False
     )
-    return render_template('admin/contacts.html', contacts=contacts)
+    return render_template('admin/contacts.html', contacts=contacts,
+                           bulk_form=BulkActionForm(),
+                           bulk_actions=get_actions('contacts', current_user))
 
 
 @admin_bp.route('/contacts/view/<int:id>')
@@ -1121,6 +1190,8 @@ def view_contact(id):
 
     # Đánh dấu đã đọc
     if not contact.is_read:
+        if contact.is_read is False:
+            counters.adjust(counters.CONTACTS_UNREAD, -1)
         contact.is_read = True
         db.session.commit()
 
@@ -1132,6 +1203,8 @@ def view_contact(id):
 def delete_contact(id):
     """Xóa liên hệ"""
     contact = Contact.query.get_or_404(id)
+    if contact.is_read is False:
+        counters.adjust(counters.CONTACTS_UNREAD, -1)
     db.session.delete(contact)
     db.session.commit()
 
@@ -1139,72 +1212,202 @@ def delete_contact(id):
     return redirect(url_for('admin.contacts'))
 
 
-# ==================== QUẢN LÝ MEDIA LIBRARY ====================
-@admin_bp.route('/media')
+# ==================== THAO TÁC HÀNG LOẠT ====================
+@admin_bp.route('/bulk/<entity>', methods=['POST'])
 @login_required
-def media():
-    """Trang quản lý Media Library với SEO status"""
-    page = request.args.get('page', 1, type=int)
-    album_filter = request.args.get('album', '')
-    seo_filter = request.args.get('seo', '')  # Thêm filter theo SEO score
+def bulk_action(entity):
+    """Thao tác hàng loạt từ trang danh sách (sản phẩm, blog, liên hệ)"""
+    if entity not in BULK_ENTITIES:
+        abort(404)
+
+    # Quay lại đúng trang danh sách (giữ ?page=...), chỉ chấp nhận URL trong site
+    back_url = request.referrer
+    if not back_url or not back_url.startswith(request.host_url):
+        back_url = url_for(BULK_ENTITIES[entity]['endpoint'])
+
+    form = BulkActionForm()
+    if not form.validate_on_submit():
+        flash('Phiên làm việc đã hết hạn, vui lòng thử lại!', 'danger')
+        return redirect(back_url)
+
+    action = BULK_ENTITIES[entity]['actions'].get(form.action.data)
+    ids = parse_ids(request.form.getlist('ids'))
+    try:
+        count = run_bulk_action(entity, form.action.data, ids, request.form, current_user)
+    except BulkActionError as e:
+        flash(str(e), 'warning')
+        return redirect(back_url)
+
+    asset_cleanup.maybe_flush()
+    flash(f'✓ {action.label}: {count} mục', 'success')
+    return redirect(back_url)
+
+
+# ==================== NHẬP DỮ LIỆU ====================
+@admin_bp.route('/import', methods=['GET', 'POST'])
+@admin_required
+def import_data():
+    """Nhập sản phẩm / bài viết từ file CSV hoặc JSONL"""
+    from app.importer import detect_format, iter_records, import_records
+
+    form = ImportForm(kind=request.args.get('kind', 'products'))
+    report = None
+
+    if form.validate_on_submit():
+        upload = form.file.data
+        # File upload lớn được werkzeug lưu tạm ra đĩa, đọc stream từng dòng
+        report = import_records(
+            form.kind.data, iter_records(upload.stream, detect_format(upload.filename)),
+            batch_size=current_app.config.get('IMPORT_BATCH_SIZE', 2000),
+            dry_run=form.dry_run.data,
+            author=current_user.username
+        )
+        if report.failed:
+            flash(f'Có {report.failed} dòng lỗi, xem chi tiết bên dưới.', 'warning')
+        else:
+            flash(f'✓ Đã xử lý {report.processed} dòng trong {report.seconds:.2f}s', 'success')
+
+    return render_template('admin/import.html', form=form, report=report)
+
+
+# ==================== XUẤT DỮ LIỆU ====================
+@admin_bp.route('/export/<kind>')
+@login_required
+def export_data(kind):
+    """
+    Xuất liên hệ / sản phẩm / media (kèm điểm SEO hiện tại) ra CSV, JSONL hoặc XLSX
+    Response dạng stream: đọc DB theo từng nhóm và gửi dần, không giữ cả file trong bộ nhớ
+    """
+    from app.exporter import EXPORT_KINDS, EXPORT_FORMATS, build_export
+
+    fmt = request.args.get('format', 'csv')
+    if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    # Liên hệ chứa thông tin khách hàng: chỉ admin (giống trang danh sách liên hệ)
+    if kind == 'contacts' and not current_user.is_admin:
+        abort(403)
+
+    filters = {
+        'unread': request.args.get('unread', type=int),
+        'category_id': request.args.get('category_id', type=int),
+        'album': request.args.get('album', ''),
+    }
+    extra_columns = None
+    if kind == 'media':
+        def seo_audit(row):
+            seo = calculate_seo_score(row)
+            return [seo['score'], seo['grade'], '; '.join(seo['issues'])]
+        extra_columns = (['current_seo_score', 'current_seo_grade', 'seo_issues'], seo_audit)
+
+    chunks, mimetype, filename = build_export(
+        kind, fmt, filters,
+        yield_per=current_app.config.get('EXPORT_YIELD_PER', 1000),
+        extra_columns=extra_columns
+    )
+    # Chỉ đọc -> dùng replica nếu có; generator cần giữ request context tới khi gửi xong
+    enable_replica_reads()
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+# ==================== QUẢN LÝ MEDIA LIBRARY ====================
+# Nhóm điểm SEO dùng cho thống kê + bộ lọc của trang media
+SEO_LEVELS = {
+    'excellent': lambda score: score >= 85,
+    'good': lambda score: 65 <= score < 85,
+    'fair': lambda score: 50 <= score < 65,
+    'poor': lambda score: score < 50,
+}
+
+
+def seo_level(score):
+    return next(level for level, matches in SEO_LEVELS.items() if matches(score))
 
-    # Query media
-    query = Media.query
-    if album_filter:
-        query = query.filter_by(album=album_filter)
 
-    media_files = query.order_by(Media.created_at.desc()).paginate(
-        page=page, per_page=24, error_out=False
+def media_seo_stats():
+    """
+    Số ảnh theo nhóm điểm SEO: 1 lần quét chỉ các cột tính điểm, mỗi ảnh tính điểm 1 lần
+    Cache MEDIA_SEO_STATS_TTL giây (quét cả bảng tốn vài giây với ~100k ảnh)
+    """
+    def load():
+        stats = dict.fromkeys(SEO_LEVELS, 0)
+        for row in db.session.query(*media_library.GRID_COLUMNS).execution_options(yield_per=2000):
+            stats[seo_level(calculate_seo_score(row)['score'])] += 1
+        return stats
+
+    return get_cache('media_seo_stats').get_or_load(
+        'all', load, ttl=current_app.config.get('MEDIA_SEO_STATS_TTL', 300)
     )
 
-    # Tính SEO score cho từng media item
-    media_with_seo = []
-    for m in media_files.items:
-        seo_result = calculate_seo_score(m)
-        media_with_seo.append({
-            'media': m,
-            'seo': seo_result
-        })
-
-    # Filter theo SEO nếu có
-    if seo_filter:
-        if seo_filter == 'excellent':  # >= 85
-            media_with_seo = [m for m in media_with_seo if m['seo']['score'] >= 85]
-        elif seo_filter == 'good':  # 65-84
-            media_with_seo = [m for m in media_with_seo if 65 <= m['seo']['score'] < 85]
-        elif seo_filter == 'fair':  # 50-64
-            media_with_seo = [m for m in media_with_seo if 50 <= m['seo']['score'] < 65]
-        elif seo_filter == 'poor':  # < 50
-            media_with_seo = [m for m in media_with_seo if m['seo']['score'] < 50]
+
+def invalidate_media_seo_stats():
+    """Gọi sau khi thêm/sửa/xóa media (worker khác tự làm mới sau TTL)"""
+    get_cache('media_seo_stats').invalidate()
+
+
+@admin_bp.route('/media')
+@login_required
+def media():
+    """
+    Trang quản lý Media Library với SEO status
+    Lưới ảnh (/admin/api/media/grid) và thống kê SEO (/admin/api/media/seo-stats) do trình duyệt tải sau
+    """
+    album_filter = request.args.get('album', '')
+    seo_filter = request.args.get('seo', '')
+    if seo_filter not in SEO_LEVELS:
+        seo_filter = ''
 
     # Lấy danh sách albums
     albums = get_albums()
 
     # Thống kê
-    total_files = Media.query.count()
-    total_size = db.session.query(db.func.sum(Media.file_size)).scalar() or 0
+    total_files, total_size = db.session.query(
+        db.func.count(Media.id), db.func.coalesce(db.func.sum(Media.file_size), 0)
+    ).one()
     total_size_mb = round(total_size / (1024 * 1024), 2)
 
-    # Thống kê SEO
-    all_media = Media.query.all()
-    seo_stats = {
-        'excellent': sum(1 for m in all_media if calculate_seo_score(m)['score'] >= 85),
-        'good': sum(1 for m in all_media if 65 <= calculate_seo_score(m)['score'] < 85),
-        'fair': sum(1 for m in all_media if 50 <= calculate_seo_score(m)['score'] < 65),
-        'poor': sum(1 for m in all_media if calculate_seo_score(m)['score'] < 50),
-    }
-
     return render_template(
         'admin/media.html',
-        media_files=media_files,
-        media_with_seo=media_with_seo,
         albums=albums,
         total_files=total_files,
         total_size_mb=total_size_mb,
         current_album=album_filter,
-        seo_stats=seo_stats,
-        current_seo_filter=seo_filter
+        current_seo_filter=seo_filter,
+        grid_page_size=current_app.config.get('MEDIA_GRID_PAGE_SIZE', 120),
+    )
+
+
+def upload_alt_text(filename, default_alt_text=None, auto_alt_text=False):
+    """Alt text cho file upload: alt chung nếu có, không thì tạo từ tên file (nếu bật tự động)"""
+    if default_alt_text:
+        return default_alt_text
+    if auto_alt_text:
+        # Tự động tạo alt text từ tên file
+        name_without_ext = os.path.splitext(filename)[0]
+        return name_without_ext.replace('-', ' ').replace('_', ' ').title()
+    return None
+
+
+def add_uploaded_media(file_info, album, alt_text):
+    """Thêm Media cho file vừa lưu (save_upload_file) với đầy đủ thông tin SEO, chưa commit"""
+    media = Media(
+        filename=file_info['filename'],
+        original_filename=file_info['original_filename'],
+        filepath=file_info['filepath'],
+        file_type=file_info['file_type'],
+        file_size=file_info['file_size'],
+        width=file_info['width'],
+        height=file_info['height'],
+        album=album if album else None,
+        alt_text=alt_text,
+        title=alt_text,  # Auto-set title = alt_text
+        uploaded_by=current_user.id
     )
+    db.session.add(media)
+    return media
 
 
 @admin_bp.route('/media/upload', methods=['GET', 'POST'])
@@ -1228,16 +1431,7 @@ def upload_media():
         for file in files:
             if file and file.filename:
                 try:
-                    # Generate alt text cho file này
-                    if default_alt_text:
-                        file_alt_text = default_alt_text
-                    elif auto_alt_text:
-                        # Tự động tạo alt text từ tên file
-                        from app.utils import slugify
-                        name_without_ext = os.path.splitext(file.filename)[0]
-                        file_alt_text = name_without_ext.replace('-', ' ').replace('_', ' ').title()
-                    else:
-                        file_alt_text = None
+                    file_alt_text = upload_alt_text(file.filename, default_alt_text, auto_alt_text)
 
                     # Lưu file với SEO optimization
                     filepath, file_info = save_upload_file(
@@ -1249,21 +1443,7 @@ def upload_media():
                     )
 
                     if filepath:
-                        # Lưu vào database với đầy đủ thông tin SEO
-                        media = Media(
-                            filename=file_info['filename'],
-                            original_filename=file_info['original_filename'],
-                            filepath=file_info['filepath'],
-                            file_type=file_info['file_type'],
-                            file_size=file_info['file_size'],
-                            width=file_info['width'],
-                            height=file_info['height'],
-                            album=album if album else None,
-                            alt_text=file_alt_text,
-                            title=file_alt_text,  # Auto-set title = alt_text
-                            uploaded_by=current_user.id
-                        )
-                        db.session.add(media)
+                        add_uploaded_media(file_info, album, file_alt_text)
                         uploaded_count += 1
                     else:
                         errors.append(f"Không thể upload {file.filename}")
@@ -1274,6 +1454,7 @@ def upload_media():
         # Commit tất cả media đã upload
         if uploaded_count > 0:
             db.session.commit()
+            invalidate_media_seo_stats()
             flash(f'Đã upload thành công {uploaded_count} file!', 'success')
 
         if errors:
@@ -1284,73 +1465,83 @@ def upload_media():
 
     # GET request
     albums = get_albums()
-    return render_template('admin/upload_media.html', albums=albums)
+    return render_template(
+        'admin/upload_media.html',
+        albums=albums,
+        chunk_size=current_app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
+        max_upload_mb=current_app.config.get('UPLOAD_MAX_SIZE', 200 * 1024 * 1024) // (1024 * 1024),
+        direct_uploads=direct_uploads.is_enabled(),
+        direct_max_size=current_app.config.get('DIRECT_UPLOAD_MAX_SIZE', 10 * 1024 * 1024),
+    )
 
 
 @admin_bp.route('/media/create-album', methods=['POST'])
 @login_required
 def create_album():
     """Tạo album mới"""
-    album_name = request.form.get('album_name', '').strip()
+    album_name = album_store.normalize_name(request.form.get('album_name'))
 
     if not album_name:
         flash('Vui lòng nhập tên album!', 'warning')
         return redirect(url_for('admin.media'))
 
-    album_path = os.path.join(
-        current_app.config['UPLOAD_FOLDER'],
-        'albums',
-        secure_filename(album_name)
-    )
-
+    # Album là 1 dòng trong bảng albums (file nằm trên Cloudinary, không cần thư mục local)
     try:
-        os.makedirs(album_path, exist_ok=True)
+        album_store.get_or_create(album_name)
+        db.session.commit()
         flash(f'Đã tạo album "{album_name}" thành công!', 'success')
     except Exception as e:
+        db.session.rollback()
         flash(f'Lỗi tạo album: {str(e)}', 'danger')
 
-    return redirect(url_for('admin.media'))
+    return redirect(url_for('admin.media', album=album_name))
 
 
-@admin_bp.route('/media/delete/<int:id>')
+@admin_bp.route('/media/rename-album', methods=['POST'])
 @login_required
-def delete_media(id):
-    """Xóa media file (Cloudinary + local + DB)"""
-    media = Media.query.get_or_404(id)
-    album_name = media.album
+def rename_album():
+    """Đổi tên album (trùng tên album khác -> gộp vào album đó)"""
+    album = album_store.find(request.form.get('album_name'))
+    new_name = album_store.normalize_name(request.form.get('new_name'))
 
-    from app.utils import delete_file
-    import os
+    if album is None:
+        flash('Không tìm thấy album!', 'danger')
+        return redirect(url_for('admin.media'))
+    if not new_name:
+        flash('Vui lòng nhập tên album mới!', 'warning')
+        return redirect(url_for('admin.media', album=album.name))
 
+    old_name = album.name
+    merged = album_store.find(new_name) is not None and new_name != old_name
     try:
-        # 🧹 1️⃣ Xóa ảnh trên Cloudinary nếu là URL
-        if media.filepath and "res.cloudinary.com" in media.filepath:
-            res = delete_file(media.filepath)
-            print(f"[Delete Cloudinary]: {res}")
+        target = album_store.rename(album, new_name)
+        db.session.commit()
+        if merged:
+            flash(f'Đã gộp album "{old_name}" vào "{target.name}"!', 'success')
         else:
-            print("[Delete Cloudinary]: Bỏ qua (không phải URL Cloudinary)")
-
-        # 🧹 2️⃣ Xóa file local nếu có
-        if media.filepath and media.filepath.startswith('/static/'):
-            file_path = media.filepath.replace('/static/', '')
-            full_path = os.path.join(current_app.config['UPLOAD_FOLDER'], '..', file_path)
-            abs_path = os.path.abspath(full_path)
+            flash(f'Đã đổi tên album "{old_name}" thành "{target.name}"!', 'success')
+        return redirect(url_for('admin.media', album=target.name))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Lỗi đổi tên album: {str(e)}', 'danger')
+        return redirect(url_for('admin.media', album=old_name))
 
-            if os.path.exists(abs_path):
-                os.remove(abs_path)
-                print(f"[Delete Local]: Đã xóa {abs_path}")
-            else:
-                print(f"[Delete Local]: Không tìm thấy {abs_path}")
 
-    except Exception as e:
-        print(f"[Delete Error]: {e}")
+@admin_bp.route('/media/delete/<int:id>')
+@login_required
+def delete_media(id):
+    """Xóa media (DB ngay, file Cloudinary / local xóa sau theo lô)"""
+    media = Media.query.get_or_404(id)
+    album_name = media.album
 
-    # 🧹 3️⃣ Xóa record khỏi DB
+    # Xóa record khỏi DB, file trên Cloudinary / local vào hàng đợi xóa theo lô (app/asset_cleanup.py)
     db.session.delete(media)
     db.session.commit()
+    invalidate_media_seo_stats()
+    asset_cleanup.maybe_flush()
     flash('Đã xóa ảnh thành công!', 'success')
 
-    # 🧭 4️⃣ Redirect lại đúng album
+    # Redirect lại đúng album
     if album_name:
         return redirect(url_for('admin.media', album=album_name))
     return redirect(url_for('admin.media'))
@@ -1361,14 +1552,20 @@ def delete_media(id):
 @login_required
 def delete_album(album_name):
     """Xóa album (chỉ khi rỗng)"""
+    album = album_store.find(album_name)
+    if album is None:
+        flash('Không tìm thấy album!', 'danger')
+        return redirect(url_for('admin.media'))
+
     # Kiểm tra còn file nào trong album không
-    remaining_files = Media.query.filter_by(album=album_name).count()
+    remaining_files = album_store.delete(album)
 
     if remaining_files > 0:
         flash(f'Không thể xóa album có {remaining_files} file! Vui lòng xóa hết file trước.', 'danger')
         return redirect(url_for('admin.media'))
+    db.session.commit()
 
-    # Xóa thư mục vật lý nếu tồn tại
+    # Xóa thư mục cũ nếu còn (album tạo trước đây chỉ là thư mục local)
     album_path = os.path.join(
         current_app.config['UPLOAD_FOLDER'],
         'albums',
@@ -1421,6 +1618,7 @@ def edit_media(id):
 
         try:
             db.session.commit()
+            invalidate_media_seo_stats()
 
             # Tính toán và hiển thị điểm SEO sau khi lưu
             seo_result = calculate_seo_score(media)
@@ -1450,41 +1648,23 @@ def edit_media(id):
 @login_required
 def bulk_edit_media():
     """Bulk edit SEO cho nhiều media"""
-    media_ids = request.form.getlist('media_ids[]')
+    media_ids = parse_ids(request.form.getlist('media_ids[]'))
     action = request.form.get('action')
 
     if not media_ids:
         return jsonify({'success': False, 'message': 'Chưa chọn file nào'})
 
-    if action == 'set_alt_text':
-        alt_text_template = request.form.get('alt_text_template', '')
-        updated = 0
-
-        for media_id in media_ids:
-            media = Media.query.get(media_id)
-            if media:
-                # Generate alt text từ template
-                # Template có thể có placeholders: {filename}, {album}, {index}
-                alt_text = alt_text_template.replace('{filename}', media.original_filename)
-                if media.album:
-                    alt_text = alt_text.replace('{album}', media.album)
-
-                media.alt_text = alt_text
-                updated += 1
-
-        db.session.commit()
-        return jsonify({'success': True, 'message': f'Đã cập nhật {updated} file'})
+    # Template alt text có thể có placeholders: {filename}, {album}, {index}
+    try:
+        updated = run_bulk_action('media', action, media_ids, request.form, current_user)
+    except BulkActionError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    invalidate_media_seo_stats()
 
-    elif action == 'set_album':
+    if action == 'set_album':
         album_name = request.form.get('album_name', '')
-        updated = Media.query.filter(Media.id.in_(media_ids)).update(
-            {Media.album: album_name},
-            synchronize_session=False
-        )
-        db.session.commit()
         return jsonify({'success': True, 'message': f'Đã chuyển {updated} file vào album "{album_name}"'})
-
-    return jsonify({'success': False, 'message': 'Action không hợp lệ'})
+    return jsonify({'success': True, 'message': f'Đã cập nhật {updated} file'})
 
 
 @admin_bp.route('/media/check-seo/<int:id>')
@@ -1497,61 +1677,248 @@ def check_media_seo(id):
 
 
 # ==================== API CHO MEDIA PICKER ====================
+def json_with_etag(payload, max_age=0):
+    """
+    JSON kèm ETag (hash nội dung): trình duyệt gửi lại If-None-Match -> 304 không body
+    max_age = 0: lần nào cũng hỏi lại server (vẫn tiết kiệm băng thông + thời gian render)
+    """
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest())
+    response.headers['Cache-Control'] = f'private, max-age={max_age}, must-revalidate'
+    return response.make_conditional(request)
+
+
 @admin_bp.route('/api/media')
 @login_required
 def api_media():
-    """API trả về danh sách media với đường dẫn chuẩn hóa"""
-    album = request.args.get('album', '')
-    search = request.args.get('search', '')
+    """
+    Media cho picker / lưới media, mới nhất trước, phân trang bằng cursor
+    Query: album, search (alt/title/caption/tên file), cursor (next_cursor của trang trước), limit
+    """
+    default_limit = current_app.config.get('MEDIA_API_PAGE_SIZE', 60)
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), 200))
+    rows, next_cursor = media_library.page(
+        album=request.args.get('album', ''),
+        search=request.args.get('search', '').strip(),
+        cursor=request.args.get('cursor', type=int),
+        limit=limit,
+    )
+    return json_with_etag({
+        'media': [media_library.serialize(row) for row in rows],
+        'next_cursor': next_cursor,
+    })
 
-    query = Media.query
-    if album:
-        query = query.filter_by(album=album)
-    if search:
-        query = query.filter(Media.original_filename.ilike(f'%{search}%'))
 
-    media_list = query.order_by(Media.created_at.desc()).limit(100).all()
+@admin_bp.route('/api/media/grid')
+@login_required
+def api_media_grid():
+    """
+    Dữ liệu lưới media admin: như /api/media + điểm SEO, cờ title/caption, dung lượng
+    Query: album, seo (excellent/good/fair/poor), cursor, limit (mặc định MEDIA_GRID_PAGE_SIZE)
+    """
+    default_limit = current_app.config.get('MEDIA_GRID_PAGE_SIZE', 120)
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), 500))
+    matches = SEO_LEVELS.get(request.args.get('seo', ''))
+
+    scores = {}
+
+    def score(row):
+        if row.id not in scores:
+            scores[row.id] = calculate_seo_score(row)
+        return scores[row.id]
+
+    rows, next_cursor = media_library.page(
+        album=request.args.get('album', ''),
+        cursor=request.args.get('cursor', type=int),
+        limit=limit,
+        columns=media_library.GRID_COLUMNS,
+        keep=(lambda row: matches(score(row)['score'])) if matches else None,
+    )
 
-    # Lấy danh sách albums
-    albums_data = get_albums()
-    album_names = [a['name'] if isinstance(a, dict) else a for a in albums_data]
-
-    # ✅ CRITICAL FIX: Chuẩn hóa filepath
-    def normalize_filepath(media):
-        """Chuẩn hóa filepath để đảm bảo có thể hiển thị được"""
-        filepath = media.filepath
-
-        if not filepath:
-            return ''
-
-        # ✅ KIỂM TRA CLOUDINARY TRƯỚC - Giữ nguyên 100%
-        if filepath.startswith('http://') or filepath.startswith('https://'):
-            return filepath
-
-        # ✅ Nếu là local path, chuẩn hóa
-        # Đảm bảo có / ở đầu
-        if not filepath.startswith('/'):
-            filepath = '/' + filepath
-
-        # Đảm bảo có /static/
-        if not filepath.startswith('/static/'):
-            if filepath.startswith('/uploads/'):
-                filepath = '/static' + filepath
-            else:
-                # uploads/... → /static/uploads/...
-                filepath = '/static/' + filepath.lstrip('/')
-
-        return filepath
-
-    return jsonify({
-        'media': [{
-            'id': m.id,
-            'filename': m.filename,
-            'original_filename': m.original_filename,
-            'filepath': normalize_filepath(m),  # ← DÙNG HÀM CHUẨN HÓA
-            'width': m.width or 0,
-            'height': m.height or 0,
-            'album': m.album or ''
-        } for m in media_list],
-        'albums': album_names
+    items = []
+    for row in rows:
+        seo = score(row)
+        items.append(dict(
+            media_library.serialize(row),
+            has_title=bool(row.title),
+            has_caption=bool(row.caption),
+            size_mb=round((row.file_size or 0) / (1024 * 1024), 2),
+            seo={'score': seo['score'], 'grade': seo['grade'], 'grade_class': seo['grade_class']},
+        ))
+    return json_with_etag({'media': items, 'next_cursor': next_cursor})
+
+
+@admin_bp.route('/api/media/seo-stats')
+@login_required
+def api_media_seo_stats():
+    """Số ảnh theo nhóm điểm SEO cho trang media (tách khỏi trang để trang hiện ngay)"""
+    return json_with_etag(media_seo_stats())
+
+
+@admin_bp.route('/api/media/albums')
+@login_required
+def api_media_albums():
+    """Danh sách album + số file (tách khỏi /api/media để picker cache riêng)"""
+    return json_with_etag({'albums': get_albums()},
+                          max_age=current_app.config.get('MEDIA_ALBUMS_MAX_AGE', 60))
+
+
+# ==================== UPLOAD THEO ĐOẠN (app/chunked_uploads.py) ====================
+def _upload_error(error):
+    response = jsonify({'success': False, 'message': str(error)})
+    response.status_code = error.status
+    if error.offset is not None:
+        response.headers['Upload-Offset'] = str(error.offset)
+    return response
+
+
+@admin_bp.route('/api/uploads', methods=['POST'])
+@login_required
+def api_upload_create():
+    """
+    Tạo upload theo đoạn
+    JSON: filename, size (byte), folder, album, default_alt_text, auto_alt_text, sha256 (tùy chọn, kiểm tra khi xong)
+    """
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename') or ''
+    album = (data.get('album') or '').strip() or None
+    try:
+        upload = chunked_uploads.create(
+            filename,
+            data.get('size'),
+            current_user.id,
+            folder=data.get('folder') or 'general',
+            album=album,
+            alt_text=upload_alt_text(filename, (data.get('default_alt_text') or '').strip(),
+                                     bool(data.get('auto_alt_text'))),
+            sha256=data.get('sha256'),
+        )
+    except UploadError as e:
+        return _upload_error(e)
+
+    url = url_for('admin.api_upload', upload_id=upload['id'])
+    response = jsonify({
+        'id': upload['id'],
+        'url': url,
+        'offset': 0,
+        'chunk_size': current_app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
     })
+    response.status_code = 201
+    response.headers['Location'] = url
+    response.headers['Upload-Offset'] = '0'
+    return response
+
+
+@admin_bp.route('/api/uploads/<upload_id>', methods=['GET', 'HEAD', 'PATCH', 'DELETE'])
+@login_required
+def api_upload(upload_id):
+    """
+    GET / HEAD: số byte đã nhận (header Upload-Offset) để tiếp tục sau khi rớt mạng
+    PATCH: gửi đoạn tiếp theo (header Upload-Offset, body nhị phân), đoạn cuối -> tạo Media
+    DELETE: hủy upload
+    """
+    try:
+        upload = chunked_uploads.get(upload_id, current_user.id)
+        if request.method == 'DELETE':
+            chunked_uploads.cancel(upload_id, current_user.id)
+            return '', 204
+        if request.method == 'PATCH':
+            offset, saved = chunked_uploads.receive(
+                upload, request.headers.get('Upload-Offset', type=int), request.stream, request.content_length
+            )
+        else:
+            offset, saved = upload['offset'], None
+    except UploadError as e:
+        return _upload_error(e)
+
+    if saved is not None:
+        url, file_info = saved
+        media = add_uploaded_media(file_info, upload['album'], upload['alt_text'])
+        db.session.commit()
+        invalidate_media_seo_stats()
+        response = jsonify({'success': True, 'offset': offset, 'media': {
+            'id': media.id,
+            'filepath': media_library.media_url(media.filepath),
+            'thumbnail': media_library.thumbnail_url(media.filepath),
+        }})
+        response.status_code = 201
+    elif request.method == 'PATCH':
+        response = current_app.response_class(status=204)
+    else:
+        response = jsonify({'id': upload['id'], 'filename': upload['filename'],
+                            'offset': offset, 'size': upload['size']})
+    response.headers['Upload-Offset'] = str(offset)
+    response.headers['Upload-Length'] = str(upload['size'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+# ==================== UPLOAD THẲNG TỪ TRÌNH DUYỆT (app/direct_uploads.py) ====================
+def _direct_upload_error(error):
+    from app.cloudinary_client import CloudinaryUnavailable
+
+    response = jsonify({'success': False, 'message': str(error)})
+    # Cloudinary tạm lỗi lúc kiểm tra kết quả -> 503, trình duyệt gửi lại (ảnh đã nằm trên Cloudinary)
+    response.status_code = 503 if isinstance(error, CloudinaryUnavailable) else 400
+    return response
+
+
+@admin_bp.route('/api/direct-uploads/sign', methods=['POST'])
+@login_required
+def api_direct_upload_sign():
+    """
+    Tham số đã ký để trình duyệt upload 1 file thẳng lên storage
+    JSON: filename, size (byte), folder, album, default_alt_text, auto_alt_text
+    """
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename') or ''
+    try:
+        upload = direct_uploads.sign(
+            filename,
+            data.get('size'),
+            current_user.id,
+            folder=data.get('folder') or 'general',
+            album=(data.get('album') or '').strip() or None,
+            alt_text=upload_alt_text(filename, (data.get('default_alt_text') or '').strip(),
+                                     bool(data.get('auto_alt_text'))),
+        )
+    except StorageError as e:
+        return _direct_upload_error(e)
+
+    response = jsonify(dict(upload, success=True))
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@admin_bp.route('/api/direct-uploads/complete', methods=['POST'])
+@login_required
+def api_direct_upload_complete():
+    """
+    Trình duyệt đã upload xong: JSON {token (từ /sign), result (JSON storage trả về)} -> tạo Media
+    Gửi lại cùng token + kết quả (retry khi rớt mạng) trả về Media đã tạo, không tạo trùng
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        file_info, album, alt_text = direct_uploads.complete(data.get('token'), data.get('result'), current_user.id)
+    except StorageError as e:
+        return _direct_upload_error(e)
+
+    # Chỉ coi là retry khi cùng file, cùng tên file SEO trong token và cùng người upload:
+    # storage local lưu theo nội dung nên ảnh giống nhau của lần upload khác cũng có cùng filepath
+    media = Media.query.filter_by(
+        filepath=file_info['filepath'], filename=file_info['filename'], uploaded_by=current_user.id
+    ).first()
+    status = 200
+    if media is None:
+        media = add_uploaded_media(file_info, album, alt_text)
+        db.session.commit()
+        invalidate_media_seo_stats()
+        status = 201
+    response = jsonify({'success': True, 'media': {
+        'id': media.id,
+        'filepath': media_library.media_url(media.filepath),
+        'thumbnail': media_library.thumbnail_url(media.filepath),
+    }})
+    response.status_code = status
+    return response
@@ -0,0 +1,222 @@
+"""
+Album của Media Library (bảng albums) với số file duy trì sẵn
+
+- Album.media_count được cộng/trừ cùng transaction với thay đổi của Media:
+  - thêm / xóa / đổi album qua ORM (db.session.add, db.session.delete, media.album = 'Tên'):
+    hook before_flush tự gán album_id theo tên (tạo album nếu chưa có) và cộng/trừ counter
+  - thao tác theo tập (chuyển album hàng loạt, đổi tên, gộp): move_media / rename / merge,
+    mỗi thao tác là vài câu UPDATE, không load từng Media
+- get_albums(): 1 câu SELECT trên bảng albums (không GROUP BY media, không listdir)
+- Dữ liệu cũ (chỉ có Media.album dạng chuỗi + thư mục rỗng) hoặc số bị lệch:
+  flask --app run albums backfill
+"""
+import os
+from collections import defaultdict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, func, inspect
+from app import db
+from app.database import RoutingSession
+from app.models import Album, Media
+
+
+def normalize_name(name):
+    """Tên album chuẩn hóa (gộp khoảng trắng, tối đa 100 ký tự), rỗng -> None"""
+    name = ' '.join((name or '').split())[:100]
+    return name or None
+
+
+# ==================== ĐỌC ====================
+def get_albums():
+    """Danh sách album kèm số file: [{'id', 'name', 'count'}] theo tên"""
+    rows = db.session.query(Album.id, Album.name, Album.media_count).order_by(Album.name)
+    return [{'id': album_id, 'name': name, 'count': count} for album_id, name, count in rows]
+
+
+def find(name):
+    """Album theo tên (None nếu không có)"""
+    name = normalize_name(name)
+    return Album.query.filter_by(name=name).first() if name else None
+
+
+def filter_by_album(query, name):
+    """Lọc query Media theo tên album (so khớp trên album_id có index, không so chuỗi trên bảng media)"""
+    album_id = db.select(Album.id).where(Album.name == normalize_name(name)).scalar_subquery()
+    return query.filter(Media.album_id == album_id)
+
+
+# ==================== GHI ====================
+def get_or_create(name):
+    """id của album theo tên, tạo mới nếu chưa có (không commit). Tên rỗng -> None"""
+    name = normalize_name(name)
+    if not name:
+        return None
+    album_id = db.session.query(Album.id).filter_by(name=name).scalar()
+    if album_id is None:
+        result = db.session.execute(db.insert(Album).values(
+            name=name, media_count=0, created_at=datetime.utcnow()
+        ))
+        album_id = result.inserted_primary_key[0]
+    return album_id
+
+
+def adjust_counts(deltas):
+    """Cộng/trừ media_count: deltas = {album_id: số file thêm (âm: bớt)}, không commit"""
+    for album_id, delta in deltas.items():
+        if album_id is not None and delta:
+            db.session.query(Album).filter_by(id=album_id).update(
+                {Album.media_count: Album.media_count + delta}, synchronize_session=False
+            )
+
+
+def move_media(ids, name):
+    """
+    Chuyển các media (theo id) sang album `name` (rỗng: bỏ khỏi album) theo tập, không commit
+    Returns: số file thực sự đổi album
+    """
+    album_id = get_or_create(name)
+    changed = Media.query.filter(Media.id.in_(ids), Media.album_id.is_distinct_from(album_id))
+
+    # Số file rời khỏi từng album cũ (1 câu GROUP BY)
+    deltas = defaultdict(int)
+    for old_id, count in changed.with_entities(Media.album_id, func.count(Media.id)).group_by(Media.album_id):
+        deltas[old_id] -= count
+
+    moved = changed.update({
+        Media.album_id: album_id,
+        Media.album: normalize_name(name),
+        Media.updated_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    deltas[album_id] += moved
+    adjust_counts(deltas)
+    return moved
+
+
+def rename(album, new_name):
+    """
+    Đổi tên album (cập nhật bản sao tên trên media bằng 1 câu UPDATE), không commit
+    Tên mới trùng album khác -> gộp vào album đó
+    Returns: album sau khi đổi tên / album đích
+    """
+    new_name = normalize_name(new_name)
+    if not new_name or new_name == album.name:
+        return album
+    target = Album.query.filter_by(name=new_name).first()
+    if target is not None:
+        return merge(album, target)
+
+    album.name = new_name
+    Media.query.filter_by(album_id=album.id).update({Media.album: new_name}, synchronize_session=False)
+    return album
+
+
+def merge(source, target):
+    """Chuyển toàn bộ file của album source sang target rồi xóa source (không commit). Returns: target"""
+    if source.id == target.id:
+        return target
+    moved = Media.query.filter_by(album_id=source.id).update(
+        {Media.album_id: target.id, Media.album: target.name}, synchronize_session=False
+    )
+    adjust_counts({target.id: moved})
+    db.session.delete(source)
+    return target
+
+
+def delete(album):
+    """
+    Xóa album rỗng (không commit)
+    Returns: số file còn trong album (> 0 thì không xóa)
+    """
+    remaining = Media.query.filter_by(album_id=album.id).count()
+    if not remaining:
+        db.session.delete(album)
+    return remaining
+
+
+# ==================== ĐỒNG BỘ COUNTER KHI FLUSH ====================
+def _committed_album_id(media):
+    """album_id trong DB trước khi flush (load nếu chưa có)"""
+    history = inspect(media).attrs.album_id.load_history()
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+
+def _resolve_album(media, state):
+    """Đồng bộ album_id <-> tên album: ưu tiên tên nếu tên vừa được gán"""
+    if state.attrs.album.history.added or (media.album and media.album_id is None):
+        media.album_id = get_or_create(media.album)
+        media.album = normalize_name(media.album)
+    elif state.attrs.album_id.history.added:
+        media.album = db.session.query(Album.name).filter_by(id=media.album_id).scalar()
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _sync_album_counts(session, flush_context, instances):
+    """Media thêm / xóa / đổi album qua ORM -> gán album_id + cộng/trừ media_count trong cùng transaction"""
+    deltas = defaultdict(int)
+
+    for obj in session.new:
+        if isinstance(obj, Media):
+            _resolve_album(obj, inspect(obj))
+            deltas[obj.album_id] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Media) and inspect(obj).has_identity:
+            deltas[_committed_album_id(obj)] -= 1
+
+    for obj in session.dirty:
+        if not isinstance(obj, Media) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not (state.attrs.album.history.added or state.attrs.album_id.history.added):
+            continue
+        old_id = _committed_album_id(obj)
+        _resolve_album(obj, state)
+        if old_id != obj.album_id:
+            deltas[old_id] -= 1
+            deltas[obj.album_id] += 1
+
+    adjust_counts(deltas)
+
+
+# ==================== ĐẾM LẠI / DỮ LIỆU CŨ ====================
+def recount():
+    """Đếm lại media_count của mọi album: 1 câu UPDATE với subquery (không commit)"""
+    count = db.select(func.count(Media.id)).where(Media.album_id == Album.id).scalar_subquery()
+    return db.session.query(Album).update({Album.media_count: count}, synchronize_session=False)
+
+
+def backfill():
+    """
+    Chuyển dữ liệu album cũ sang bảng albums (chạy lại nhiều lần không sao), không commit
+    - mỗi tên khác nhau trong Media.album (chưa có album_id) -> 1 album
+    - thư mục dưới UPLOAD_FOLDER/albums (album rỗng trước đây chỉ là thư mục) -> album
+    - gán album_id cho media theo tên (1 câu UPDATE), rồi đếm lại media_count
+    Returns: {'created': số album mới, 'linked': số media được gán album_id}
+    """
+    names = {name for (name,) in db.session.query(Media.album).filter(
+        Media.album_id.is_(None), Media.album.isnot(None), Media.album != ''
+    ).distinct()}
+
+    albums_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'albums')
+    if os.path.isdir(albums_path):
+        names.update(normalize_name(folder) for folder in os.listdir(albums_path)
+                     if os.path.isdir(os.path.join(albums_path, folder)))
+    names.discard(None)
+
+    existing = {name for (name,) in db.session.query(Album.name)}
+    created = sorted(names - existing)
+    if created:
+        now = datetime.utcnow()
+        db.session.execute(db.insert(Album), [
+            {'name': name, 'media_count': 0, 'created_at': now} for name in created
+        ])
+
+    album_id = db.select(Album.id).where(Album.name == Media.album).scalar_subquery()
+    linked = Media.query.filter(
+        Media.album_id.is_(None), Media.album.isnot(None), Media.album != ''
+    ).update({Media.album_id: album_id}, synchronize_session=False)
+
+    recount()
+    return {'created': len(created), 'linked': linked}
@@ -0,0 +1,207 @@
+"""
+Xóa ảnh (Cloudinary / file local) theo lô, sau khi dữ liệu đã commit + dọn ảnh mồ côi
+
+- Xóa Media / Product / Blog / Banner / Category (từng cái qua ORM hoặc xóa hàng loạt),
+  hoặc đổi sang ảnh khác -> URL ảnh cũ được ghi vào hàng đợi 'asset_deletes' (app/jobs.py)
+  khi transaction commit (rollback thì bỏ), request không chờ gọi API xóa
+- Handler hàng đợi: bỏ các ảnh vẫn còn được dùng ở chỗ khác (cùng 1 ảnh có thể vừa nằm trong
+  Media Library vừa là ảnh sản phẩm), rồi xóa theo lô qua backend lưu ảnh đó (app/storage.py):
+  Cloudinary: Admin API delete_resources (tối đa 100 public_id mỗi lần gọi),
+  S3: DeleteObjects (1000 object), local / static: xóa file + _thumb
+- Flush: thread nền của worker web (app/jobs.py start_runner, mỗi JOBS_RUNNER_INTERVAL giây)
+  hoặc flask --app run jobs run --queue asset_deletes; job lỗi: flask --app run jobs retry
+  (ASSET_DELETE_FLUSH_SECONDS >= 0: request xóa tự flush nếu lần trước đã cách > N giây - chỉ nên dùng khi
+  đã tắt thread nền, request đó phải chờ Admin API + quét các cột tham chiếu)
+- Ảnh mồ côi (đã upload nhưng không còn bảng nào tham chiếu): flask --app run assets gc [--delete]
+"""
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, inspect
+from app import db
+from app.database import RoutingSession
+from app.jobs import enqueue_many, drain
+from app.metrics import record_delete
+from app.models import Product, Banner, Blog, Category, Media
+from app.storage import locate, known_backends, get_backend
+
+QUEUE = 'asset_deletes'
+
+# Cột chứa 1 URL ảnh: khi dòng bị xóa / đổi ảnh thì ảnh cũ có thể bị xóa
+IMAGE_COLUMNS = {
+    Product: ('image', 'images'),
+    Banner: ('image',),
+    Blog: ('image',),
+    Category: ('image',),
+    Media: ('filepath',),
+}
+
+# Mọi cột có thể tham chiếu ảnh (kể cả ảnh chèn trong nội dung HTML) - ảnh còn ở đây thì không xóa
+REFERENCE_COLUMNS = [
+    (model, column) for model, columns in IMAGE_COLUMNS.items() for column in columns
+] + [(Product, 'description'), (Blog, 'content')]
+
+# URL tuyệt đối hoặc đường dẫn bắt đầu bằng / trong HTML / JSON (backend nào nhận thì mới tính)
+_URL_RE = re.compile(r'''(?:https?://|/)[^\s"'<>()\\]+''')
+
+_last_flush = 0.0
+
+
+# ==================== URL -> ASSET ====================
+def parse_asset(url):
+    """URL ảnh -> khóa asset (tên backend, key trong backend), None nếu không phải ảnh do hệ thống lưu"""
+    backend, key = locate(url)
+    return (backend.name, key) if backend else None
+
+
+def urls_in(value):
+    """Các URL ảnh trong 1 giá trị cột: chính nó (cột URL), list JSON hoặc HTML nội dung"""
+    if not value:
+        return []
+    value = str(value)
+    if '"' not in value and '<' not in value and '[' not in value and ' ' not in value.strip():
+        return [value]
+    return _URL_RE.findall(value)
+
+
+# ==================== GHI NHẬN ẢNH CẦN XÓA ====================
+def schedule(urls, session=None):
+    """Ghi nhận URL ảnh cần xóa, vào hàng đợi khi session commit (bỏ qua nếu rollback)"""
+    session = session or db.session()
+    pending = session.info.setdefault('asset_deletes', set())
+    pending.update(url for url in urls if url)
+
+
+def schedule_rows(model, ids, chunk_size=500):
+    """Ảnh của các dòng sắp bị xóa theo tập (DELETE ... WHERE id IN), gọi trước câu DELETE"""
+    columns = [getattr(model, name) for name in IMAGE_COLUMNS.get(model, ())]
+    if not columns:
+        return
+    for start in range(0, len(ids), chunk_size):
+        for row in db.session.query(*columns).filter(model.id.in_(ids[start:start + chunk_size])):
+            schedule(url for value in row for url in urls_in(value))
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def _collect_deleted_images(session, flush_context, instances):
+    """Object bị xóa / đổi ảnh qua ORM -> ghi nhận URL ảnh cũ"""
+    for obj in session.deleted:
+        columns = IMAGE_COLUMNS.get(type(obj))
+        if columns and inspect(obj).has_identity:
+            schedule((url for column in columns for url in urls_in(getattr(obj, column))), session)
+
+    for obj in session.dirty:
+        columns = IMAGE_COLUMNS.get(type(obj))
+        if not columns or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        for column in columns:
+            history = state.attrs[column].history
+            if history.added:
+                old_values = history.deleted or state.attrs[column].load_history().deleted
+                new_urls = {url for value in history.added for url in urls_in(value)}
+                schedule((url for value in old_values for url in urls_in(value) if url not in new_urls), session)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _enqueue_deletes(session):
+    pending = session.info.pop('asset_deletes', None)
+    if pending:
+        enqueue_many(QUEUE, [{'url': url, 'queued_at': datetime.utcnow().isoformat()} for url in sorted(pending)])
+
+
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def _discard_deletes(session, previous_transaction):
+    session.info.pop('asset_deletes', None)
+
+
+def maybe_flush():
+    """Flush hàng đợi nếu lần flush trước (trong process này) đã cách > ASSET_DELETE_FLUSH_SECONDS (< 0: để thread nền)"""
+    global _last_flush
+    interval = current_app.config.get('ASSET_DELETE_FLUSH_SECONDS', -1)
+    now = time.monotonic()
+    if interval < 0 or now - _last_flush < interval:
+        return
+    _last_flush = now
+    drain(QUEUE, batch_size=current_app.config.get('ASSET_DELETE_BATCH_SIZE', 100), blocking=False)
+
+
+# ==================== THAM CHIẾU ====================
+def referenced_assets(batch_size=2000):
+    """Khóa asset của mọi ảnh đang được tham chiếu trong REFERENCE_COLUMNS (đọc từng batch)"""
+    referenced = set()
+    for model, column in REFERENCE_COLUMNS:
+        values = db.session.query(getattr(model, column)).filter(getattr(model, column).isnot(None))
+        for (value,) in values.execution_options(yield_per=batch_size):
+            referenced.update(parse_asset(url) for url in urls_in(value))
+    referenced.discard(None)
+    return referenced
+
+
+# ==================== XÓA THEO LÔ ====================
+def delete_assets(keys):
+    """
+    Xóa các asset (khóa từ parse_asset) theo lô qua từng backend
+    Returns: set khóa xóa lỗi (asset không còn tồn tại coi như đã xóa)
+    """
+    groups = defaultdict(list)
+    for name, key in keys:
+        groups[name].append(key)
+
+    failed = set()
+    for name, group in groups.items():
+        group_failed = set(get_backend(name).delete_many(group))
+        for key in group:
+            record_delete(key not in group_failed)
+        failed.update((name, key) for key in group_failed)
+        print(f"[Asset delete] {name}: xóa {len(group) - len(group_failed)}/{len(group)} ảnh")
+    return failed
+
+
+def process_delete_jobs(jobs):
+    """Handler hàng đợi 'asset_deletes': bỏ ảnh còn được dùng, xóa phần còn lại theo lô"""
+    by_key = defaultdict(list)
+    for job in jobs:
+        key = parse_asset(job.get('url'))
+        if key is not None:
+            by_key[key].append(job)
+    if not by_key:
+        return []
+
+    referenced = referenced_assets()
+    keys = [key for key in by_key if key not in referenced]
+    skipped = len(by_key) - len(keys)
+    if skipped:
+        print(f"[Asset delete] Bỏ qua {skipped} ảnh vẫn đang được dùng")
+
+    failed = delete_assets(keys)
+    return [dict(job, error='delete failed') for key in failed for job in by_key[key]]
+
+
+# ==================== ẢNH MỒ CÔI ====================
+def stored_assets(min_age=timedelta(days=1)):
+    """
+    Ảnh đang lưu ở mọi backend, tạo cách đây > min_age (tránh ảnh vừa upload nhưng form chưa lưu)
+    Cloudinary: thư mục ASSET_GC_PREFIX (nếu đã cấu hình), S3: S3_PREFIX, local: STORAGE_LOCAL_DIR,
+    static: UPLOAD_FOLDER; bỏ qua thumbnail
+    Returns: dict khóa asset -> URL
+    """
+    cutoff = datetime.utcnow() - min_age
+    return {(backend.name, key): url for backend in known_backends()
+            for key, url in backend.list_files(cutoff).items()}
+
+
+def find_orphans(min_age=timedelta(days=1)):
+    """Ảnh đang lưu nhưng không bảng nào tham chiếu: dict khóa asset -> URL"""
+    stored = stored_assets(min_age)
+    referenced = referenced_assets()
+    return {key: url for key, url in stored.items() if key not in referenced}
+
+
+def reclaim(orphans):
+    """Đưa ảnh mồ côi vào hàng đợi xóa (handler kiểm tra lại tham chiếu trước khi xóa)"""
+    enqueue_many(QUEUE, [{'url': url, 'queued_at': datetime.utcnow().isoformat(), 'reason': 'orphan'}
+                         for url in orphans.values()])
+    return len(orphans)
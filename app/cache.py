@@ -0,0 +1,89 @@
+"""
+Cache đơn giản trong process cho dữ liệu chỉ-đọc (danh mục, ...)
+
+Dữ liệu được warm trước khi gunicorn fork (xem app/warmup.py) nên các worker
+dùng chung bản copy-on-write, sau TTL mỗi worker tự load lại.
+"""
+import time
+from collections import namedtuple
+from flask import current_app
+from app.metrics import record_cache
+
+
+class TTLCache:
+    """Cache key -> value có thời hạn (giây), đếm hit/miss để theo dõi"""
+
+    def __init__(self, name, ttl=60):
+        self.name = name
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = {}
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Lấy value từ cache, nếu chưa có hoặc hết hạn thì gọi loader()"""
+        entry = self._data.get(key)
+        now = time.monotonic()
+
+        if entry is not None and entry[1] > now:
+            self.hits += 1
+            record_cache(self.name, True)
+            return entry[0]
+
+        self.misses += 1
+        record_cache(self.name, False)
+        value = loader()
+        self._data[key] = (value, now + (self.ttl if ttl is None else ttl))
+        return value
+
+    def invalidate(self, key=None):
+        """Xóa 1 key (hoặc toàn bộ cache nếu key=None)"""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            'size': len(self._data)
+        }
+
+
+# Danh sách cache trong app (dùng cho thống kê)
+caches = {}
+
+
+def get_cache(name, ttl=60):
+    """Lấy (hoặc tạo) cache theo tên"""
+    if name not in caches:
+        caches[name] = TTLCache(name, ttl)
+    return caches[name]
+
+
+# ==================== DANH MỤC ====================
+# Bản chỉ-đọc của Category: không gắn với session nên dùng chung an toàn giữa các request
+CategoryItem = namedtuple('CategoryItem', ['id', 'name', 'slug', 'description', 'image'])
+
+
+def get_active_categories():
+    """Danh sách danh mục đang active (cache theo CATEGORY_CACHE_TTL)"""
+    from app.models import Category
+
+    def load():
+        rows = Category.query.with_entities(
+            Category.id, Category.name, Category.slug, Category.description, Category.image
+        ).filter_by(is_active=True).order_by(Category.id).all()
+        return tuple(CategoryItem(*row) for row in rows)
+
+    return get_cache('categories').get_or_load(
+        'active', load, ttl=current_app.config.get('CATEGORY_CACHE_TTL', 60)
+    )
+
+
+def invalidate_categories():
+    """Gọi sau khi thêm/sửa/xóa danh mục"""
+    get_cache('categories').invalidate()
@@ -0,0 +1,247 @@
+"""
+Upload file lớn theo từng đoạn, tiếp tục được sau khi rớt mạng (giao thức kiểu tus) - /admin/api/uploads
+
+- POST   /admin/api/uploads        JSON {filename, size, folder?, album?, alt_text?, sha256?}
+         -> 201 {id, offset: 0, chunk_size}, header Location
+- HEAD   /admin/api/uploads/<id>   -> Upload-Offset (số byte server đã nhận), Upload-Length; GET: JSON
+- PATCH  /admin/api/uploads/<id>   header Upload-Offset = offset hiện tại, body = đoạn tiếp theo
+         (Content-Type: application/offset+octet-stream, tối đa UPLOAD_CHUNK_SIZE byte)
+         -> 204 + Upload-Offset mới; offset lệch -> 409 + Upload-Offset đúng (client gửi tiếp từ đó);
+         nhận đủ size -> chuyển file cho save_upload_file (như form upload) -> 201 {media}
+- DELETE /admin/api/uploads/<id>   hủy, xóa file tạm
+
+Đoạn upload đi thẳng từ request.stream vào file spool (UPLOAD_SPOOL_DIR/<id>.part) theo khối 64KB,
+sha256 cập nhật dần theo từng khối -> không bao giờ giữ cả file trong RAM, và mỗi request chỉ mang
+1 đoạn nhỏ hơn MAX_CONTENT_LENGTH. Offset = kích thước file spool: request bị đứt giữa chừng vẫn giữ
+phần đã ghi, client hỏi lại bằng HEAD rồi gửi tiếp. Thông tin upload nằm ở <id>.json nên worker
+gunicorn khác hoặc process sau khi restart vẫn nhận tiếp được (sha256 khi đó tính lại từ file spool).
+Upload bỏ dở quá UPLOAD_EXPIRE_HOURS: flask --app run media uploads-cleanup
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+from app.utils import allowed_file, save_upload_file
+
+try:
+    import fcntl
+except ImportError:  # Windows: không khóa giữa các process
+    fcntl = None
+
+BLOCK_SIZE = 64 * 1024
+
+_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+# id upload -> (offset, sha256 đã cập nhật tới offset) của các upload process này đang nhận
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+_MAX_HASHERS = 256
+
+
+class UploadError(Exception):
+    """Request upload không hợp lệ: status HTTP + offset hiện tại (nếu có) để client gửi tiếp"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+# ==================== FILE SPOOL ====================
+def get_spool_dir():
+    path = current_app.config['UPLOAD_SPOOL_DIR']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _paths(upload_id):
+    if not _ID_RE.match(upload_id or ''):
+        raise UploadError('Upload không tồn tại', 404)
+    base = os.path.join(get_spool_dir(), upload_id)
+    return f'{base}.json', f'{base}.part'
+
+
+def _remove(upload_id):
+    for path in _paths(upload_id):
+        if os.path.exists(path):
+            os.remove(path)
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+
+
+# ==================== TẠO / ĐỌC ====================
+def create(filename, size, user_id, folder='general', album=None, alt_text=None, sha256=None):
+    """Tạo upload mới (file spool rỗng). Returns: dict thông tin upload"""
+    max_size = current_app.config.get('UPLOAD_MAX_SIZE', 200 * 1024 * 1024)
+    if not filename or not allowed_file(filename):
+        raise UploadError('Định dạng file không được hỗ trợ')
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError('Thiếu kích thước file (size)')
+    if size > max_size:
+        raise UploadError(f'File quá lớn (tối đa {max_size // (1024 * 1024)}MB)', 413)
+    if sha256 and not re.match(r'^[0-9a-fA-F]{64}$', sha256):
+        raise UploadError('sha256 không hợp lệ')
+
+    upload = {
+        'id': uuid.uuid4().hex,
+        'filename': os.path.basename(filename),
+        'size': size,
+        'folder': folder or 'general',
+        'album': album or None,
+        'alt_text': alt_text or None,
+        'sha256': sha256.lower() if sha256 else None,
+        'user_id': user_id,
+        'created_at': time.time(),
+    }
+    meta_path, part_path = _paths(upload['id'])
+    open(part_path, 'wb').close()
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(upload, f, ensure_ascii=False)
+    return upload
+
+
+def get(upload_id, user_id):
+    """Thông tin upload (kèm offset hiện tại) của user, UploadError 404 nếu không có"""
+    meta_path, part_path = _paths(upload_id)
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            upload = json.load(f)
+    except (OSError, ValueError):
+        raise UploadError('Upload không tồn tại hoặc đã hết hạn', 404)
+    if upload.get('user_id') != user_id:
+        raise UploadError('Upload không tồn tại hoặc đã hết hạn', 404)
+    upload['offset'] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return upload
+
+
+def cancel(upload_id, user_id):
+    get(upload_id, user_id)
+    _remove(upload_id)
+
+
+# ==================== NHẬN ĐOẠN ====================
+def _hasher(upload_id, part_file, offset):
+    """sha256 của `offset` byte đầu: dùng bản đang có trong process, không có thì đọc lại file spool"""
+    with _hashers_lock:
+        cached = _hashers.get(upload_id)
+    if cached is not None and cached[0] == offset:
+        return cached[1]
+
+    sha = hashlib.sha256()
+    part_file.seek(0)
+    remaining = offset
+    while remaining:
+        block = part_file.read(min(1024 * 1024, remaining))
+        if not block:
+            break
+        sha.update(block)
+        remaining -= len(block)
+    return sha
+
+
+def _remember(upload_id, offset, sha):
+    with _hashers_lock:
+        _hashers[upload_id] = (offset, sha)
+        _hashers.move_to_end(upload_id)
+        while len(_hashers) > _MAX_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def receive(upload, offset, stream, length):
+    """
+    Ghi 1 đoạn (length byte đọc dần từ stream) vào cuối file spool, bắt đầu tại `offset`
+    Mỗi upload chỉ nhận 1 đoạn tại 1 thời điểm (khóa file); offset phải bằng số byte đã nhận
+    Nhận đủ file -> complete() ngay trong khóa (2 request đoạn cuối không tạo 2 file)
+    Returns: (offset mới, (url, file_info) nếu đã lưu xong file, None nếu chưa đủ)
+    """
+    chunk_size = current_app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+    if length is None:
+        raise UploadError('Thiếu Content-Length', 411)
+    if length > chunk_size:
+        raise UploadError(f'Mỗi đoạn tối đa {chunk_size} byte', 413)
+
+    upload_id = upload['id']
+    _, part_path = _paths(upload_id)
+    with open(part_path, 'a+b') as part_file:
+        if fcntl:
+            try:
+                fcntl.flock(part_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError('Upload đang nhận 1 đoạn khác', 423)
+
+        current = part_file.seek(0, os.SEEK_END)
+        if offset != current:
+            raise UploadError('Upload-Offset không khớp', 409, offset=current)
+        if current + length > upload['size']:
+            raise UploadError('Đoạn vượt quá kích thước file đã khai báo', 413, offset=current)
+
+        sha = _hasher(upload_id, part_file, current)
+        part_file.seek(0, os.SEEK_END)
+        written = 0
+        try:
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                part_file.write(block)
+                sha.update(block)
+                written += len(block)
+        finally:
+            # Request đứt giữa chừng: giữ phần đã ghi, lần sau gửi tiếp từ offset mới
+            part_file.flush()
+            _remember(upload_id, current + written, sha)
+
+        offset = current + written
+        if offset == upload['size']:
+            return offset, complete(upload, sha.hexdigest())
+        return offset, None
+
+
+def complete(upload, digest):
+    """
+    File đã nhận đủ: kiểm tra sha256 (nếu client gửi lúc tạo), chuyển cho save_upload_file như form upload
+    Lưu lỗi -> giữ file spool (PATCH rỗng tại offset cuối để thử lại)
+    Returns: (url, file_info) của save_upload_file
+    """
+    upload_id = upload['id']
+    _, part_path = _paths(upload_id)
+    if upload.get('sha256') and digest != upload['sha256']:
+        _remove(upload_id)
+        raise UploadError('sha256 không khớp, file bị hỏng trên đường truyền - hãy upload lại', 422)
+
+    with open(part_path, 'rb') as part_file:
+        url, file_info = save_upload_file(
+            FileStorage(stream=part_file, filename=upload['filename']),
+            folder=upload['folder'],
+            album=upload['album'],
+            alt_text=upload['alt_text'],
+        )
+    if not url:
+        raise UploadError('Không lưu được file, thử gửi lại đoạn cuối', 502, offset=upload['size'])
+    _remove(upload_id)
+    return url, file_info
+
+
+# ==================== DỌN DẸP ====================
+def cleanup(max_age_hours=None):
+    """Xóa upload bỏ dở: file spool không được ghi thêm trong max_age_hours giờ. Returns: số upload đã xóa"""
+    max_age_hours = max_age_hours or current_app.config.get('UPLOAD_EXPIRE_HOURS', 24)
+    cutoff = time.time() - max_age_hours * 3600
+    directory = get_spool_dir()
+    removed = 0
+    for name in os.listdir(directory):
+        upload_id, ext = os.path.splitext(name)
+        if ext != '.json' or not _ID_RE.match(upload_id):
+            continue
+        part_path = os.path.join(directory, upload_id + '.part')
+        last_write = os.path.getmtime(part_path if os.path.exists(part_path) else os.path.join(directory, name))
+        if last_write < cutoff:
+            _remove(upload_id)
+            removed += 1
+    return removed
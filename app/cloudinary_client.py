@@ -0,0 +1,261 @@
+"""
+Gọi Cloudinary có kiểm soát: pool kết nối keep-alive, timeout, thử lại có jitter, circuit breaker
+
+- Pool: uploader và Admin API của SDK mỗi bên dùng 1 PoolManager (urllib3) chỉ giữ 1 kết nối / host,
+  nhiều thread cùng upload thì kết nối thừa bị đóng sau mỗi request. configure() thay bằng 1 pool TCP
+  keep-alive dùng chung, giữ CLOUDINARY_POOL_SIZE kết nối, không tự retry (retry ở đây)
+- Timeout: CLOUDINARY_CONNECT_TIMEOUT / CLOUDINARY_READ_TIMEOUT cho mỗi lần gọi, cả chuỗi thử lại
+  không quá CLOUDINARY_DEADLINE giây (nhỏ hơn timeout của gunicorn để request admin không bị kill)
+- Thử lại: lỗi mạng / timeout / 5xx / rate limit -> thử lại tối đa CLOUDINARY_MAX_RETRIES lần, chờ ngẫu nhiên
+  trong [0, CLOUDINARY_RETRY_BACKOFF * 2^n] (full jitter); lỗi 4xx (sai tham số, sai key...) không thử lại
+- Circuit breaker (riêng mỗi process): CLOUDINARY_BREAKER_FAILURES lần lỗi liên tiếp -> mở trong
+  CLOUDINARY_BREAKER_RESET giây, mọi lần gọi báo CloudinaryUnavailable ngay thay vì chờ timeout;
+  hết thời gian -> cho 1 lần gọi thử (nửa mở), thành công thì đóng lại, lỗi thì mở tiếp
+- Breaker mở / hết lượt thử: CloudinaryStorage.save lưu ảnh vào storage local (app/storage.py) + ghi job
+  'cloudinary_resync'; thread nền của worker web (app/jobs.py start_runner, mỗi JOBS_RUNNER_INTERVAL giây)
+  upload lại lên Cloudinary khi breaker đóng, đổi URL trong DB, đưa file local vào hàng đợi xóa.
+  Phải chạy trên chính instance web: file tạm nằm trên đĩa local của nó (chạy tay:
+  flask --app run jobs run --queue cloudinary_resync)
+- Metrics (app/metrics.py): cloudinary_request_seconds{operation,result}, cloudinary_retries_total,
+  cloudinary_circuit_state, storage_fallback_total
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.jobs import enqueue_many
+from app.metrics import observe_cloudinary, record_cloudinary_retry, set_cloudinary_circuit, record_storage_fallback
+from app.storage import StorageError, get_backend
+
+RESYNC_QUEUE = 'cloudinary_resync'
+
+
+class CloudinaryUnavailable(StorageError):
+    """Breaker đang mở hoặc đã hết lượt thử lại (lỗi mạng / timeout / 5xx)"""
+
+
+# ==================== CIRCUIT BREAKER ====================
+class CircuitBreaker:
+    """Đóng -> (failure_threshold lỗi liên tiếp) -> mở -> (reset_timeout giây) -> nửa mở (1 lần gọi thử)"""
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            set_cloudinary_circuit(state)
+
+    def allow(self):
+        """Được gọi không (nửa mở: chỉ 1 lần gọi thử, các lần khác bị từ chối tới khi có kết quả)"""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+                return True
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"[Cloudinary] Circuit breaker mở sau {self.failures} lỗi liên tiếp "
+                          f"({self.reset_timeout}s)")
+                self.opened_at = self.clock()
+                self._set_state(self.OPEN)
+
+    @property
+    def is_open(self):
+        return self.state == self.OPEN and self.clock() - self.opened_at < self.reset_timeout
+
+
+def _is_transient(error):
+    """Lỗi đáng thử lại / tính vào breaker: mạng, timeout, 5xx, rate limit (không phải lỗi do request sai)"""
+    from cloudinary.exceptions import Error, BadRequest, AuthorizationRequired, NotAllowed, NotFound, AlreadyExists
+    from urllib3.exceptions import HTTPError
+
+    if isinstance(error, (BadRequest, AuthorizationRequired, NotAllowed, NotFound, AlreadyExists)):
+        return False
+    # Admin API trả Exception thường cho mã HTTP không có trong bảng lỗi (502, 503...)
+    return isinstance(error, (Error, HTTPError, OSError)) or type(error) is Exception
+
+
+# ==================== CLIENT ====================
+class CloudinaryClient:
+    """Bọc các hàm của SDK: client.call('upload', cloudinary.uploader.upload, file, folder=...)"""
+
+    def __init__(self, config, sleep=time.sleep):
+        self.connect_timeout = config.get('CLOUDINARY_CONNECT_TIMEOUT', 3)
+        self.read_timeout = config.get('CLOUDINARY_READ_TIMEOUT', 15)
+        self.deadline = config.get('CLOUDINARY_DEADLINE', 20)
+        self.max_retries = config.get('CLOUDINARY_MAX_RETRIES', 2)
+        self.backoff = config.get('CLOUDINARY_RETRY_BACKOFF', 0.5)
+        self.pool_size = config.get('CLOUDINARY_POOL_SIZE', 10)
+        self.breaker = CircuitBreaker(config.get('CLOUDINARY_BREAKER_FAILURES', 5),
+                                      config.get('CLOUDINARY_BREAKER_RESET', 30))
+        self.sleep = sleep
+        self._configured = False
+
+    def configure(self):
+        """Cấu hình SDK (1 lần) + thay PoolManager mặc định bằng pool keep-alive dùng chung"""
+        if self._configured:
+            return
+        from app.utils import get_cloudinary_uploader
+        uploader = get_cloudinary_uploader()
+
+        import sys
+        import cloudinary
+        import cloudinary.api  # noqa: F401 (load cloudinary.api_client.call_api)
+        from cloudinary.api_client.tcp_keep_alive_manager import TCPKeepAlivePoolManager
+
+        # Có api_proxy thì giữ connector của SDK (ProxyManager)
+        if not cloudinary.config().api_proxy:
+            pool = TCPKeepAlivePoolManager(
+                num_pools=4, maxsize=self.pool_size, block=False, retries=False, **cloudinary.CERT_KWARGS
+            )
+            uploader._http = pool
+            sys.modules['cloudinary.api_client.call_api']._http = pool
+        self._configured = True
+
+    def _timeout(self, remaining):
+        from urllib3 import Timeout
+        return Timeout(connect=self.connect_timeout, read=self.read_timeout, total=max(remaining, 0.1))
+
+    def call(self, operation, func, *args, **kwargs):
+        """
+        Gọi func(*args, timeout=..., **kwargs) với timeout / thử lại / breaker
+        Lỗi 4xx: raise nguyên lỗi của SDK; lỗi tạm thời hết lượt thử hoặc breaker mở: CloudinaryUnavailable
+        """
+        self.configure()
+        if not self.breaker.allow():
+            observe_cloudinary(operation, 0, 'rejected')
+            raise CloudinaryUnavailable(f'Cloudinary tạm ngưng (circuit breaker mở), {operation} bị từ chối')
+
+        started = time.monotonic()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+                if time.monotonic() - started + delay + self.connect_timeout > self.deadline:
+                    break
+                self.sleep(delay)
+                if not self.breaker.allow():
+                    break
+                record_cloudinary_retry(operation)
+
+            # File upload đã bị đọc ở lần trước
+            for arg in args:
+                if hasattr(arg, 'seek'):
+                    arg.seek(0)
+
+            call_started = time.perf_counter()
+            try:
+                result = func(*args, timeout=self._timeout(self.deadline - (time.monotonic() - started)), **kwargs)
+            except Exception as e:
+                elapsed = time.perf_counter() - call_started
+                if not _is_transient(e):
+                    # Cloudinary vẫn trả lời -> không tính là sự cố
+                    observe_cloudinary(operation, elapsed, 'client_error')
+                    self.breaker.record_success()
+                    raise
+                observe_cloudinary(operation, elapsed, 'error')
+                self.breaker.record_failure()
+                last_error = e
+                print(f"[Cloudinary] {operation} lỗi (lần {attempt + 1}): {e}")
+                continue
+
+            observe_cloudinary(operation, time.perf_counter() - call_started, 'ok')
+            self.breaker.record_success()
+            return result
+
+        raise CloudinaryUnavailable(f'Cloudinary {operation} thất bại: {last_error or "circuit breaker mở"}')
+
+
+def get_client():
+    """1 client (và 1 breaker) cho mỗi app trong process"""
+    client = current_app.extensions.get('cloudinary_client')
+    if client is None:
+        client = current_app.extensions['cloudinary_client'] = CloudinaryClient(current_app.config)
+    return client
+
+
+# ==================== ĐỒNG BỘ LẠI ẢNH LƯU TẠM ====================
+def replace_url(old_url, new_url):
+    """Đổi URL ảnh trong mọi cột có thể tham chiếu ảnh (cột URL, list JSON, HTML nội dung), không commit"""
+    from app.asset_cleanup import REFERENCE_COLUMNS
+
+    updated = 0
+    for model, column in REFERENCE_COLUMNS:
+        col = getattr(model, column)
+        updated += model.query.filter(col.contains(old_url, autoescape=True)).update(
+            {col: func.replace(col, old_url, new_url)}, synchronize_session=False
+        )
+    return updated
+
+
+def process_resync_jobs(jobs):
+    """
+    Handler hàng đợi 'cloudinary_resync': upload ảnh lưu tạm ở local lên Cloudinary, đổi URL trong DB,
+    đưa file local vào hàng đợi xóa (handler xóa kiểm tra lại tham chiếu)
+    Breaker vẫn mở -> đưa các job còn lại về hàng đợi, lần chạy sau thử tiếp
+    """
+    from app.asset_cleanup import QUEUE as DELETE_QUEUE
+    from app.cache import invalidate_categories
+
+    client = get_client()
+    local = get_backend('local')
+    cloudinary_storage = get_backend('cloudinary')
+    failed = []
+    resynced = []
+
+    for index, job in enumerate(jobs):
+        if client.breaker.is_open:
+            enqueue_many(RESYNC_QUEUE, jobs[index:])
+            print(f"[Cloudinary] Breaker đang mở, để lại {len(jobs) - index} ảnh cho lần sau")
+            break
+
+        key = local.key_for(job.get('url') or '')
+        path = key and local.path_for(key)
+        if not path or not os.path.isfile(path):
+            failed.append(dict(job, error='không còn file local'))
+            continue
+
+        try:
+            with open(path, 'rb') as f:
+                stored = cloudinary_storage.upload(f, job.get('folder') or 'enterprise/general',
+                                                   job.get('filename') or os.path.basename(path))
+        except CloudinaryUnavailable:
+            enqueue_many(RESYNC_QUEUE, jobs[index:])
+            print(f"[Cloudinary] Vẫn lỗi, để lại {len(jobs) - index} ảnh cho lần sau")
+            break
+        except Exception as e:
+            failed.append(dict(job, error=str(e)))
+            continue
+
+        replace_url(job['url'], stored.url)
+        db.session.commit()
+        resynced.append(job['url'])
+        record_storage_fallback('resynced')
+
+    if resynced:
+        invalidate_categories()
+        now = datetime.utcnow().isoformat()
+        enqueue_many(DELETE_QUEUE, [{'url': url, 'queued_at': now, 'reason': 'resynced'} for url in resynced])
+        print(f"[Cloudinary] Đã đồng bộ lại {len(resynced)} ảnh lưu tạm")
+    return failed
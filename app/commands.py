@@ -0,0 +1,294 @@
+"""
+Các lệnh CLI cho app (chạy bằng: flask --app run <lệnh>)
+"""
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+def register_commands(app):
+    """Đăng ký các lệnh CLI vào app"""
+    app.cli.add_command(warm_command)
+    app.cli.add_command(replica_sync_command)
+    app.cli.add_command(import_data_command)
+    app.cli.add_command(jobs_group)
+    app.cli.add_command(sitemap_group)
+    app.cli.add_command(counters_group)
+    app.cli.add_command(albums_group)
+    app.cli.add_command(media_group)
+    app.cli.add_command(assets_group)
+
+
+# ==================== WARM ====================
+@click.command('warm')
+@with_appcontext
+def warm_command():
+    """Biên dịch trước toàn bộ templates vào bytecode cache (chạy lúc build)"""
+    from app.warmup import compile_templates
+
+    cache_dir = current_app.config.get('TEMPLATE_CACHE_DIR')
+    result = compile_templates(current_app)
+
+    for name, error in result['errors']:
+        click.echo(f'✗ {name}: {error}', err=True)
+
+    click.echo(f"✓ Đã biên dịch {result['compiled']} templates trong {result['seconds']:.2f}s"
+               f" (cache: {cache_dir or 'không dùng'})")
+
+    if result['errors']:
+        raise SystemExit(1)
+
+
+# ==================== READ REPLICA (TEST LOCAL) ====================
+@click.command('replica-sync')
+@with_appcontext
+def replica_sync_command():
+    """Copy database SQLite primary sang file replica (giả lập replication khi test local)"""
+    import sqlite3
+    from app import db
+
+    replica = db.engines.get('replica')
+    if replica is None:
+        raise click.ClickException('Chưa cấu hình DATABASE_REPLICA_URL')
+
+    primary = db.engines[None]
+    if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise click.ClickException('Chỉ hỗ trợ primary và replica đều là SQLite '
+                                   '(PostgreSQL dùng streaming replication)')
+
+    source = sqlite3.connect(primary.url.database)
+    target = sqlite3.connect(replica.url.database)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+    replica.dispose()
+    click.echo(f'✓ Đã copy {primary.url.database} -> {replica.url.database}')
+
+
+# ==================== IMPORT CSV/JSONL ====================
+@click.command('import-data')
+@click.argument('kind', type=click.Choice(['products', 'blogs']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Mặc định: theo đuôi file')
+@click.option('--batch-size', type=int, help='Số dòng mỗi lần INSERT (mặc định IMPORT_BATCH_SIZE)')
+@click.option('--dry-run', is_flag=True, help='Chỉ kiểm tra, không ghi database')
+@click.option('--author', help='Tác giả cho bài viết không có cột author')
+@with_appcontext
+def import_data_command(kind, path, fmt, batch_size, dry_run, author):
+    """Nhập sản phẩm / bài viết từ file CSV hoặc JSONL (đọc từng dòng)"""
+    from app.importer import detect_format, iter_records, import_records
+
+    def progress(report):
+        click.echo(f'  ... {report.processed} dòng, {report.inserted} hợp lệ/đã ghi, '
+                   f'{report.failed} lỗi ({report.rows_per_sec} dòng/s)')
+
+    with open(path, 'rb') as f:
+        report = import_records(
+            kind, iter_records(f, fmt or detect_format(path)),
+            batch_size=batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 2000),
+            dry_run=dry_run, progress=progress, author=author
+        )
+
+    for line, message in report.errors:
+        click.echo(f'✗ Dòng {line}: {message}', err=True)
+
+    action = 'hợp lệ (chạy thử)' if dry_run else 'đã ghi'
+    click.echo(f'✓ {report.processed} dòng, {report.inserted} {action}, {report.failed} lỗi, '
+               f'{report.images_queued} ảnh vào hàng đợi - {report.seconds:.2f}s ({report.rows_per_sec} dòng/s)')
+
+
+# ==================== HÀNG ĐỢI CÔNG VIỆC NỀN ====================
+@click.group('jobs')
+def jobs_group():
+    """Hàng đợi công việc nền (app/jobs.py)"""
+
+
+@jobs_group.command('run')
+@click.option('--queue', 'queues', multiple=True, help='Tên hàng đợi (mặc định: tất cả)')
+@click.option('--loop', is_flag=True, help='Chạy liên tục')
+@click.option('--interval', type=float, default=5, help='Số giây nghỉ giữa các lần kiểm tra (khi --loop)')
+@with_appcontext
+def jobs_run_command(queues, loop, interval):
+    """Xử lý các job đang chờ"""
+    import time
+    from app.jobs import HANDLERS, drain
+
+    queues = queues or tuple(HANDLERS)
+    while True:
+        for queue in queues:
+            result = drain(queue)
+            if result['processed']:
+                click.echo(f"✓ {queue}: {result['processed']} job, {result['failed']} lỗi ({result['seconds']}s)")
+        if not loop:
+            break
+        time.sleep(interval)
+
+
+@jobs_group.command('status')
+@with_appcontext
+def jobs_status_command():
+    """Số job đang chờ của mỗi hàng đợi"""
+    from app.jobs import HANDLERS, pending_count, failed_count
+
+    for queue in HANDLERS:
+        click.echo(f'{queue}: {pending_count(queue)} job đang chờ, {failed_count(queue)} job lỗi')
+
+
+@jobs_group.command('retry')
+@click.option('--queue', 'queues', multiple=True, help='Tên hàng đợi (mặc định: tất cả)')
+@with_appcontext
+def jobs_retry_command(queues):
+    """Đưa các job lỗi (<queue>.failed.jsonl) trở lại hàng đợi"""
+    from app.jobs import HANDLERS, retry_failed
+
+    for queue in queues or tuple(HANDLERS):
+        count = retry_failed(queue)
+        if count:
+            click.echo(f'✓ {queue}: đưa lại {count} job')
+
+
+# ==================== SITEMAP / RSS ====================
+@click.group('sitemap')
+def sitemap_group():
+    """Sitemap và RSS dựng sẵn (app/sitemap.py)"""
+
+
+@sitemap_group.command('build')
+@click.option('--force', is_flag=True, help='Build lại tất cả shard (bỏ qua fingerprint)')
+@with_appcontext
+def sitemap_build_command(force):
+    """Build lại các shard sitemap / RSS có dữ liệu thay đổi"""
+    from app.sitemap import build_sitemaps, get_sitemap_dir
+
+    try:
+        result = build_sitemaps(force=force)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    for name in result['built']:
+        click.echo(f'  + {name}')
+    for name in result['removed']:
+        click.echo(f'  - {name}')
+    click.echo(f"✓ Build {len(result['built'])} file, xóa {len(result['removed'])}, "
+               f"giữ nguyên {result['unchanged']} trong {result['seconds']}s ({get_sitemap_dir()})")
+
+
+# ==================== COUNTERS ====================
+@click.group('counters')
+def counters_group():
+    """Bộ đếm duy trì sẵn (app/counters.py)"""
+
+
+@counters_group.command('recount')
+@with_appcontext
+def counters_recount_command():
+    """Đếm lại tất cả counter từ dữ liệu gốc (khi bị lệch do sửa DB bằng tay)"""
+    from app import db, counters
+
+    for name in counters.COUNTERS:
+        value = counters.recount(name)
+        click.echo(f'✓ {name} = {value}')
+    db.session.commit()
+
+
+# ==================== ALBUMS ====================
+@click.group('albums')
+def albums_group():
+    """Album của Media Library (app/albums.py)"""
+
+
+@albums_group.command('backfill')
+@with_appcontext
+def albums_backfill_command():
+    """
+    Tạo album từ dữ liệu cũ (Media.album + thư mục uploads/albums), gán album_id, đếm lại
+    Chạy sau khi đã tạo bảng albums / cột media.album_id (flask db migrate && flask db upgrade)
+    """
+    from app import db, albums
+
+    result = albums.backfill()
+    db.session.commit()
+    click.echo(f"✓ Tạo {result['created']} album, gán album cho {result['linked']} file")
+
+
+@albums_group.command('recount')
+@with_appcontext
+def albums_recount_command():
+    """Đếm lại số file của từng album (khi bị lệch do sửa DB bằng tay)"""
+    from app import db, albums
+
+    updated = albums.recount()
+    db.session.commit()
+    click.echo(f'✓ Đã đếm lại {updated} album')
+
+
+# ==================== MEDIA ====================
+@click.group('media')
+def media_group():
+    """Media Library (app/media_library.py)"""
+
+
+@media_group.command('reindex')
+@click.option('--batch-size', default=1000, show_default=True)
+@with_appcontext
+def media_reindex_command(batch_size):
+    """Tính lại cột tìm kiếm media (dữ liệu cũ / INSERT không qua ORM)"""
+    from app.media_library import reindex_all
+
+    total = reindex_all(batch_size)
+    click.echo(f'✓ Đã cập nhật cột tìm kiếm cho {total} file')
+
+
+@media_group.command('thumbnails')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--force', is_flag=True, help='Tạo lại cả thumbnail đã có')
+@with_appcontext
+def media_thumbnails_command(batch_size, force):
+    """Tạo thumbnail <tên>_thumb<ext> cho ảnh local (ảnh Cloudinary dùng URL biến đổi, không cần tạo)"""
+    from app.media_library import generate_thumbnails
+
+    result = generate_thumbnails(batch_size, force=force)
+    click.echo(f"✓ Tạo {result['created']} thumbnail, {result['failed']} file lỗi / không còn trên đĩa")
+
+
+@media_group.command('uploads-cleanup')
+@click.option('--max-age-hours', type=int, help='Mặc định UPLOAD_EXPIRE_HOURS')
+@with_appcontext
+def media_uploads_cleanup_command(max_age_hours):
+    """Xóa file tạm của các upload theo đoạn bị bỏ dở (app/chunked_uploads.py)"""
+    from app.chunked_uploads import cleanup
+
+    click.echo(f'✓ Đã xóa {cleanup(max_age_hours)} upload bỏ dở')
+
+
+# ==================== ẢNH MỒ CÔI ====================
+@click.group('assets')
+def assets_group():
+    """Ảnh trên Cloudinary / local (app/asset_cleanup.py)"""
+
+
+@assets_group.command('gc')
+@click.option('--min-age-hours', default=24, show_default=True, help='Bỏ qua ảnh mới upload gần đây')
+@click.option('--delete', 'reclaim', is_flag=True, help='Đưa ảnh mồ côi vào hàng đợi xóa (mặc định chỉ liệt kê)')
+@click.option('--limit', default=50, show_default=True, help='Số ảnh liệt kê')
+@with_appcontext
+def assets_gc_command(min_age_hours, reclaim, limit):
+    """Tìm ảnh đang lưu nhưng không còn Product/Banner/Blog/Category/Media nào tham chiếu"""
+    from datetime import timedelta
+    from app import asset_cleanup
+
+    orphans = asset_cleanup.find_orphans(timedelta(hours=min_age_hours))
+    for url in sorted(orphans.values())[:limit]:
+        click.echo(f'  {url}')
+    if len(orphans) > limit:
+        click.echo(f'  ... và {len(orphans) - limit} ảnh khác')
+
+    if not reclaim:
+        click.echo(f'{len(orphans)} ảnh mồ côi (chạy lại với --delete để xóa)')
+        return
+    queued = asset_cleanup.reclaim(orphans)
+    click.echo(f'✓ {queued} ảnh vào hàng đợi {asset_cleanup.QUEUE} '
+               f'(xóa khi chạy: flask --app run jobs run --queue {asset_cleanup.QUEUE})')
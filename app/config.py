@@ -5,6 +5,54 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def get_engine_options(database_uri):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS theo từng loại database
+    - PostgreSQL: cấu hình pool (size, overflow, recycle, pre-ping)
+    - SQLite: busy timeout + cache statement của sqlite3
+      (PRAGMA journal_mode/synchronous được set khi connect, xem app/database.py)
+    """
+    options = {
+        # Cache câu SQL đã compile của SQLAlchemy
+        'query_cache_size': int(os.environ.get('DB_QUERY_CACHE_SIZE', 1200))
+    }
+
+    if database_uri.startswith('sqlite'):
+        options['connect_args'] = {
+            'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 15)),
+            'cached_statements': int(os.environ.get('SQLITE_CACHED_STATEMENTS', 256))
+        }
+        return options
+
+    options.update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # Render/PgBouncer cắt kết nối idle -> recycle định kỳ và ping trước khi dùng
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+        'pool_use_lifo': True
+    })
+    return options
+
+
+def configure_database_options(config):
+    """
+    Pool options theo URI cuối cùng của app (gọi trong create_app, sau khi đã load config)
+    - SQLALCHEMY_ENGINE_OPTIONS = get_engine_options(SQLALCHEMY_DATABASE_URI) + giá trị config tự đặt
+    - DATABASE_REPLICA_URL -> SQLALCHEMY_BINDS['replica'] với options của loại database replica
+    """
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **get_engine_options(config['SQLALCHEMY_DATABASE_URI']),
+        **(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}),
+    }
+    replica_url = config.get('DATABASE_REPLICA_URL')
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    if replica_url and 'replica' not in binds:
+        binds['replica'] = {'url': replica_url, **get_engine_options(replica_url)}
+    config['SQLALCHEMY_BINDS'] = binds
+
+
 class Config:
     """Cấu hình chung cho ứng dụng Flask"""
 
@@ -19,7 +67,23 @@ class Config:
     if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith('postgres://'):
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace('postgres://', 'postgresql://', 1)
 
+    # Read-replica (tùy chọn): GET của trang public đọc từ replica, mọi thao tác ghi vào primary
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    if DATABASE_REPLICA_URL and DATABASE_REPLICA_URL.startswith('postgres://'):
+        DATABASE_REPLICA_URL = DATABASE_REPLICA_URL.replace('postgres://', 'postgresql://', 1)
+
+    # SQLALCHEMY_BINDS['replica'] + pool options được tạo trong create_app (configure_database_options)
+
+    # Sau khi admin lưu dữ liệu, session đó đọc từ primary trong N giây (đọc được ngay thay đổi của mình)
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLALCHEMY_ENGINE_OPTIONS: tính trong create_app theo URI cuối cùng (config con / biến môi trường có thể đổi URI),
+    # config con đặt SQLALCHEMY_ENGINE_OPTIONS thì được gộp đè lên giá trị mặc định
+
+    # PRAGMA cho SQLite: WAL cho phép đọc song song với ghi (vd tăng lượt xem)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
 
     # Cấu hình upload file
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -28,10 +92,142 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # Max 16MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
+    # Upload theo đoạn (app/chunked_uploads.py): mỗi đoạn <= UPLOAD_CHUNK_SIZE (< MAX_CONTENT_LENGTH),
+    # cả file <= UPLOAD_MAX_SIZE, ghi vào UPLOAD_SPOOL_DIR, bỏ dở quá UPLOAD_EXPIRE_HOURS thì bị dọn
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+    UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', 200 * 1024 * 1024))
+    UPLOAD_SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR', os.path.join(BASE_DIR, '..', 'instance', 'upload_spool'))
+    UPLOAD_EXPIRE_HOURS = int(os.environ.get('UPLOAD_EXPIRE_HOURS', 24))
+
+    # Upload thẳng từ trình duyệt lên Cloudinary / storage local (app/direct_uploads.py): file <=
+    # DIRECT_UPLOAD_MAX_SIZE, tham số đã ký dùng được trong DIRECT_UPLOAD_TTL giây; file lớn hơn dùng upload theo đoạn
+    DIRECT_UPLOADS_ENABLED = os.environ.get('DIRECT_UPLOADS_ENABLED', '1') == '1'
+    DIRECT_UPLOAD_TTL = int(os.environ.get('DIRECT_UPLOAD_TTL', 600))
+    DIRECT_UPLOAD_MAX_SIZE = int(os.environ.get('DIRECT_UPLOAD_MAX_SIZE', 10 * 1024 * 1024))
+
+    # Jinja2 bytecode cache (build bằng lệnh `flask warm`, worker mới chỉ cần load bytecode)
+    # Đặt TEMPLATE_CACHE_DIR='' để tắt
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR',
+                                        os.path.join(BASE_DIR, '..', 'instance', 'jinja_cache'))
+
+    # Nơi lưu ảnh upload mới (app/storage.py): cloudinary | local | s3
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'cloudinary')
+
+    # Cloudinary (chỉ cấu hình khi upload/xóa ảnh lần đầu)
+    CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME')
+    CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY')
+    CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
+
+    # Gọi Cloudinary (app/cloudinary_client.py): timeout (giây), thử lại, circuit breaker
+    # Cả chuỗi thử lại không quá CLOUDINARY_DEADLINE (< timeout 30s mặc định của gunicorn)
+    CLOUDINARY_CONNECT_TIMEOUT = float(os.environ.get('CLOUDINARY_CONNECT_TIMEOUT', 3))
+    CLOUDINARY_READ_TIMEOUT = float(os.environ.get('CLOUDINARY_READ_TIMEOUT', 15))
+    CLOUDINARY_DEADLINE = float(os.environ.get('CLOUDINARY_DEADLINE', 20))
+    CLOUDINARY_MAX_RETRIES = int(os.environ.get('CLOUDINARY_MAX_RETRIES', 2))
+    CLOUDINARY_RETRY_BACKOFF = float(os.environ.get('CLOUDINARY_RETRY_BACKOFF', 0.5))
+    CLOUDINARY_POOL_SIZE = int(os.environ.get('CLOUDINARY_POOL_SIZE', 10))
+    # File lớn hơn (trên đĩa) được upload từng đoạn (upload_large, tối thiểu 5MB)
+    CLOUDINARY_CHUNK_SIZE = int(os.environ.get('CLOUDINARY_CHUNK_SIZE', 6 * 1024 * 1024))
+    CLOUDINARY_BREAKER_FAILURES = int(os.environ.get('CLOUDINARY_BREAKER_FAILURES', 5))
+    CLOUDINARY_BREAKER_RESET = float(os.environ.get('CLOUDINARY_BREAKER_RESET', 30))
+    # Cloudinary lỗi -> lưu tạm vào storage local, worker upload lại (hàng đợi cloudinary_resync)
+    CLOUDINARY_FALLBACK_LOCAL = os.environ.get('CLOUDINARY_FALLBACK_LOCAL', '1') == '1'
+
+    # Storage local: file đặt tên theo sha256 nội dung, phục vụ tại STORAGE_LOCAL_URL/<ab>/<cd>/<sha256>.<ext>
+    STORAGE_LOCAL_DIR = os.environ.get('STORAGE_LOCAL_DIR', os.path.join(BASE_DIR, '..', 'instance', 'files'))
+    STORAGE_LOCAL_URL = os.environ.get('STORAGE_LOCAL_URL', '/files')
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '0') == '1'  # Để nginx/apache gửi file (X-Sendfile)
+
+    # Storage S3 / MinIO (cần boto3): S3_ENDPOINT_URL để trống nếu dùng AWS
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_PREFIX = os.environ.get('S3_PREFIX', 'media/')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+    S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')  # CDN trước bucket (mặc định: <endpoint>/<bucket>)
+
+    # Cách đăng ký trang admin:
+    # - eager: đăng ký ngay trong create_app (mặc định)
+    # - lazy:  chỉ load admin khi có request đầu tiên tới /admin (worker public khởi động nhanh hơn)
+    # - off:   không có admin (worker chỉ phục vụ trang public)
+    ADMIN_MODE = os.environ.get('ADMIN_MODE', 'eager')
+
+    # Thời gian cache danh sách danh mục trong mỗi worker (giây)
+    CATEGORY_CACHE_TTL = int(os.environ.get('CATEGORY_CACHE_TTL', 60))
+
+    # Đo thời gian request (header Server-Timing + trang /admin/perf)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1') == '1'
+    PROFILING_SAMPLES = int(os.environ.get('PROFILING_SAMPLES', 1000))  # Số request lưu cho mỗi endpoint
+    # Header Server-Timing cho mọi request (dev / benchmark); mặc định chỉ admin đã đăng nhập nhận được
+    PROFILING_SERVER_TIMING = os.environ.get('PROFILING_SERVER_TIMING', '0') == '1'
+    PROFILING_N_PLUS_ONE_THRESHOLD = 3  # Cùng 1 câu SQL lặp >= N lần trong 1 request -> nghi N+1
+
+    # Lazy-load relationship chưa eager-load -> raise lỗi (bật khi test/benchmark để bắt N+1, production để tắt)
+    ORM_RAISE_ON_LAZY_LOAD = os.environ.get('ORM_RAISE_ON_LAZY_LOAD', '0') == '1'
+
+    # Metrics Prometheus tại /metrics: yêu cầu header Authorization: Bearer <METRICS_TOKEN>;
+    # không đặt token thì /metrics không được mở (404), trừ khi METRICS_PUBLIC=1 (local / mạng nội bộ)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '0') == '1'
+
+    # Media picker / API media (/admin/api/media)
+    MEDIA_API_PAGE_SIZE = int(os.environ.get('MEDIA_API_PAGE_SIZE', 60))  # Số ảnh mỗi lần cuộn (tối đa 200)
+    MEDIA_THUMBNAIL_SIZE = int(os.environ.get('MEDIA_THUMBNAIL_SIZE', 300))  # Cạnh thumbnail (px)
+    MEDIA_GRID_PAGE_SIZE = int(os.environ.get('MEDIA_GRID_PAGE_SIZE', 120))  # Số ảnh mỗi lần tải của lưới media admin (tối đa 500)
+    MEDIA_SEO_STATS_TTL = int(os.environ.get('MEDIA_SEO_STATS_TTL', 300))  # Cache thống kê SEO trang media (giây)
+    MEDIA_ALBUMS_MAX_AGE = int(os.environ.get('MEDIA_ALBUMS_MAX_AGE', 60))  # Trình duyệt cache danh sách album (giây)
+
+    # Xóa ảnh Cloudinary / local theo lô sau khi commit (app/asset_cleanup.py)
+    ASSET_DELETE_BATCH_SIZE = int(os.environ.get('ASSET_DELETE_BATCH_SIZE', 100))  # Số ảnh mỗi lần xử lý hàng đợi
+    # Request xóa tự flush mỗi N giây (gọi Admin API + quét cột tham chiếu ngay trong request),
+    # mặc định -1: để thread nền JOBS_RUNNER_INTERVAL xử lý
+    ASSET_DELETE_FLUSH_SECONDS = int(os.environ.get('ASSET_DELETE_FLUSH_SECONDS', -1))
+    ASSET_GC_PREFIX = os.environ.get('ASSET_GC_PREFIX', 'enterprise/')  # Thư mục Cloudinary được quét tìm ảnh mồ côi
+
     # Pagination
     POSTS_PER_PAGE = 12
     BLOGS_PER_PAGE = 9
 
+    # Thao tác hàng loạt trong admin: số id mỗi câu UPDATE/DELETE
+    BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', 500))
+
+    # Import CSV/JSONL: số dòng mỗi lần INSERT
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 2000))
+
+    # Export CSV/JSONL/XLSX: số dòng đọc mỗi lần từ cursor (yield_per)
+    EXPORT_YIELD_PER = int(os.environ.get('EXPORT_YIELD_PER', 1000))
+
+    # Form liên hệ (app/contact_intake.py)
+    CONTACT_RATE_CAPACITY = int(os.environ.get('CONTACT_RATE_CAPACITY', 5))  # Số tin tối đa mỗi IP ...
+    CONTACT_RATE_PERIOD = int(os.environ.get('CONTACT_RATE_PERIOD', 600))  # ... trong bao nhiêu giây
+    CONTACT_DUPLICATE_WINDOW = int(os.environ.get('CONTACT_DUPLICATE_WINDOW', 3600))
+    CONTACT_MAX_LINKS = int(os.environ.get('CONTACT_MAX_LINKS', 2))
+    CONTACT_SPAM_KEYWORDS = ('casino', 'viagra', 'crypto', 'bitcoin', 'forex', 'backlink', 'seo service')
+    CONTACT_BATCH_SIZE = int(os.environ.get('CONTACT_BATCH_SIZE', 500))
+
+    # Token bucket: 'memory' (mỗi worker riêng) hoặc 'sqlite' (dùng chung giữa các worker)
+    RATELIMIT_STORAGE = os.environ.get('RATELIMIT_STORAGE', 'sqlite')
+    RATELIMIT_SQLITE_PATH = os.environ.get('RATELIMIT_SQLITE_PATH',
+                                           os.path.join(BASE_DIR, '..', 'instance', 'ratelimit.db'))
+
+    # Số proxy phía trước app (Render/nginx = 1) để lấy IP thật từ X-Forwarded-For. Để 0 sau proxy thì mọi
+    # khách cùng 1 IP (của proxy) -> dùng chung 1 token bucket của form liên hệ. gunicorn.conf.py mặc định 1;
+    # chỉ đặt khi thật sự có proxy phía trước (không có thì khách tự ghi X-Forwarded-For để đổi IP)
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+    # Sitemap / RSS dựng sẵn (app/sitemap.py)
+    SITE_URL = os.environ.get('SITE_URL')  # VD: https://ubvietnam.vn (bắt buộc để build sitemap / RSS)
+    SITEMAP_DIR = os.environ.get('SITEMAP_DIR', os.path.join(BASE_DIR, '..', 'instance', 'sitemaps'))
+    SITEMAP_SHARD_SIZE = int(os.environ.get('SITEMAP_SHARD_SIZE', 50000))  # Giới hạn của Google: 50k URL/file
+    SITEMAP_REFRESH_SECONDS = int(os.environ.get('SITEMAP_REFRESH_SECONDS', 3600))  # 0: chỉ build bằng CLI / cron
+
+    # Hàng đợi công việc nền (app/jobs.py)
+    JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(BASE_DIR, '..', 'instance', 'jobs'))
+    # Mỗi worker gunicorn drain các hàng đợi mỗi N giây (thread nền), 0: tắt (tự chạy flask jobs run --loop)
+    JOBS_RUNNER_INTERVAL = float(os.environ.get('JOBS_RUNNER_INTERVAL', 10))
+
     # SEO
     SITE_NAME = 'Công ty UB Việt Nam'
     SITE_DESCRIPTION = 'Website doanh nghiệp chuyên nghiệp về cát sấy UB'
@@ -0,0 +1,139 @@
+"""
+Nhận form liên hệ, chịu được bão request từ bot
+
+1. Token bucket theo IP (app/ratelimit.py): vượt giới hạn -> 429, không đụng DB
+2. Spam (honeypot, quá nhiều link, từ khóa cấm) -> báo thành công nhưng bỏ qua
+3. Trùng: fingerprint (email + nội dung đã chuẩn hóa) đã gặp trong CONTACT_DUPLICATE_WINDOW giây -> bỏ qua
+4. Hợp lệ -> INSERT ngay trong request (bot đã bị chặn ở bước 1-3 nên số INSERT bị giới hạn)
+   DB lỗi -> ghi vào hàng đợi 'contacts' (app/jobs.py) để không mất tin; hàng đợi được flush khi mở
+   trang admin liên hệ / dashboard, hoặc: flask --app run jobs run --queue contacts
+Số liên hệ chưa đọc được cộng vào counter (app/counters.py) cùng transaction INSERT.
+"""
+import hashlib
+import re
+from datetime import datetime
+from flask import current_app, request
+from app import db
+from app.models import Contact
+from app import counters
+from app.jobs import enqueue, drain
+from app.metrics import record_contact
+from app.ratelimit import get_store
+
+QUEUE = 'contacts'
+
+ACCEPTED = 'accepted'
+RATE_LIMITED = 'rate_limited'
+SPAM = 'spam'
+DUPLICATE = 'duplicate'
+
+FIELDS = ('name', 'email', 'phone', 'subject', 'message')
+_LINK_RE = re.compile(r'https?://|www\.', re.IGNORECASE)
+
+_proxy_warned = False
+
+
+def client_ip():
+    """IP người gửi (sau proxy cần đặt TRUSTED_PROXIES để lấy từ X-Forwarded-For)"""
+    global _proxy_warned
+    if not _proxy_warned and not current_app.config.get('TRUSTED_PROXIES') \
+            and request.headers.get('X-Forwarded-For'):
+        _proxy_warned = True
+        print("[Contact] Request đi qua proxy nhưng TRUSTED_PROXIES=0: mọi khách dùng chung 1 IP "
+              "trong giới hạn gửi form, hãy đặt TRUSTED_PROXIES")
+    return request.remote_addr or 'unknown'
+
+
+def allow_submission(ip):
+    """
+    Lấy 1 token của IP
+    Returns: (được phép?, số giây nên chờ)
+    """
+    config = current_app.config
+    allowed, retry_after = get_store().consume(
+        f'contact:{ip}', config.get('CONTACT_RATE_CAPACITY', 5), config.get('CONTACT_RATE_PERIOD', 600)
+    )
+    if not allowed:
+        record_contact(RATE_LIMITED)
+    return allowed, retry_after
+
+
+def fingerprint(data):
+    """Cùng email + cùng nội dung (bỏ qua hoa/thường, khoảng trắng) -> cùng fingerprint"""
+    email = (data.get('email') or '').strip().lower()
+    message = ' '.join((data.get('message') or '').lower().split())
+    return hashlib.sha1(f'{email}\x1f{message}'.encode('utf-8')).hexdigest()
+
+
+def spam_reason(data, honeypot=''):
+    """Lý do bị coi là spam (None nếu bình thường)"""
+    if honeypot:
+        return 'honeypot'
+    text = f"{data.get('subject') or ''} {data.get('message') or ''}"
+    if len(_LINK_RE.findall(text)) > current_app.config.get('CONTACT_MAX_LINKS', 2):
+        return 'links'
+    lower = text.lower()
+    for keyword in current_app.config.get('CONTACT_SPAM_KEYWORDS', ()):
+        if keyword in lower:
+            return 'keyword'
+    return None
+
+
+def submit_contact(data, ip, honeypot=''):
+    """
+    Nhận 1 form đã validate (chưa ghi DB)
+    Returns: ACCEPTED | SPAM | DUPLICATE (người gửi luôn thấy thông báo thành công)
+    """
+    config = current_app.config
+    data = {field: data.get(field) for field in FIELDS}
+
+    reason = spam_reason(data, honeypot)
+    if reason:
+        print(f"[Contact] Bỏ qua spam ({reason}) từ {ip}")
+        record_contact(SPAM)
+        return SPAM
+
+    if get_store().seen(fingerprint(data), config.get('CONTACT_DUPLICATE_WINDOW', 3600)):
+        record_contact(DUPLICATE)
+        return DUPLICATE
+
+    job = dict(data, created_at=datetime.utcnow().isoformat())
+    if process_contact_jobs([job]):
+        enqueue(QUEUE, job)
+    record_contact(ACCEPTED)
+    return ACCEPTED
+
+
+def flush_pending():
+    """INSERT các liên hệ đang chờ (bỏ qua nếu process khác đang flush)"""
+    return drain(QUEUE, batch_size=current_app.config.get('CONTACT_BATCH_SIZE', 500), blocking=False)
+
+
+def _parse_time(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+def process_contact_jobs(jobs):
+    """Handler hàng đợi 'contacts': 1 câu INSERT executemany + cập nhật counter, cùng 1 transaction"""
+    rows = [{
+        'name': (job.get('name') or '')[:100],
+        'email': (job.get('email') or '')[:120],
+        'phone': (job.get('phone') or None) and job['phone'][:20],
+        'subject': (job.get('subject') or None) and job['subject'][:200],
+        'message': job.get('message') or '',
+        'is_read': False,
+        'created_at': _parse_time(job.get('created_at')),
+    } for job in jobs]
+
+    try:
+        db.session.execute(db.insert(Contact), rows)
+        counters.adjust(counters.CONTACTS_UNREAD, len(rows))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"[Contact] Lỗi khi ghi {len(rows)} liên hệ: {e}")
+        return [dict(job, error=str(e)) for job in jobs]
+    return []
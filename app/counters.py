@@ -0,0 +1,46 @@
+"""
+Bộ đếm duy trì sẵn trong bảng counters (thay cho COUNT(*) mỗi lần mở trang admin)
+
+- adjust(name, delta): UPDATE counters SET value = value + delta, chạy trong cùng
+  transaction với thay đổi dữ liệu nên commit/rollback cùng nhau
+- Chưa có dòng counter -> đếm lại 1 lần bằng hàm trong COUNTERS rồi lưu
+- Lệch số (sửa DB bằng tay, ...): flask --app run counters recount
+"""
+from app import db
+from app.models import Counter, Contact
+
+CONTACTS_UNREAD = 'contacts_unread'
+
+# Tên counter -> hàm đếm lại từ dữ liệu gốc
+COUNTERS = {
+    CONTACTS_UNREAD: lambda: Contact.query.filter_by(is_read=False).count(),
+}
+
+
+def get(name):
+    """Giá trị hiện tại (1 lần đọc theo khóa chính)"""
+    value = db.session.query(Counter.value).filter_by(name=name).scalar()
+    if value is None:
+        value = recount(name)
+        db.session.commit()
+    return value
+
+
+def adjust(name, delta):
+    """Cộng/trừ counter, không commit (người gọi commit cùng thay đổi dữ liệu)"""
+    if not delta:
+        return
+    updated = db.session.query(Counter).filter_by(name=name).update(
+        {Counter.value: Counter.value + delta}, synchronize_session=False
+    )
+    if not updated:
+        # Lần đầu: đếm lại (đã gồm thay đổi trong transaction hiện tại)
+        recount(name)
+
+
+def recount(name):
+    """Đếm lại từ dữ liệu gốc và ghi vào counter (không commit)"""
+    value = COUNTERS[name]()
+    db.session.merge(Counter(name=name, value=value))
+    db.session.flush()
+    return value
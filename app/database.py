@@ -0,0 +1,137 @@
+"""
+Cấu hình engine/session SQLAlchemy:
+- event theo từng backend (PRAGMA SQLite, ...)
+- định tuyến SELECT của trang public sang read-replica (bind 'replica')
+- chế độ raise khi lazy-load relationship (ORM_RAISE_ON_LAZY_LOAD) để bắt N+1
+"""
+import time
+from flask import g, session, has_request_context, has_app_context, current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.orm import raiseload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = 'replica'
+
+
+# ==================== READ REPLICA ====================
+class RoutingSession(Session):
+    """
+    Session đọc từ replica khi request hiện tại cho phép (xem enable_replica_reads).
+    Mọi câu ghi (flush, UPDATE/DELETE, SELECT ... FOR UPDATE, SQL thô) đi vào primary,
+    và sau câu ghi đầu tiên thì các câu đọc tiếp theo trong session cũng vào primary
+    (đọc được ngay dữ liệu vừa ghi).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica_for(clause):
+            return self._db.engines[REPLICA_BIND]
+
+        if bind is None and not isinstance(clause, Select):
+            self._wrote_primary = True
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    @property
+    def wrote_primary(self):
+        """Session này đã ghi (hoặc chạy SQL không phải SELECT) vào primary chưa"""
+        return getattr(self, '_wrote_primary', False)
+
+    def _use_replica_for(self, clause):
+        return (
+            isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and not self._flushing
+            and not self.wrote_primary
+            and has_request_context()
+            and g.get('db_read_replica', False)
+            and REPLICA_BIND in self._db.engines
+        )
+
+
+def enable_replica_reads():
+    """
+    Cho phép request hiện tại đọc từ replica.
+    Bỏ qua nếu chưa cấu hình replica hoặc session người dùng vừa ghi dữ liệu (sticky primary).
+    """
+    if not current_app.config.get('SQLALCHEMY_BINDS', {}).get(REPLICA_BIND):
+        return
+    if session.get('db_primary_until', 0) > time.time():
+        return
+    g.db_read_replica = True
+
+
+def increment_on_primary(instance, column='views', amount=1):
+    """
+    UPDATE <column> = <column> + amount trực tiếp trên primary, ngoài session hiện tại:
+    không commit/expire các object đang render và không làm request chuyển sang đọc primary.
+    Giá trị trên object cũng được cộng (không đánh dấu dirty) để template hiển thị đúng.
+    updated_at giữ nguyên (không kích hoạt onupdate): lượt xem không phải là sửa nội dung,
+    nên lastmod sitemap / fingerprint cache không đổi sau mỗi lượt xem.
+    """
+    from app import db
+
+    model = type(instance)
+    table = model.__table__
+    values = {column: table.c[column] + amount}
+    if 'updated_at' in table.c:
+        values['updated_at'] = table.c.updated_at
+    with db.engines[None].begin() as connection:
+        connection.execute(table.update().where(table.c.id == instance.id).values(values))
+
+    set_committed_value(instance, column, (getattr(instance, column) or 0) + amount)
+
+
+def stick_to_primary():
+    """Sau khi ghi: các request tiếp theo của người dùng này đọc từ primary trong vài giây"""
+    if current_app.config.get('SQLALCHEMY_BINDS', {}).get(REPLICA_BIND):
+        session['db_primary_until'] = time.time() + current_app.config.get('REPLICA_STICKY_SECONDS', 10)
+
+
+# ==================== RAISE ON LAZY LOAD ====================
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _raise_on_lazy_load(orm_execute_state):
+    """
+    ORM_RAISE_ON_LAZY_LOAD=1: thêm raiseload('*') vào mọi câu SELECT ORM, nên truy cập
+    relationship chưa khai báo cách load (joinedload/selectinload/...) sẽ raise
+    InvalidRequestError thay vì âm thầm chạy thêm 1 query cho mỗi dòng.
+    Chỗ nào thật sự cần lazy-load thì ghi rõ .options(lazyload(...)) trong query.
+    Không ảnh hưởng relationship lazy='dynamic' (đó là query riêng, không phải lazy-load).
+    """
+    if not (has_app_context() and current_app.config.get('ORM_RAISE_ON_LAZY_LOAD')):
+        return
+    if (orm_execute_state.is_select
+            and not orm_execute_state.is_column_load
+            and not orm_execute_state.is_relationship_load):
+        orm_execute_state.statement = orm_execute_state.statement.options(raiseload('*'))
+
+
+# ==================== ENGINE EVENTS ====================
+def configure_engines(app):
+    """Gắn các event cần thiết cho mọi engine của app"""
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _sqlite_pragmas(
+                    app.config.get('SQLITE_JOURNAL_MODE'),
+                    app.config.get('SQLITE_SYNCHRONOUS')
+                ))
+
+
+def _sqlite_pragmas(journal_mode, synchronous):
+    """Tạo listener set PRAGMA cho mỗi kết nối SQLite mới"""
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if journal_mode:
+                cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+            if synchronous:
+                cursor.execute(f'PRAGMA synchronous={synchronous}')
+        finally:
+            cursor.close()
+
+    return on_connect
@@ -0,0 +1,92 @@
+"""
+Upload ảnh thẳng từ trình duyệt lên storage, không đi qua worker Flask
+
+1. POST /admin/api/direct-uploads/sign  JSON {filename, size, folder, album, default_alt_text, auto_alt_text}
+   -> {upload_url, fields, token}: fields do backend ký bằng secret của nó (Cloudinary: api_secret,
+   local: SECRET_KEY), gồm folder + public_id (tên file SEO) nên trình duyệt không đổi được nơi lưu
+2. Trình duyệt POST multipart (fields + file) thẳng lên upload_url
+   (Cloudinary: https://api.cloudinary.com/v1_1/<cloud>/image/upload, local: STORAGE_LOCAL_URL/_upload)
+3. POST /admin/api/direct-uploads/complete  JSON {token, result: JSON Cloudinary trả về}
+   -> kiểm tra token (ký bằng SECRET_KEY, hết hạn sau DIRECT_UPLOAD_TTL giây, đúng user) và chữ ký của
+   result (backend.verify_direct_upload), rồi tạo Media - URL / kích thước / định dạng do server tự lấy
+   (Cloudinary: Admin API, local: đọc file), không tin phần không được ký trong JSON của trình duyệt
+
+File lớn hơn DIRECT_UPLOAD_MAX_SIZE / backend không hỗ trợ (s3, static) -> trang upload dùng upload theo
+đoạn (app/chunked_uploads.py). Tắt hẳn: DIRECT_UPLOADS_ENABLED=0
+"""
+import os
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from app.storage import Storage, StorageError, get_storage, get_backend
+from app.utils import allowed_file, generate_seo_filename, upload_folder_path
+
+SALT = 'direct-upload'
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=SALT)
+
+
+def is_enabled():
+    """Upload thẳng bật và backend hiện tại hỗ trợ (Cloudinary / local)"""
+    if not current_app.config.get('DIRECT_UPLOADS_ENABLED', True):
+        return False
+    return type(get_storage()).direct_upload is not Storage.direct_upload
+
+
+def sign(filename, size, user_id, folder='general', album=None, alt_text=None):
+    """
+    Tham số upload đã ký cho 1 file
+    Returns: {'upload_url', 'fields', 'token', 'expires_in'}; StorageError nếu không upload thẳng được
+    """
+    max_size = current_app.config.get('DIRECT_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+    if not is_enabled():
+        raise StorageError('Upload thẳng từ trình duyệt đang tắt hoặc backend hiện tại không hỗ trợ')
+    if not filename or not allowed_file(filename):
+        raise StorageError('Định dạng file không được hỗ trợ')
+    if isinstance(size, int) and size > max_size:
+        raise StorageError(f'File lớn hơn {max_size // (1024 * 1024)}MB, dùng upload theo đoạn')
+
+    backend = get_storage()
+    seo_filename = generate_seo_filename(filename, alt_text)
+    upload = backend.direct_upload(upload_folder_path(folder, album), os.path.splitext(seo_filename)[0])
+    token = _serializer().dumps({
+        'backend': backend.name,
+        'fields': upload['fields'],
+        'user_id': user_id,
+        'filename': seo_filename,
+        'original_filename': os.path.basename(filename),
+        'album': album or None,
+        'alt_text': alt_text or None,
+    })
+    return dict(upload, token=token, expires_in=current_app.config.get('DIRECT_UPLOAD_TTL', 600))
+
+
+def complete(token, result, user_id):
+    """
+    Kiểm tra kết quả upload thẳng của trình duyệt
+    Returns: (file_info như save_upload_file, album, alt_text); StorageError nếu token / kết quả không hợp lệ
+    """
+    try:
+        data = _serializer().loads(token or '', max_age=current_app.config.get('DIRECT_UPLOAD_TTL', 600))
+    except SignatureExpired:
+        raise StorageError('Phiên upload đã hết hạn, hãy upload lại')
+    except BadSignature:
+        raise StorageError('Token upload không hợp lệ')
+    if data.get('user_id') != user_id:
+        raise StorageError('Token upload không hợp lệ')
+    if not isinstance(result, dict):
+        raise StorageError('Thiếu kết quả upload')
+
+    stored = get_backend(data['backend']).verify_direct_upload(result, data['fields'])
+    file_info = {
+        'filename': data['filename'],
+        'original_filename': data['original_filename'],
+        'filepath': stored.url,
+        'file_type': stored.format,
+        'file_size': stored.size,
+        'width': stored.width,
+        'height': stored.height,
+        'album': data['album'],
+    }
+    return file_info, data['album'], data['alt_text']
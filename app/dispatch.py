@@ -0,0 +1,37 @@
+"""
+WSGI middleware để load trang admin theo kiểu lazy (ADMIN_MODE = 'lazy')
+"""
+import threading
+
+
+class LazyAdminDispatcher:
+    """
+    Chuyển request /admin sang app đầy đủ (có admin blueprint).
+    App đầy đủ chỉ được tạo ở request /admin đầu tiên, nên worker chỉ phục vụ
+    trang public không phải import admin/routes.py và các thư viện đi kèm.
+    """
+
+    def __init__(self, public_wsgi_app, admin_app_factory, prefix='/admin'):
+        self.public_wsgi_app = public_wsgi_app
+        self.admin_app_factory = admin_app_factory
+        self.prefix = prefix
+        self._admin_app = None
+        self._lock = threading.Lock()
+
+    @property
+    def admin_loaded(self):
+        return self._admin_app is not None
+
+    def get_admin_app(self):
+        """Tạo app admin (một lần duy nhất, an toàn với nhiều thread)"""
+        if self._admin_app is None:
+            with self._lock:
+                if self._admin_app is None:
+                    self._admin_app = self.admin_app_factory()
+        return self._admin_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == self.prefix or path.startswith(self.prefix + '/'):
+            return self.get_admin_app()(environ, start_response)
+        return self.public_wsgi_app(environ, start_response)
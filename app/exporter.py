@@ -0,0 +1,278 @@
+"""
+Xuất liên hệ / sản phẩm / media ra file CSV, JSONL hoặc XLSX
+
+- Đọc DB bằng yield_per (server-side cursor trên PostgreSQL): chỉ giữ 1 nhóm
+  EXPORT_YIELD_PER dòng trong bộ nhớ, không load cả bảng
+- Ghi file dạng generator: trình duyệt nhận byte đầu tiên ngay, bộ nhớ không đổi
+  dù xuất 500k dòng
+- XLSX tự ghi bằng zipfile (SpreadsheetML tối giản, inline string),
+  không cần thêm thư viện openpyxl
+
+Dùng: /admin/export/<kind>?format=csv|jsonl|xlsx (xem admin.export_data)
+"""
+import csv
+import io
+import json
+import re
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+from app import db
+from app.models import Contact, Product, Category, Media, Album
+
+CHUNK_SIZE = 64 * 1024
+
+
+# ==================== CẤU HÌNH DỮ LIỆU XUẤT ====================
+def _contacts_query(filters):
+    query = db.select(
+        Contact.id, Contact.name, Contact.email, Contact.phone, Contact.subject,
+        Contact.message, Contact.is_read, Contact.created_at
+    ).order_by(Contact.id)
+    if filters.get('unread'):
+        query = query.where(Contact.is_read.is_(False))
+    return query
+
+
+def _products_query(filters):
+    query = db.select(
+        Product.id, Product.name, Product.slug, Product.price, Product.old_price,
+        Category.name.label('category'), Product.image, Product.image_alt_text, Product.is_featured,
+        Product.is_active, Product.views, Product.created_at, Product.updated_at
+    ).outerjoin(Category, Product.category_id == Category.id).order_by(Product.id)
+    if filters.get('category_id'):
+        query = query.where(Product.category_id == filters['category_id'])
+    return query
+
+
+def _media_query(filters):
+    query = db.select(
+        Media.id, Media.filename, Media.filepath, Media.album, Media.alt_text,
+        Media.title, Media.caption, Media.width, Media.height, Media.file_size,
+        Media.seo_score, Media.seo_grade, Media.created_at
+    ).order_by(Media.id)
+    if filters.get('album'):
+        query = query.where(Media.album_id == db.select(Album.id).where(Album.name == filters['album']).scalar_subquery())
+    return query
+
+
+EXPORT_KINDS = {
+    'contacts': {
+        'query': _contacts_query,
+        'headers': ['id', 'name', 'email', 'phone', 'subject', 'message', 'is_read', 'created_at'],
+        'filename': 'lien-he',
+    },
+    'products': {
+        'query': _products_query,
+        'headers': ['id', 'name', 'slug', 'price', 'old_price', 'category', 'image', 'image_alt_text',
+                    'is_featured', 'is_active', 'views', 'created_at', 'updated_at'],
+        'filename': 'san-pham',
+    },
+    'media': {
+        'query': _media_query,
+        'headers': ['id', 'filename', 'filepath', 'album', 'alt_text', 'title', 'caption', 'width',
+                    'height', 'file_size', 'seo_score', 'seo_grade', 'created_at'],
+        'filename': 'media-seo',
+    },
+}
+
+
+def iter_rows(kind, filters=None, yield_per=1000):
+    """
+    Đọc từng dòng (Row, truy cập được theo tên cột) theo cấu hình EXPORT_KINDS[kind]
+    yield_per: số dòng lấy mỗi lần từ cursor (PostgreSQL: stream_results, không buffer cả kết quả)
+    """
+    query = EXPORT_KINDS[kind]['query'](filters or {})
+    yield from db.session.execute(query.execution_options(yield_per=yield_per))
+
+
+# ==================== GHI FILE ====================
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    return str(value)
+
+
+# Chuỗi bắt đầu bằng các ký tự này bị Excel / LibreOffice hiểu là công thức (liên hệ là dữ liệu người ngoài gửi)
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _cell_text(value):
+    """Như _text, chuỗi có thể thành công thức được thêm ' phía trước (số âm giữ nguyên)"""
+    text = _text(value)
+    if isinstance(value, str) and text.startswith(_FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def iter_csv(headers, rows):
+    """CSV UTF-8 có BOM để Excel mở đúng tiếng Việt"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow([_cell_text(value) for value in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl(headers, rows):
+    """Mỗi dòng 1 object JSON, key theo headers"""
+    parts = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=_text) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+            size = 0
+    yield ''.join(parts).encode('utf-8')
+
+
+# Ký tự điều khiển không hợp lệ trong XML 1.0
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Data" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="styles.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="1"><xf/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+
+class _ChunkSink:
+    """File giả (chỉ ghi, không seek) cho zipfile: gom byte đã nén để generator yield ra"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_XML_INVALID.sub('', _cell_text(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def iter_xlsx(headers, rows):
+    """
+    XLSX 1 sheet, ghi nén dần từng đoạn (zipfile hỗ trợ ghi ra stream không seek được,
+    kích thước/CRC ghi ở data descriptor sau mỗi file)
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetData>' + _xlsx_row(headers)
+            ).encode('utf-8'))
+            for row in rows:
+                sheet.write(_xlsx_row(row).encode('utf-8'))
+                if sink.size >= CHUNK_SIZE:
+                    yield sink.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.take()
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson'),
+    'xlsx': (iter_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def build_export(kind, fmt, filters=None, yield_per=1000, extra_columns=None):
+    """
+    Chuẩn bị export (chưa đọc DB cho tới khi generator được lặp)
+    extra_columns: (headers, hàm(row) -> list giá trị) để thêm cột tính toán (vd: điểm SEO hiện tại)
+    Returns: (generator bytes, mimetype, tên file)
+    """
+    spec = EXPORT_KINDS[kind]
+    writer, mimetype = EXPORT_FORMATS[fmt]
+    headers = list(spec['headers'])
+    rows = iter_rows(kind, filters, yield_per)
+
+    if extra_columns:
+        extra_headers, compute = extra_columns
+        headers += extra_headers
+        rows = (tuple(row) + tuple(compute(row)) for row in rows)
+
+    filename = f"{spec['filename']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return writer(headers, rows), mimetype, filename
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, TextAreaField, FloatField, BooleanField, PasswordField, SelectField, SubmitField
 from wtforms.fields import DateField
 from wtforms.fields.numeric import IntegerField
@@ -45,6 +45,8 @@ class ContactForm(FlaskForm):
         DataRequired(message='Vui lòng nhập nội dung'),
         Length(min=10, message='Nội dung tối thiểu 10 ký tự')
     ])
+    # Honeypot: ô ẩn với người dùng, bot tự điền -> coi là spam (xem app/contact_intake.py)
+    website = StringField('Website', validators=[Optional()])
     submit = SubmitField('Gửi liên hệ')
 
 
@@ -238,3 +240,23 @@ class MediaSEOForm(FlaskForm):
     album = StringField('Album', validators=[Optional()])
     submit = SubmitField('Lưu thay đổi')
 
+
+
+# ==================== FORM THAO TÁC HÀNG LOẠT ====================
+class BulkActionForm(FlaskForm):
+    """Form thao tác hàng loạt trên trang danh sách (id gửi kèm qua các checkbox name="ids")"""
+    action = StringField('Thao tác', validators=[
+        DataRequired(message='Vui lòng chọn thao tác')
+    ])
+
+
+# ==================== FORM NHẬP DỮ LIỆU ====================
+class ImportForm(FlaskForm):
+    """Form nhập sản phẩm / bài viết từ file CSV hoặc JSONL"""
+    kind = SelectField('Loại dữ liệu', choices=[('products', 'Sản phẩm'), ('blogs', 'Tin tức')])
+    file = FileField('File CSV / JSONL', validators=[
+        FileRequired(message='Vui lòng chọn file'),
+        FileAllowed(['csv', 'jsonl', 'json', 'ndjson'], 'Chỉ chấp nhận file .csv hoặc .jsonl!')
+    ])
+    dry_run = BooleanField('Chạy thử (chỉ kiểm tra, không ghi dữ liệu)')
+    submit = SubmitField('Nhập dữ liệu')
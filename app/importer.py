@@ -0,0 +1,416 @@
+"""
+Nhập sản phẩm / bài viết hàng loạt từ file CSV hoặc JSONL
+
+- Đọc file từng dòng (không load cả file vào bộ nhớ)
+- Validate theo đúng rule của ProductForm / BlogForm (dùng lại validators của form)
+- Danh mục tra trong map dựng sẵn 1 lần (id, slug hoặc tên)
+- Ghi theo batch IMPORT_BATCH_SIZE dòng bằng 1 câu INSERT executemany, commit mỗi batch
+- Ảnh (URL) được đưa vào hàng đợi media_import (app/jobs.py) để upload lên Cloudinary
+  và thêm vào Media Library ở nền, không làm chậm quá trình import
+
+Dùng: flask --app run import-data products products.csv   hoặc trang /admin/import
+"""
+import csv
+import io
+import json
+import time
+from wtforms import Form
+from wtforms.fields.core import UnboundField
+from werkzeug.datastructures import MultiDict
+from app import db
+from app.models import Product, Blog, Category, Media
+from app.forms import ProductForm, BlogForm
+from app.utils import slugify, unique_slugs
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'x', 'có', 'co', 'on'}
+MEDIA_QUEUE = 'media_import'
+
+
+def _row_form(form_class, exclude):
+    """Form wtforms thường (không CSRF, không cần request) dùng lại các field + validators của form admin"""
+    fields = {}
+    for name in dir(form_class):
+        value = getattr(form_class, name, None)
+        if isinstance(value, UnboundField) and name not in exclude:
+            fields[name] = value
+    return type(f'{form_class.__name__}Row', (Form,), fields)
+
+
+# Cấu hình cho từng loại dữ liệu
+IMPORT_KINDS = {
+    'products': {
+        'model': Product,
+        'form': _row_form(ProductForm, exclude={'image', 'submit', 'category_id'}),
+        'name_field': 'name',
+        'booleans': {'is_featured': False, 'is_active': True},
+        'folder': 'products',
+    },
+    'blogs': {
+        'model': Blog,
+        'form': _row_form(BlogForm, exclude={'image', 'submit'}),
+        'name_field': 'title',
+        'booleans': {'is_featured': False, 'is_active': True},
+        'folder': 'blogs',
+    },
+}
+
+
+class ImportReport:
+    """Kết quả import: số dòng, số dòng lỗi (kèm lý do theo số dòng), tốc độ"""
+
+    def __init__(self, kind, dry_run=False, max_errors=1000):
+        self.kind = kind
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.processed = 0
+        self.inserted = 0
+        self.failed = 0
+        self.images_queued = 0
+        self.errors = []
+        self._started = time.perf_counter()
+        self.seconds = 0.0
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._started
+        return self
+
+    @property
+    def rows_per_sec(self):
+        elapsed = self.seconds or (time.perf_counter() - self._started)
+        return round(self.processed / elapsed, 1) if elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'dry_run': self.dry_run,
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'images_queued': self.images_queued,
+            'seconds': round(self.seconds, 2),
+            'rows_per_sec': self.rows_per_sec,
+            'errors': self.errors,
+        }
+
+
+# ==================== ĐỌC FILE ====================
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.jsonl') or name.endswith('.json') or name.endswith('.ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+def iter_records(stream, fmt):
+    """
+    Đọc từng bản ghi từ stream (binary hoặc text)
+    Yields: (số dòng, dict hoặc None, lỗi hoặc None)
+    """
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f'JSON không hợp lệ: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, 'Mỗi dòng phải là 1 object JSON'
+            continue
+        yield line_no, record, None
+
+
+# ==================== VALIDATE ====================
+def _category_map():
+    """id / slug / tên (chữ thường) -> category_id"""
+    mapping = {}
+    for category in Category.query.with_entities(Category.id, Category.slug, Category.name):
+        mapping[str(category.id)] = category.id
+        mapping[category.slug.lower()] = category.id
+        mapping[category.name.strip().lower()] = category.id
+    return mapping
+
+
+def _clean(record):
+    """Chuẩn hóa key (chữ thường, bỏ khoảng trắng) và value (chuỗi đã strip)"""
+    cleaned = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        if value is None:
+            value = ''
+        elif isinstance(value, bool):
+            value = '1' if value else ''
+        elif not isinstance(value, str):
+            value = str(value)
+        cleaned[key.strip().lower()] = value.strip()
+    return cleaned
+
+
+def validate_record(kind, record, categories, author=None):
+    """
+    Validate 1 dòng theo rule của form admin
+    author: tác giả mặc định cho bài viết không có cột author (như add_blog: user đang đăng nhập)
+    Returns: (values, errors, auto_slug) - values là dict cột -> giá trị để INSERT
+    """
+    spec = IMPORT_KINDS[kind]
+    record = _clean(record)
+    errors = []
+
+    auto_slug = not record.get('slug')
+    if auto_slug and record.get(spec['name_field']):
+        record['slug'] = slugify(record[spec['name_field']])
+
+    # Checkbox: giá trị "đúng" -> 'y', còn lại bỏ đi; thiếu cột -> dùng mặc định
+    for name, default in spec['booleans'].items():
+        if name in record:
+            truthy = record.pop(name).lower() in TRUE_VALUES
+        else:
+            truthy = default
+        if truthy:
+            record[name] = 'y'
+
+    form = spec['form'](formdata=MultiDict({k: v for k, v in record.items() if v != ''}))
+    if not form.validate():
+        for field, messages in form.errors.items():
+            errors.append(f'{field}: {"; ".join(messages)}')
+
+    values = {name: field.data for name, field in form._fields.items()}
+    for name, value in list(values.items()):
+        if isinstance(value, str):
+            values[name] = value.strip() or None
+
+    # Danh mục (sản phẩm)
+    if kind == 'products':
+        key = (record.get('category_id') or record.get('category') or '').lower()
+        category_id = categories.get(key)
+        if not category_id:
+            errors.append(f'category: không tìm thấy danh mục "{key}"' if key else 'category: Vui lòng chọn danh mục')
+        values['category_id'] = category_id
+        if record.get('image_alt_text'):
+            values['image_alt_text'] = record['image_alt_text'][:255]
+
+    # Ảnh: chỉ nhận URL http(s) hoặc đường dẫn /static/
+    image = record.get('image')
+    if image:
+        if image.startswith(('http://', 'https://', '/static/')):
+            values['image'] = image
+        else:
+            errors.append('image: phải là URL (http/https) hoặc đường dẫn /static/...')
+
+    if kind == 'blogs' and not errors:
+        # Giống add_blog: tác giả mặc định, tự điền meta từ title / excerpt, reading time, điểm SEO
+        values['author'] = values.get('author') or author
+        values['meta_title'] = values.get('meta_title') or (values.get('title') or '')[:70] or None
+        values['meta_description'] = values.get('meta_description') or (values.get('excerpt') or '')[:160] or None
+        blog = Blog(**values)
+        blog.calculate_reading_time()
+        blog.update_seo_score()
+        for name in ('word_count', 'reading_time', 'seo_score', 'seo_grade', 'seo_last_checked'):
+            values[name] = getattr(blog, name)
+
+    return values, errors, auto_slug
+
+
+# ==================== IMPORT ====================
+def import_records(kind, records, batch_size=2000, dry_run=False, progress=None, author=None):
+    """
+    Import từ iterator (số dòng, dict, lỗi) - xem iter_records
+    progress(report) được gọi sau mỗi batch, author: tác giả mặc định của bài viết
+    Returns: ImportReport
+    """
+    spec = IMPORT_KINDS[kind]
+    report = ImportReport(kind, dry_run=dry_run)
+    categories = _category_map() if kind == 'products' else {}
+    seen_slugs = set()
+    batch = []
+
+    for line_no, record, error in records:
+        report.processed += 1
+        if error:
+            report.add_error(line_no, error)
+            continue
+
+        values, errors, auto_slug = validate_record(kind, record, categories, author)
+        if errors:
+            report.add_error(line_no, ' | '.join(errors))
+            continue
+
+        batch.append((line_no, values, auto_slug))
+        if len(batch) >= batch_size:
+            _flush(spec, batch, report, seen_slugs)
+            batch = []
+            if progress:
+                progress(report)
+
+    if batch:
+        _flush(spec, batch, report, seen_slugs)
+    report.finish()
+    if progress:
+        progress(report)
+    return report
+
+
+def _flush(spec, batch, report, seen):
+    """
+    Kiểm tra trùng slug (1-2 query), INSERT executemany, đưa ảnh vào hàng đợi
+    seen: slug đã dùng ở các dòng trước trong file
+    """
+    model = spec['model']
+
+    # Slug nhập tay bị trùng -> lỗi; slug tự sinh -> thêm hậu tố -2, -3...
+    explicit = [values['slug'] for _, values, auto in batch if not auto]
+    taken = {row[0] for row in db.session.query(model.slug).filter(model.slug.in_(explicit))} if explicit else set()
+    auto_rows = [values for _, values, auto in batch if auto]
+    if auto_rows:
+        for values, slug in zip(auto_rows, unique_slugs(model, [v['slug'] for v in auto_rows])):
+            values['slug'] = slug
+
+    rows = []
+    for line_no, values, auto in batch:
+        slug = values['slug']
+        if not auto and (slug in taken or slug in seen):
+            report.add_error(line_no, f'slug: "{slug}" đã tồn tại')
+            continue
+        suffix = 2
+        while slug in seen:
+            slug = f"{values['slug']}-{suffix}"
+            suffix += 1
+        values['slug'] = slug
+        seen.add(slug)
+        rows.append((line_no, values))
+
+    # Chạy thử: chỉ đếm số dòng hợp lệ
+    if report.dry_run:
+        report.inserted += len(rows)
+        return
+    if not rows:
+        return
+
+    try:
+        db.session.execute(db.insert(model), [values for _, values in rows])
+        db.session.commit()
+        inserted = rows
+    except Exception:
+        db.session.rollback()
+        inserted = _insert_one_by_one(model, rows, report)
+
+    report.inserted += len(inserted)
+    _queue_images(spec, inserted, report)
+
+
+def _insert_one_by_one(model, rows, report):
+    """Batch lỗi (vd: trùng slug do import song song) -> chèn từng dòng để biết dòng nào lỗi"""
+    inserted = []
+    for line_no, values in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(model), [values])
+            inserted.append((line_no, values))
+        except Exception as e:
+            report.add_error(line_no, f'Lỗi khi ghi database: {str(e).splitlines()[0]}')
+    db.session.commit()
+    return inserted
+
+
+def _queue_images(spec, rows, report):
+    from app.jobs import enqueue_many
+
+    jobs = [{
+        'kind': spec['folder'],
+        'slug': values['slug'],
+        'url': values['image'],
+        'alt_text': values.get('image_alt_text') or values.get(spec['name_field']),
+    } for _, values in rows if values.get('image')]
+    enqueue_many(MEDIA_QUEUE, jobs)
+    report.images_queued += len(jobs)
+
+
+# ==================== XỬ LÝ ẢNH Ở NỀN ====================
+def process_media_jobs(jobs):
+    """
+    Handler hàng đợi media_import (thread nền của worker web hoặc: flask jobs run)
+    - URL ngoài: lưu vào storage đang dùng (Cloudinary tự tải từ URL, local / S3 tải về rồi lưu),
+      cập nhật ảnh của sản phẩm/bài viết
+    - Thêm vào Media Library nếu chưa có (URL nguồn đã import thì dùng lại ảnh đã lưu, theo Media.source_url)
+    Returns: list job lỗi
+    """
+    from app.storage import get_storage, locate
+    from app.metrics import observe_upload
+
+    models = {'products': Product, 'blogs': Blog}
+    urls = {job['url'] for job in jobs}
+    # URL nguồn -> URL đã lưu: ảnh đã import trước đó (theo source_url) hoặc URL đã nằm trong Media Library
+    stored_urls = dict(db.session.query(Media.source_url, Media.filepath).filter(Media.source_url.in_(urls)))
+    stored_urls.update((row[0], row[0]) for row in
+                       db.session.query(Media.filepath).filter(Media.filepath.in_(urls)))
+    failed = []
+
+    for job in jobs:
+        url = job['url']
+        model = models.get(job.get('kind'))
+        try:
+            stored_url = stored_urls.get(url)
+            if stored_url is None:
+                info = {'filepath': url, 'filename': url.rsplit('/', 1)[-1], 'width': None, 'height': None,
+                        'file_size': None}
+                if url.startswith('http') and locate(url)[0] is None:
+                    started = time.perf_counter()
+                    try:
+                        stored = get_storage().save_url(url, job.get('kind') or 'imports')
+                    except Exception:
+                        observe_upload(time.perf_counter() - started, ok=False)
+                        raise
+                    observe_upload(time.perf_counter() - started, ok=True)
+                    info = {
+                        'filepath': stored.url,
+                        'filename': stored.url.rsplit('/', 1)[-1],
+                        'width': stored.width,
+                        'height': stored.height,
+                        'file_size': stored.size,
+                    }
+
+                db.session.add(Media(
+                    filename=info['filename'],
+                    original_filename=url.rsplit('/', 1)[-1][:255],
+                    filepath=info['filepath'],
+                    source_url=url[:500],
+                    file_type='image',
+                    file_size=info['file_size'],
+                    width=info['width'],
+                    height=info['height'],
+                    alt_text=(job.get('alt_text') or '')[:255] or None,
+                    album=job.get('kind')
+                ))
+                stored_url = info['filepath']
+
+            # Mọi dòng dùng URL này đều trỏ sang ảnh đã lưu (kể cả khi ảnh đã có từ trước)
+            if model is not None and stored_url != url:
+                model.query.filter_by(slug=job['slug'], image=url).update(
+                    {model.image: stored_url}, synchronize_session=False
+                )
+            db.session.commit()
+            stored_urls[url] = stored_url
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Media import] {url}: {e}")
+            failed.append(dict(job, error=str(e)))
+
+    return failed
@@ -0,0 +1,234 @@
+"""
+Hàng đợi công việc nền dựa trên file JSONL (không cần Redis/Celery)
+
+- enqueue(queue, payload): ghi thêm 1 dòng JSON vào JOBS_DIR/<queue>.jsonl
+  (có khóa file nên nhiều worker gunicorn ghi cùng lúc vẫn an toàn)
+- drain(queue): đổi tên file hàng đợi sang .processing rồi xử lý theo batch,
+  job lỗi được ghi vào <queue>.failed.jsonl để xem lại / chạy lại
+- Chạy nền trong chính worker web: gunicorn.conf.py gọi start_runner() cho mỗi worker, thread này
+  drain các hàng đợi mỗi JOBS_RUNNER_INTERVAL giây (không chờ khóa: worker khác đang drain thì bỏ qua).
+  Hàng đợi nằm trên đĩa local (JOBS_DIR) nên phải xử lý trên cùng máy với web, không dùng service worker riêng
+- Chạy bằng lệnh: flask --app run jobs run [--queue media_import] [--loop]
+- Job lỗi: flask --app run jobs retry [--queue ...] đưa <queue>.failed.jsonl trở lại hàng đợi
+
+Handler của mỗi hàng đợi khai báo trong HANDLERS dạng "module:hàm",
+chỉ import khi cần để worker web không phải load code xử lý nền.
+"""
+import json
+import os
+import threading
+import time
+from importlib import import_module
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khóa trong process
+    fcntl = None
+
+# Tên hàng đợi -> handler(list payload) trả về list payload bị lỗi
+HANDLERS = {
+    'media_import': 'app.importer:process_media_jobs',
+    'contacts': 'app.contact_intake:process_contact_jobs',
+    'asset_deletes': 'app.asset_cleanup:process_delete_jobs',
+    'cloudinary_resync': 'app.cloudinary_client:process_resync_jobs',
+    'sitemap': 'app.sitemap:process_sitemap_jobs',
+}
+
+_local_lock = threading.Lock()
+
+
+def get_jobs_dir():
+    path = current_app.config['JOBS_DIR']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _queue_path(queue, suffix='jsonl'):
+    return os.path.join(get_jobs_dir(), f'{queue}.{suffix}')
+
+
+def _append(path, payloads):
+    if not payloads:
+        return
+    lines = ''.join(json.dumps(p, ensure_ascii=False, default=str) + '\n' for p in payloads)
+    with _local_lock:
+        while True:
+            with open(path, 'a', encoding='utf-8') as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    # File vừa bị drain() đổi tên trong lúc chờ khóa -> mở lại file mới
+                    if not os.path.exists(path) or os.fstat(f.fileno()).st_ino != os.stat(path).st_ino:
+                        continue
+                f.write(lines)
+                f.flush()
+                return
+
+
+def enqueue(queue, payload):
+    """Thêm 1 job vào hàng đợi"""
+    _append(_queue_path(queue), [payload])
+
+
+def enqueue_many(queue, payloads):
+    """Thêm nhiều job (1 lần ghi file)"""
+    _append(_queue_path(queue), payloads)
+
+
+def pending_count(queue):
+    """Số job đang chờ (đếm dòng, dùng cho trang admin/monitoring)"""
+    total = 0
+    for path in [_queue_path(queue)] + _processing_files(queue):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                total += sum(1 for _ in f)
+    return total
+
+
+def _processing_files(queue):
+    prefix = f'{queue}.processing.'
+    directory = get_jobs_dir()
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.startswith(prefix)]
+
+
+def _claim(queue):
+    """
+    Lấy toàn bộ job đang có: rename file hàng đợi (nguyên tử) để enqueue mới ghi sang file khác.
+    File .processing còn sót lại (process trước bị dừng giữa chừng) cũng được xử lý lại.
+    """
+    path = _queue_path(queue)
+    if os.path.exists(path):
+        claimed = f'{path[:-len(".jsonl")]}.processing.{int(time.time() * 1000)}.{os.getpid()}'
+        with _local_lock, open(path, 'a') as f:
+            # Chờ các lần ghi đang dở xong rồi mới đổi tên
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            os.replace(path, claimed)
+    return _processing_files(queue)
+
+
+def _read_jobs(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"[Jobs] Bỏ qua dòng lỗi trong {path}: {line[:100]}")
+
+
+def get_handler(queue):
+    module_name, func_name = HANDLERS[queue].split(':')
+    return getattr(import_module(module_name), func_name)
+
+
+def drain(queue, batch_size=100, blocking=True):
+    """
+    Xử lý hết job đang chờ của 1 hàng đợi
+    Chỉ 1 process drain 1 hàng đợi tại 1 thời điểm (khóa file <queue>.lock);
+    blocking=False: đang có process khác drain thì bỏ qua ngay (trả None)
+    Returns: dict processed, failed, seconds
+    """
+    handler = get_handler(queue)
+    started = time.perf_counter()
+    processed = failed = 0
+
+    with open(_queue_path(queue, 'lock'), 'a') as lock:
+        if fcntl:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+
+        for path in _claim(queue):
+            for batch in _batches(_read_jobs(path), batch_size):
+                failed_jobs = _run_batch(handler, batch)
+                processed += len(batch)
+                failed += len(failed_jobs)
+                _append(_queue_path(queue, 'failed.jsonl'), failed_jobs)
+            os.remove(path)
+
+    return {'processed': processed, 'failed': failed, 'seconds': round(time.perf_counter() - started, 2)}
+
+
+def failed_count(queue):
+    """Số job lỗi đang nằm trong <queue>.failed.jsonl"""
+    path = _queue_path(queue, 'failed.jsonl')
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+
+def retry_failed(queue):
+    """
+    Đưa các job lỗi của 1 hàng đợi trở lại hàng đợi (bỏ trường error)
+    Returns: số job được đưa lại
+    """
+    path = _queue_path(queue, 'failed.jsonl')
+    if not os.path.exists(path):
+        return 0
+    claimed = f'{path}.retry.{int(time.time() * 1000)}.{os.getpid()}'
+    with _local_lock, open(path, 'a') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        os.replace(path, claimed)
+
+    jobs = [{key: value for key, value in job.items() if key != 'error'} for job in _read_jobs(claimed)]
+    enqueue_many(queue, jobs)
+    os.remove(claimed)
+    return len(jobs)
+
+
+# ==================== CHẠY NỀN TRONG WORKER WEB ====================
+def start_runner(app):
+    """
+    Thread daemon drain các hàng đợi trong HANDLERS mỗi JOBS_RUNNER_INTERVAL giây (0: tắt)
+    Returns: thread đã chạy hoặc None
+    """
+    interval = app.config.get('JOBS_RUNNER_INTERVAL', 10)
+    if interval <= 0:
+        return None
+    thread = threading.Thread(target=_run_forever, args=(app, interval), name='jobs-runner', daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_forever(app, interval):
+    while True:
+        time.sleep(interval)
+        run_pending(app)
+
+
+def run_pending(app):
+    """Drain 1 lượt mọi hàng đợi (bỏ qua hàng đợi đang được process khác drain)"""
+    for queue in HANDLERS:
+        with app.app_context():
+            try:
+                result = drain(queue, blocking=False)
+            except Exception as e:
+                print(f"[Jobs] Lỗi khi chạy nền hàng đợi {queue}: {e}")
+                continue
+        if result and result['processed']:
+            print(f"[Jobs] {queue}: {result['processed']} job, {result['failed']} lỗi ({result['seconds']}s)")
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _run_batch(handler, batch):
+    try:
+        return handler(batch) or []
+    except Exception as e:
+        print(f"[Jobs] Lỗi khi xử lý batch {len(batch)} job: {e}")
+        return [dict(job, error=str(e)) for job in batch]
@@ -1,7 +1,11 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask import (Blueprint, render_template, request, flash, redirect, url_for, current_app,
+                   send_from_directory, abort, make_response)
 from app import db
-from app.models import Product, Category, Banner, Blog, FAQ, Contact
+from app.models import Product, Category, Banner, Blog, FAQ
 from app.forms import ContactForm
+from app.cache import get_active_categories
+from app.database import enable_replica_reads, increment_on_primary
+from app.query_profiles import BLOG_CARD, PRODUCT_CARD, PRODUCT_CARD_WITH_CATEGORY, PRODUCT_DETAIL
 from sqlalchemy import or_
 
 
@@ -9,6 +13,13 @@ from sqlalchemy import or_
 main_bp = Blueprint('main', __name__)
 
 
+@main_bp.before_request
+def route_reads_to_replica():
+    """GET/HEAD của trang public đọc từ replica (nếu có cấu hình)"""
+    if request.method in ('GET', 'HEAD'):
+        enable_replica_reads()
+
+
 # ==================== TRANG CHỦ ====================
 @main_bp.route('/')
 def index():
@@ -17,18 +28,18 @@ def index():
     banners = Banner.query.filter_by(is_active=True).order_by(Banner.order).all()
 
     # Lấy sản phẩm nổi bật (featured)
-    featured_products = Product.query.filter_by(
+    featured_products = Product.query.options(*PRODUCT_CARD).filter_by(
         is_featured=True,
         is_active=True
     ).limit(8).all()
 
     # Lấy sản phẩm mới nhất
-    latest_products = Product.query.filter_by(
+    latest_products = Product.query.options(*PRODUCT_CARD).filter_by(
         is_active=True
     ).order_by(Product.created_at.desc()).limit(8).all()
 
     # Lấy tin tức nổi bật
-    featured_blogs = Blog.query.filter_by(
+    featured_blogs = Blog.query.options(*BLOG_CARD).filter_by(
         is_featured=True,
         is_active=True
     ).limit(3).all()
@@ -56,8 +67,8 @@ def products():
     search = request.args.get('search', '')
     sort = request.args.get('sort', 'latest')
 
-    # Query cơ bản
-    query = Product.query.filter_by(is_active=True)
+    # Query cơ bản (chỉ các cột card cần, không load description/images; tên danh mục JOIN luôn)
+    query = Product.query.options(*PRODUCT_CARD_WITH_CATEGORY).filter_by(is_active=True)
 
     # Filter theo danh mục
     if category_id:
@@ -85,7 +96,7 @@ def products():
     )
 
     products = pagination.items
-    categories = Category.query.filter_by(is_active=True).all()
+    categories = get_active_categories()
 
     return render_template('products.html',
                            products=products,
@@ -99,14 +110,13 @@ def products():
 @main_bp.route('/product/<slug>')
 def product_detail(slug):
     """Trang chi tiết sản phẩm"""
-    product = Product.query.filter_by(slug=slug, is_active=True).first_or_404()
+    product = Product.query.options(*PRODUCT_DETAIL).filter_by(slug=slug, is_active=True).first_or_404()
 
-    # Tăng lượt xem
-    product.views += 1
-    db.session.commit()
+    # Tăng lượt xem (UPDATE nguyên tử trên primary)
+    increment_on_primary(product)
 
     # Lấy sản phẩm liên quan (cùng danh mục)
-    related_products = Product.query.filter(
+    related_products = Product.query.options(*PRODUCT_CARD).filter(
         Product.category_id == product.category_id,
         Product.id != product.id,
         Product.is_active == True
@@ -124,8 +134,8 @@ def blog():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
 
-    # Query
-    query = Blog.query.filter_by(is_active=True)
+    # Query (không load content đầy đủ, chỉ đoạn đầu cho bài chưa có excerpt)
+    query = Blog.query.options(*BLOG_CARD).filter_by(is_active=True)
 
     # Search
     if search:
@@ -149,7 +159,7 @@ def blog():
     blogs = pagination.items
 
     # Bài viết nổi bật sidebar
-    featured_blogs = Blog.query.filter_by(
+    featured_blogs = Blog.query.options(*BLOG_CARD).filter_by(
         is_featured=True,
         is_active=True
     ).limit(5).all()
@@ -166,12 +176,11 @@ def blog_detail(slug):
     """Trang chi tiết blog"""
     blog = Blog.query.filter_by(slug=slug, is_active=True).first_or_404()
 
-    # Tăng lượt xem
-    blog.views += 1
-    db.session.commit()
+    # Tăng lượt xem (UPDATE nguyên tử trên primary)
+    increment_on_primary(blog)
 
     # Bài viết liên quan
-    related_blogs = Blog.query.filter(
+    related_blogs = Blog.query.options(*BLOG_CARD).filter(
         Blog.id != blog.id,
         Blog.is_active == True
     ).order_by(Blog.created_at.desc()).limit(3).all()
@@ -185,20 +194,22 @@ def blog_detail(slug):
 @main_bp.route('/contact', methods=['GET', 'POST'])
 def contact():
     """Trang liên hệ"""
+    from app.contact_intake import client_ip, allow_submission, submit_contact
+
     form = ContactForm()
 
-    if form.validate_on_submit():
-        # Tạo contact mới
-        contact = Contact(
-            name=form.name.data,
-            email=form.email.data,
-            phone=form.phone.data,
-            subject=form.subject.data,
-            message=form.message.data
-        )
+    # Giới hạn số lần gửi theo IP trước cả khi validate (bot flood không chạm tới DB)
+    if request.method == 'POST':
+        allowed, retry_after = allow_submission(client_ip())
+        if not allowed:
+            flash('Bạn đã gửi quá nhiều tin nhắn, vui lòng thử lại sau ít phút.', 'warning')
+            response = make_response(render_template('contact.html', form=form), 429)
+            response.headers['Retry-After'] = str(int(retry_after) + 1)
+            return response
 
-        db.session.add(contact)
-        db.session.commit()
+    if form.validate_on_submit():
+        # Đưa vào hàng đợi, INSERT theo batch (spam / tin trùng bị bỏ qua nhưng vẫn báo thành công)
+        submit_contact(form.data, client_ip(), honeypot=form.website.data)
 
         flash('Cảm ơn bạn đã liên hệ! Chúng tôi sẽ phản hồi sớm nhất.', 'success')
         return redirect(url_for('main.contact'))
@@ -221,6 +232,56 @@ def faq():
     return render_template('faq.html', faqs=faqs)
 
 
+# ==================== SITEMAP / RSS ====================
+def send_prebuilt(filename, mimetype):
+    """
+    Trả file sitemap/RSS đã build sẵn (app/sitemap.py), có ETag / Last-Modified để crawler dùng 304
+    Không build trong request: chưa có file -> 404, file cũ -> worker hàng đợi 'sitemap' build lại
+    """
+    from app.sitemap import request_rebuild, get_sitemap_dir
+
+    request_rebuild()
+    return send_from_directory(get_sitemap_dir(), filename, mimetype=mimetype,
+                               max_age=current_app.config.get('SITEMAP_REFRESH_SECONDS') or 3600)
+
+
+@main_bp.route('/sitemap.xml')
+def sitemap_index():
+    """Sitemap index (trỏ tới các shard)"""
+    return send_prebuilt('sitemap.xml', 'application/xml')
+
+
+@main_bp.route('/sitemap-images.xml')
+def sitemap_images():
+    """Sitemap index cho ảnh sản phẩm / blog"""
+    return send_prebuilt('sitemap-images.xml', 'application/xml')
+
+
+@main_bp.route('/sitemaps/<name>.xml')
+def sitemap_shard(name):
+    """1 shard sitemap (tối đa SITEMAP_SHARD_SIZE URL)"""
+    if not name.startswith('sitemap-'):
+        abort(404)
+    return send_prebuilt(f'{name}.xml', 'application/xml')
+
+
+@main_bp.route('/blog/rss.xml')
+def blog_rss():
+    """RSS tin tức mới nhất"""
+    return send_prebuilt('rss.xml', 'application/rss+xml')
+
+
+@main_bp.route('/robots.txt')
+def robots_txt():
+    """robots.txt: chặn trang admin, khai báo sitemap (URL theo SITE_URL, không theo Host của request)"""
+    lines = ['User-agent: *', 'Disallow: /admin/']
+    site_url = (current_app.config.get('SITE_URL') or '').rstrip('/')
+    if site_url:
+        lines.append(f"Sitemap: {site_url}{url_for('main.sitemap_index')}")
+        lines.append(f"Sitemap: {site_url}{url_for('main.sitemap_images')}")
+    return current_app.response_class('\n'.join(lines) + '\n', mimetype='text/plain')
+
+
 # ==================== SEARCH ====================
 @main_bp.route('/search')
 def search():
@@ -231,13 +292,13 @@ def search():
         return redirect(url_for('main.index'))
 
     # Tìm sản phẩm
-    products = Product.query.filter(
+    products = Product.query.options(*PRODUCT_CARD).filter(
         Product.name.ilike(f'%{keyword}%'),
         Product.is_active == True
     ).limit(10).all()
 
     # Tìm blog
-    blogs = Blog.query.filter(
+    blogs = Blog.query.options(*BLOG_CARD).filter(
         or_(
             Blog.title.ilike(f'%{keyword}%'),
             Blog.excerpt.ilike(f'%{keyword}%')
@@ -0,0 +1,207 @@
+"""
+Media Library: tìm kiếm, URL thumbnail và phân trang cho media picker / API admin
+
+- Media.search_text = alt text + title + caption + tên file, bỏ dấu, chữ thường (slugify);
+  tự cập nhật khi thêm/sửa Media qua ORM (mapper event), thao tác theo tập gọi reindex_ids().
+  Tìm kiếm: mỗi từ khóa là 1 điều kiện LIKE '%từ-khóa%' trên cột này
+  (PostgreSQL: index trigram ix_media_search_text_trgm; SQLite: quét 1 cột ngắn)
+- Phân trang bằng cursor (id của dòng cuối trang trước): WHERE id < cursor ORDER BY id DESC,
+  tốn như nhau ở trang 1 hay trang 1000 (không OFFSET, không COUNT)
+- Thumbnail theo backend lưu ảnh (app/storage.py): Cloudinary -> URL biến đổi c_fill (resize + cache
+  trên CDN), storage local / S3 -> thumbnail tạo lúc upload, ảnh cũ trong static/uploads ->
+  <tên>_thumb<ext> nếu đã có (tạo bằng: flask --app run media thumbnails)
+- Lưới media admin: trang lớn (MEDIA_GRID_PAGE_SIZE) qua /admin/api/media/grid, trình duyệt
+  chỉ render các hàng đang thấy; lọc theo điểm SEO (tính trong Python) bằng cách quét tiếp
+  theo cursor tới khi đủ 1 trang
+- Dữ liệu cũ / INSERT theo batch không qua ORM: flask --app run media reindex
+"""
+import os
+from flask import current_app
+from sqlalchemy import event
+from app import db
+from app.models import Media
+from app.albums import filter_by_album
+from app.utils import slugify, create_thumbnail
+from app import storage
+
+SEARCH_FIELDS = ('alt_text', 'title', 'caption', 'original_filename', 'filename')
+
+# Cột cần để render 1 ô trong picker
+PICKER_COLUMNS = (
+    Media.id, Media.filename, Media.original_filename, Media.filepath, Media.width, Media.height,
+    Media.alt_text, Media.album,
+)
+
+# Cột cần để render 1 ô trong lưới media admin (thêm các cột tính điểm SEO)
+GRID_COLUMNS = PICKER_COLUMNS + (Media.title, Media.caption, Media.file_size)
+
+
+# ==================== TÌM KIẾM ====================
+def build_search_text(values):
+    """values: dict/Row có các field trong SEARCH_FIELDS -> chuỗi tìm kiếm đã chuẩn hóa (None nếu rỗng)"""
+    parts = (slugify(value) for value in (_get(values, field) for field in SEARCH_FIELDS) if value)
+    return ' '.join(part for part in parts if part) or None
+
+
+def _get(values, field):
+    return values.get(field) if isinstance(values, dict) else getattr(values, field, None)
+
+
+def search_terms(text):
+    """Từ khóa người dùng nhập -> list từ đã chuẩn hóa giống search_text"""
+    return [term for term in (slugify(word) for word in (text or '').split()) if term]
+
+
+def apply_search(query, text):
+    """Lọc query Media: search_text chứa mọi từ khóa"""
+    for term in search_terms(text):
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(Media.search_text.like(f'%{escaped}%', escape='\\'))
+    return query
+
+
+@event.listens_for(Media, 'before_insert')
+@event.listens_for(Media, 'before_update')
+def _update_search_text(mapper, connection, target):
+    target.search_text = build_search_text(target)
+
+
+def reindex_ids(ids, chunk_size=500):
+    """Tính lại search_text cho các media (sau UPDATE theo tập), không commit"""
+    columns = [Media.id] + [getattr(Media, field) for field in SEARCH_FIELDS]
+    for start in range(0, len(ids), chunk_size):
+        rows = db.session.query(*columns).filter(Media.id.in_(ids[start:start + chunk_size])).all()
+        db.session.bulk_update_mappings(Media, [
+            {'id': row.id, 'search_text': build_search_text(row)} for row in rows
+        ])
+
+
+def reindex_all(batch_size=1000):
+    """Tính lại search_text cho toàn bộ bảng media theo từng batch id, commit mỗi batch. Returns: số dòng"""
+    columns = [Media.id] + [getattr(Media, field) for field in SEARCH_FIELDS]
+    last_id = 0
+    total = 0
+    while True:
+        rows = db.session.query(*columns).filter(Media.id > last_id).order_by(Media.id).limit(batch_size).all()
+        if not rows:
+            return total
+        db.session.bulk_update_mappings(Media, [
+            {'id': row.id, 'search_text': build_search_text(row)} for row in rows
+        ])
+        db.session.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+
+
+# ==================== URL ====================
+def media_url(filepath):
+    """URL hiển thị được: giữ nguyên URL tuyệt đối / file của storage local, đường dẫn cũ -> /static/..."""
+    if not filepath:
+        return ''
+    if filepath.startswith(('http://', 'https://')):
+        return filepath
+    if not filepath.startswith('/'):
+        filepath = '/' + filepath
+    local_prefix = current_app.config.get('STORAGE_LOCAL_URL', '/files').rstrip('/') + '/'
+    if not filepath.startswith(('/static/', local_prefix)):
+        filepath = '/static' + filepath
+    return filepath
+
+
+def thumbnail_url(filepath, size=None):
+    """
+    URL ảnh nhỏ cho lưới media (size x size) theo backend lưu ảnh (app/storage.py)
+    - Cloudinary: chèn c_fill,w_<size>,h_<size>,q_auto,f_auto sau /upload/
+    - local / S3: thumbnail tạo lúc upload; static/uploads cũ: <tên>_thumb<ext> nếu đã tạo, không thì ảnh gốc
+    """
+    size = size or current_app.config.get('MEDIA_THUMBNAIL_SIZE', 300)
+    return storage.thumbnail_url(media_url(filepath), size)
+
+
+def preview_url(filepath, width=800):
+    """URL ảnh xem trước (trang sửa media): Cloudinary thu nhỏ về tối đa `width` px, không cắt; còn lại giữ nguyên"""
+    return storage.preview_url(media_url(filepath), width)
+
+
+def local_path(filepath):
+    """Đường dẫn file trên đĩa của ảnh local (/static/...), None nếu là ảnh remote"""
+    url = media_url(filepath)
+    if not url.startswith('/static/'):
+        return None
+    return os.path.join(current_app.static_folder, url[len('/static/'):])
+
+
+def generate_thumbnails(batch_size=1000, force=False):
+    """
+    Tạo <tên>_thumb<ext> (create_thumbnail) cho mọi ảnh cũ trong static/uploads chưa có thumbnail
+    Returns: {'created': số thumbnail mới, 'failed': số file lỗi / không còn trên đĩa}
+    """
+    size = current_app.config.get('MEDIA_THUMBNAIL_SIZE', 300)
+    result = {'created': 0, 'failed': 0}
+    last_id = 0
+    while True:
+        rows = db.session.query(Media.id, Media.filepath).filter(
+            Media.id > last_id, ~Media.filepath.like('http%')
+        ).order_by(Media.id).limit(batch_size).all()
+        if not rows:
+            return result
+        last_id = rows[-1].id
+        for row in rows:
+            path = local_path(row.filepath)
+            if not path:
+                continue
+            name, ext = os.path.splitext(path)
+            if not force and os.path.exists(f'{name}_thumb{ext}'):
+                continue
+            if os.path.exists(path) and create_thumbnail(path, size=(size, size)):
+                result['created'] += 1
+            else:
+                result['failed'] += 1
+
+
+# ==================== PHÂN TRANG ====================
+def page(album=None, search=None, cursor=None, limit=60, columns=PICKER_COLUMNS, keep=None, max_scan=5000):
+    """
+    1 trang media mới nhất trước (theo id giảm dần)
+    cursor: id của dòng cuối trang trước (None: trang đầu)
+    keep: hàm lọc thêm trong Python (vd. theo điểm SEO) -> quét tiếp từng batch tới khi đủ `limit` dòng
+          hoặc đã quét max_scan dòng (khi đó trả trang thiếu + cursor để trình duyệt quét tiếp)
+    Returns: (list Row theo `columns`, cursor trang sau hoặc None nếu hết)
+    """
+    query = db.session.query(*columns)
+    if album:
+        query = filter_by_album(query, album)
+    if search:
+        query = apply_search(query, search)
+
+    rows = []
+    scanned = 0
+    while True:
+        batch_query = query.filter(Media.id < cursor) if cursor else query
+        batch = batch_query.order_by(Media.id.desc()).limit(limit + 1).all()
+        for row in batch:
+            if keep is None or keep(row):
+                if len(rows) == limit:
+                    return rows, rows[-1].id
+                rows.append(row)
+        if len(batch) <= limit:
+            return rows, None
+        cursor = batch[-1].id
+        scanned += len(batch)
+        if scanned >= max_scan:
+            return rows, cursor
+
+
+def serialize(row, thumb_size=None):
+    """1 dòng PICKER_COLUMNS -> dict JSON cho picker / lưới media"""
+    return {
+        'id': row.id,
+        'filename': row.filename,
+        'original_filename': row.original_filename or row.filename,
+        'filepath': media_url(row.filepath),
+        'thumbnail': thumbnail_url(row.filepath, thumb_size),
+        'width': row.width or 0,
+        'height': row.height or 0,
+        'alt_text': row.alt_text or '',
+        'album': row.album or '',
+    }
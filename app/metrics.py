@@ -0,0 +1,218 @@
+"""
+Metrics kiểu Prometheus tại /metrics
+
+- Thời gian xử lý request theo endpoint (main.index, main.product_detail, admin.media, ...)
+- Thời gian chờ lấy kết nối từ pool DB, số kết nối đang dùng
+- Tỉ lệ hit/miss của cache trong app (app/cache.py)
+- Thời gian upload Cloudinary, số lần upload/xóa thành công/lỗi
+- Từng lần gọi Cloudinary (app/cloudinary_client.py): thời gian theo kết quả, số lần thử lại,
+  trạng thái circuit breaker, số ảnh phải lưu tạm ở storage local
+- Số lần tính lại điểm SEO
+- Số form liên hệ nhận được theo kết quả (accepted / rate_limited / spam / duplicate)
+
+/metrics chỉ được đăng ký khi có METRICS_TOKEN (Prometheus gửi Authorization: Bearer <token>),
+hoặc đặt METRICS_PUBLIC=1 khi chạy local / sau mạng nội bộ; không có thì /metrics trả 404.
+
+Khi chạy nhiều worker gunicorn, đặt PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py đã đặt sẵn)
+để số liệu của các worker được gộp lại qua thư mục chia sẻ.
+Các hàm record_*/observe_* không làm gì nếu METRICS_ENABLED tắt.
+"""
+import os
+import threading
+import time
+from flask import g, request, Response, current_app, abort
+
+_metrics = None
+_lock = threading.Lock()
+_endpoint_notice_shown = False
+
+
+def _create_metrics():
+    """Tạo các metric (1 lần cho mỗi process)"""
+    from prometheus_client import Counter, Histogram, Gauge
+
+    return {
+        'request_latency': Histogram(
+            'http_request_duration_seconds', 'Thời gian xử lý request',
+            ['endpoint', 'method']
+        ),
+        'requests': Counter(
+            'http_requests_total', 'Số request', ['endpoint', 'method', 'status']
+        ),
+        'pool_checkout': Histogram(
+            'db_pool_checkout_seconds', 'Thời gian chờ lấy kết nối DB từ pool', ['bind'],
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+        ),
+        'pool_checked_out': Gauge(
+            'db_pool_checked_out', 'Số kết nối DB đang được dùng', ['bind'],
+            multiprocess_mode='livesum'
+        ),
+        'cache': Counter(
+            'app_cache_requests_total', 'Số lần đọc cache trong app', ['cache', 'result']
+        ),
+        'upload_latency': Histogram(
+            'cloudinary_upload_seconds', 'Thời gian upload lên Cloudinary',
+            buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+        ),
+        'storage_ops': Counter(
+            'cloudinary_operations_total', 'Số thao tác Cloudinary', ['operation', 'result']
+        ),
+        'cloudinary_latency': Histogram(
+            'cloudinary_request_seconds', 'Thời gian 1 lần gọi Cloudinary', ['operation', 'result'],
+            buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30)
+        ),
+        'cloudinary_retries': Counter(
+            'cloudinary_retries_total', 'Số lần thử lại khi gọi Cloudinary lỗi', ['operation']
+        ),
+        'cloudinary_circuit': Gauge(
+            'cloudinary_circuit_state', 'Circuit breaker Cloudinary: 0 đóng, 1 nửa mở, 2 mở',
+            multiprocess_mode='livemax'
+        ),
+        'storage_fallback': Counter(
+            'storage_fallback_total', 'Số ảnh lưu tạm ở storage local vì Cloudinary lỗi', ['result']
+        ),
+        'seo_rescore': Counter(
+            'seo_score_calculations_total', 'Số lần tính điểm SEO', ['kind']
+        ),
+        'contact_submissions': Counter(
+            'contact_submissions_total', 'Số form liên hệ gửi lên', ['result']
+        ),
+    }
+
+
+def init_metrics(app):
+    """Đăng ký endpoint /metrics và các hook đo request (bật/tắt bằng METRICS_ENABLED)"""
+    global _metrics
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    with _lock:
+        if _metrics is None:
+            _metrics = _create_metrics()
+
+    _instrument_pools(app)
+
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None and request.endpoint != 'static':
+            endpoint = request.endpoint or 'unknown'
+            _metrics['request_latency'].labels(endpoint, request.method).observe(time.perf_counter() - start)
+            _metrics['requests'].labels(endpoint, request.method, str(response.status_code)).inc()
+        return response
+
+    # Không có token: chỉ mở /metrics khi được cho phép rõ ràng (số liệu nội bộ, không để public)
+    global _endpoint_notice_shown
+    if app.config.get('METRICS_TOKEN') or app.config.get('METRICS_PUBLIC'):
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
+    elif not _endpoint_notice_shown:
+        _endpoint_notice_shown = True
+        print("[Metrics] Chưa đặt METRICS_TOKEN: không mở /metrics (METRICS_PUBLIC=1 để mở không cần token)")
+
+
+def metrics_view():
+    """Xuất metrics theo định dạng Prometheus (gộp các worker nếu có PROMETHEUS_MULTIPROC_DIR)"""
+    from prometheus_client import CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def _instrument_pools(app):
+    """
+    Đo thời gian lấy kết nối từ pool (chờ kết nối rảnh, hoặc mở kết nối mới khi pool chưa đầy)
+    và số kết nối đang dùng
+    """
+    from sqlalchemy import event
+    from app import db
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            label = bind or 'default'
+            gauge = _metrics['pool_checked_out'].labels(label)
+            event.listen(engine.pool, 'checkout', lambda *args, _g=gauge: _g.inc())
+            event.listen(engine.pool, 'checkin', lambda *args, _g=gauge: _g.dec())
+            _time_raw_connection(engine, _metrics['pool_checkout'].labels(label))
+
+
+def _time_raw_connection(engine, histogram):
+    """
+    Bọc engine.raw_connection (= pool.connect(), mọi Connection / Session đều lấy kết nối qua đây).
+    Gắn trên engine chứ không trên pool vì engine.dispose() (sau fork) thay pool mới.
+    """
+    if getattr(engine, '_metrics_timed', False):
+        return
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    engine.raw_connection = timed_raw_connection
+    engine._metrics_timed = True
+
+
+# ==================== HÀM GHI SỐ LIỆU ====================
+def record_cache(cache_name, hit):
+    if _metrics is not None:
+        _metrics['cache'].labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+def observe_upload(seconds, ok):
+    if _metrics is not None:
+        _metrics['upload_latency'].observe(seconds)
+        _metrics['storage_ops'].labels('upload', 'ok' if ok else 'error').inc()
+
+
+def record_delete(ok):
+    if _metrics is not None:
+        _metrics['storage_ops'].labels('delete', 'ok' if ok else 'error').inc()
+
+
+def observe_cloudinary(operation, seconds, result):
+    """result: ok / client_error (Cloudinary trả 4xx) / error (mạng, timeout, 5xx) / rejected (breaker mở)"""
+    if _metrics is not None:
+        _metrics['cloudinary_latency'].labels(operation, result).observe(seconds)
+
+
+def record_cloudinary_retry(operation):
+    if _metrics is not None:
+        _metrics['cloudinary_retries'].labels(operation).inc()
+
+
+def set_cloudinary_circuit(state):
+    if _metrics is not None:
+        _metrics['cloudinary_circuit'].set(state)
+
+
+def record_storage_fallback(result):
+    """result: saved (đã lưu local) / resynced (đã upload lại lên Cloudinary)"""
+    if _metrics is not None:
+        _metrics['storage_fallback'].labels(result).inc()
+
+
+def record_seo_rescore(kind):
+    if _metrics is not None:
+        _metrics['seo_rescore'].labels(kind).inc()
+
+
+def record_contact(result):
+    if _metrics is not None:
+        _metrics['contact_submissions'].labels(result).inc()
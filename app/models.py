@@ -140,6 +140,9 @@ class Blog(db.Model):
     seo_grade = db.Column(db.String(5), default='F')
     seo_last_checked = db.Column(db.DateTime)
 
+    # Đoạn đầu của content, chỉ có giá trị khi query dùng profile BLOG_CARD (app/query_profiles.py)
+    content_preview = db.query_expression()
+
     def calculate_reading_time(self):
         """Tính thời gian đọc dựa trên số từ (200 từ/phút)"""
         if self.content:
@@ -220,15 +223,48 @@ class Contact(db.Model):
         return f'<Contact {self.name} - {self.email}>'
 
 
+# ==================== COUNTER MODEL ====================
+class Counter(db.Model):
+    """Bộ đếm được cập nhật cùng transaction với dữ liệu (vd: số liên hệ chưa đọc), xem app/counters.py"""
+    __tablename__ = 'counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<Counter {self.name}={self.value}>'
+
+
+# ==================== ALBUM MODEL ====================
+class Album(db.Model):
+    """Album ảnh trong Media Library, số file được duy trì sẵn (xem app/albums.py)"""
+    __tablename__ = 'albums'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    media_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Album {self.name} ({self.media_count})>'
+
+
 # ==================== MEDIA MODEL ====================
 class Media(db.Model):
     """Model quản lý hình ảnh/media files với SEO optimization"""
     __tablename__ = 'media'
+    __table_args__ = (
+        # Tìm kiếm LIKE '%...%' trong media picker: PostgreSQL dùng index trigram (pg_trgm)
+        db.Index('ix_media_search_text_trgm', 'search_text', postgresql_using='gin',
+                 postgresql_ops={'search_text': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
     original_filename = db.Column(db.String(255))
     filepath = db.Column(db.String(500), nullable=False)
+    # URL gốc của ảnh import từ URL ngoài (app/importer.py): import lại cùng URL thì dùng lại ảnh đã lưu
+    source_url = db.Column(db.String(500), index=True)
     file_type = db.Column(db.String(50))
     file_size = db.Column(db.Integer)
     width = db.Column(db.Integer)
@@ -240,8 +276,13 @@ class Media(db.Model):
     caption = db.Column(db.Text)
 
     # Organization
+    # album_id là nguồn chính; album giữ bản sao tên album để hiển thị / export / đặt folder Cloudinary
+    album_id = db.Column(db.Integer, db.ForeignKey('albums.id'), index=True)
     album = db.Column(db.String(100))
 
+    # alt/title/caption/tên file đã bỏ dấu, chữ thường - tự cập nhật khi lưu (xem app/media_library.py)
+    search_text = db.Column(db.Text)
+
     # ✅ THÊM 3 FIELD NÀY ĐỂ LƯU ĐIỂM SEO
     seo_score = db.Column(db.Integer, default=0)
     seo_grade = db.Column(db.String(5), default='F')
@@ -295,6 +336,11 @@ class Media(db.Model):
         return current_result
 
 
+# Extension pg_trgm cho index ix_media_search_text_trgm (chỉ PostgreSQL)
+db.event.listen(Media.__table__, 'before_create',
+                db.DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+
 # ==================== HELPER FUNCTIONS ====================
 def get_media_by_image_url(image_url):
     """
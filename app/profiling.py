@@ -0,0 +1,186 @@
+"""
+Đo thời gian xử lý từng request: số câu SQL, thời gian SQL, thời gian render template, kích thước response
+
+- Kết quả mỗi request được trả về trong header Server-Timing (xem được trong DevTools của trình duyệt),
+  chỉ cho admin đã đăng nhập hoặc khi bật PROFILING_SERVER_TIMING (dev / benchmark) - khách không thấy
+- Tổng hợp theo endpoint (p50/p95/p99) tại trang /admin/perf
+- Câu SQL giống hệt nhau lặp lại nhiều lần trong 1 request được đánh dấu là nghi N+1
+
+Số liệu lưu trong bộ nhớ của từng worker (mỗi worker gunicorn có số liệu riêng).
+"""
+import math
+import threading
+import time
+from collections import Counter, deque
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+
+class PerfStats:
+    """Lưu N request gần nhất của mỗi endpoint và các câu SQL nghi N+1"""
+
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._n_plus_one = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, sample, repeated_statements):
+        with self._lock:
+            if endpoint not in self._samples:
+                self._samples[endpoint] = deque(maxlen=self.max_samples)
+                self._n_plus_one[endpoint] = Counter()
+            self._samples[endpoint].append(sample)
+            for statement, count in repeated_statements.items():
+                # Lưu số lần lặp lớn nhất từng thấy trong 1 request
+                if count > self._n_plus_one[endpoint][statement]:
+                    self._n_plus_one[endpoint][statement] = count
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._n_plus_one.clear()
+
+    def summary(self):
+        """Thống kê theo endpoint, endpoint chậm nhất (p95) lên đầu"""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+            n_plus_one = {name: counter.most_common(3) for name, counter in self._n_plus_one.items()}
+
+        rows = []
+        for endpoint, samples in snapshot.items():
+            totals = [s['total_ms'] for s in samples]
+            count = len(samples)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': count,
+                'p50_ms': percentile(totals, 50),
+                'p95_ms': percentile(totals, 95),
+                'p99_ms': percentile(totals, 99),
+                'avg_sql_count': round(sum(s['sql_count'] for s in samples) / count, 1),
+                'avg_sql_ms': round(sum(s['sql_ms'] for s in samples) / count, 2),
+                'avg_template_ms': round(sum(s['template_ms'] for s in samples) / count, 2),
+                'avg_size_kb': round(sum(s['size'] for s in samples) / count / 1024, 1),
+                'n_plus_one': n_plus_one.get(endpoint, [])
+            })
+
+        rows.sort(key=lambda r: r['p95_ms'], reverse=True)
+        return rows
+
+
+def percentile(values, pct):
+    """Percentile theo nearest-rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 2)
+
+
+perf_stats = PerfStats()
+
+
+def init_profiling(app):
+    """Đăng ký các hook đo thời gian cho app (bật/tắt bằng PROFILING_ENABLED)"""
+    if not app.config.get('PROFILING_ENABLED', True):
+        return
+
+    from app import db
+
+    perf_stats.max_samples = app.config.get('PROFILING_SAMPLES', 1000)
+    threshold = app.config.get('PROFILING_N_PLUS_ONE_THRESHOLD', 3)
+    server_timing = app.config.get('PROFILING_SERVER_TIMING', False)
+
+    # ---- SQL ----
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    # ---- Template ----
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    # ---- Request ----
+    @app.before_request
+    def start_request_timer():
+        g.perf = {
+            'start': time.perf_counter(),
+            'sql_count': 0,
+            'sql_ms': 0.0,
+            'template_ms': 0.0,
+            'template_stack': [],
+            'statements': Counter()
+        }
+
+    @app.after_request
+    def finish_request_timer(response):
+        perf = g.get('perf')
+        if perf is None:
+            return response
+
+        total_ms = (time.perf_counter() - perf['start']) * 1000
+        # Response dạng stream (export) không đo được kích thước: gọi calculate_content_length sẽ đọc hết body vào bộ nhớ
+        size = (response.calculate_content_length() or 0) if response.is_sequence else 0
+
+        if server_timing or _is_admin(app):
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={perf["sql_ms"]:.2f};desc="{perf["sql_count"]} queries"',
+                f'tpl;dur={perf["template_ms"]:.2f};desc="Template"',
+                f'total;dur={total_ms:.2f};desc="Total"'
+            ])
+
+        endpoint = request.endpoint or 'unknown'
+        if endpoint != 'static':
+            repeated = {sql: n for sql, n in perf['statements'].items() if n >= threshold}
+            perf_stats.record(endpoint, {
+                'total_ms': total_ms,
+                'sql_count': perf['sql_count'],
+                'sql_ms': perf['sql_ms'],
+                'template_ms': perf['template_ms'],
+                'size': size
+            }, repeated)
+
+        return response
+
+
+def _is_admin(app):
+    """Admin đã đăng nhập (request không có cookie session thì không tải user / không đụng session)"""
+    if g.get('_login_user') is None and app.config.get('SESSION_COOKIE_NAME', 'session') not in request.cookies:
+        return False
+    from flask_login import current_user
+    return bool(current_user.is_authenticated and current_user.is_admin)
+
+
+def _current_perf():
+    return g.get('perf') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._perf_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    perf = _current_perf()
+    start = getattr(context, '_perf_start', None)
+    if perf is None or start is None:
+        return
+    perf['sql_count'] += 1
+    perf['sql_ms'] += (time.perf_counter() - start) * 1000
+    perf['statements'][statement] += 1
+
+
+def _before_render(sender, template, context, **extra):
+    perf = _current_perf()
+    if perf is not None:
+        perf['template_stack'].append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    perf = _current_perf()
+    if perf is not None and perf['template_stack']:
+        started = perf['template_stack'].pop()
+        # Chỉ cộng lần render ngoài cùng (tránh cộng trùng khi render lồng nhau)
+        if not perf['template_stack']:
+            perf['template_ms'] += (time.perf_counter() - started) * 1000
@@ -0,0 +1,84 @@
+"""
+Profile cột cho các query danh sách (load_only / with_expression)
+
+Trang danh sách chỉ render card/dòng bảng nên không cần các cột Text nặng
+(Blog.content 50-200 KB/bài, Product.description, Product.images). Mỗi profile
+liệt kê đúng các cột template danh sách dùng tới (kể cả cột mà get_media_seo_info đọc).
+
+Thêm cột vào template danh sách -> nhớ thêm vào profile tương ứng, nếu không mỗi dòng
+sẽ phát sinh 1 câu SELECT riêng để load cột bị thiếu.
+Relationship template đọc tới (product.category) được eager-load ngay trong profile:
+many-to-one dùng joinedload (LEFT JOIN trong cùng câu SELECT, không thêm query).
+Bật ORM_RAISE_ON_LAZY_LOAD=1 để mọi lazy-load chưa khai báo raise lỗi thay vì âm thầm N+1.
+
+Kiểm tra: python -m benchmarks.list_columns
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import load_only, with_expression, joinedload
+from app import db
+from app.models import Product, Blog, Category
+
+# Số ký tự đầu của content dùng thay cho excerpt khi bài viết chưa có excerpt
+CONTENT_PREVIEW_CHARS = 150
+
+# ==================== BLOG ====================
+# Card bài viết (trang /blog, trang chủ, tìm kiếm, bài liên quan)
+BLOG_CARD = (
+    load_only(
+        Blog.id, Blog.title, Blog.slug, Blog.excerpt, Blog.image, Blog.author, Blog.views,
+        Blog.is_featured, Blog.created_at, Blog.image_alt_text, Blog.image_title, Blog.image_caption
+    ),
+    with_expression(Blog.content_preview, func.substr(Blog.content, 1, CONTENT_PREVIEW_CHARS)),
+)
+
+# Dòng bảng trong admin/blogs.html
+BLOG_ADMIN_ROW = (
+    load_only(
+        Blog.id, Blog.title, Blog.slug, Blog.image, Blog.author, Blog.views, Blog.focus_keyword,
+        Blog.seo_score, Blog.seo_grade, Blog.is_featured, Blog.is_active, Blog.created_at
+    ),
+)
+
+# ==================== SẢN PHẨM ====================
+# Danh mục của sản phẩm (template chỉ hiển thị tên + link)
+PRODUCT_CATEGORY = joinedload(Product.category).load_only(Category.id, Category.name, Category.slug)
+
+# Card sản phẩm (trang chủ, /products, tìm kiếm, sản phẩm liên quan)
+PRODUCT_CARD = (
+    load_only(
+        Product.id, Product.name, Product.slug, Product.price, Product.old_price, Product.image,
+        Product.is_featured, Product.category_id,
+        Product.image_alt_text, Product.image_title, Product.image_caption
+    ),
+)
+
+# Card sản phẩm có hiện tên danh mục (trang /products)
+PRODUCT_CARD_WITH_CATEGORY = PRODUCT_CARD + (PRODUCT_CATEGORY,)
+
+# Dòng bảng trong admin/products.html
+PRODUCT_ADMIN_ROW = (
+    load_only(
+        Product.id, Product.name, Product.slug, Product.price, Product.old_price, Product.image,
+        Product.is_featured, Product.is_active, Product.category_id
+    ),
+    PRODUCT_CATEGORY,
+)
+
+# Trang chi tiết sản phẩm (đủ cột, kèm danh mục cho breadcrumb)
+PRODUCT_DETAIL = (PRODUCT_CATEGORY,)
+
+
+# ==================== DANH MỤC ====================
+def count_products_by_category(category_ids):
+    """
+    Số sản phẩm của từng danh mục: 1 câu GROUP BY category_id
+    (thay cho cat.products.count() mỗi dòng)
+    Returns: {category_id: số sản phẩm} (danh mục không có sản phẩm -> 0)
+    """
+    counts = dict.fromkeys(category_ids, 0)
+    if counts:
+        rows = db.session.query(Product.category_id, func.count(Product.id)).filter(
+            Product.category_id.in_(counts)
+        ).group_by(Product.category_id)
+        counts.update(rows)
+    return counts
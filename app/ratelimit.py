@@ -0,0 +1,145 @@
+"""
+Giới hạn tần suất theo token bucket + ghi nhớ dấu vân tay đã gặp (chống gửi trùng)
+
+Hai kiểu lưu trữ (RATELIMIT_STORAGE):
+- 'memory': dict trong process, nhanh nhất nhưng mỗi worker gunicorn đếm riêng
+- 'sqlite': 1 file SQLite dùng chung giữa các worker trên cùng máy (RATELIMIT_SQLITE_PATH),
+  không đụng tới database chính
+
+Bucket: tối đa `capacity` token, hồi lại `capacity` token sau mỗi `period` giây;
+mỗi lần gửi tốn 1 token, hết token -> bị chặn.
+"""
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app
+
+
+class MemoryStore:
+    """Token bucket + tập fingerprint trong bộ nhớ process"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, period, now=None):
+        """Lấy 1 token. Returns: (được phép?, số giây chờ tới khi có token)"""
+        now = time.time() if now is None else now
+        rate = capacity / period
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(self._buckets, lambda value: value[1] < now - period)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def seen(self, fingerprint, ttl, now=None):
+        """True nếu fingerprint đã gặp trong ttl giây gần đây (và ghi nhận lần gặp này)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            expires = self._seen.get(fingerprint)
+            if expires is not None and expires > now:
+                return True
+            self._seen[fingerprint] = now + ttl
+            if len(self._seen) > self.max_keys:
+                self._prune(self._seen, lambda value: value <= now)
+        return False
+
+    def _prune(self, data, expired):
+        for key in [key for key, value in data.items() if expired(value)]:
+            del data[key]
+        # Vẫn quá nhiều (đang bị flood): bỏ nửa cũ nhất theo thứ tự thêm vào
+        if len(data) > self.max_keys:
+            for key in list(data)[:len(data) // 2]:
+                del data[key]
+
+
+class SQLiteStore:
+    """Token bucket + tập fingerprint trong file SQLite dùng chung giữa các process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS seen (fingerprint TEXT PRIMARY KEY, expires REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def consume(self, key, capacity, period, now=None):
+        now = time.time() if now is None else now
+        rate = capacity / period
+        with self._connect() as conn:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            # Dọn bucket đã đầy lại từ lâu (~1% số lần gọi)
+            if int(now * 1000) % 100 == 0:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - period,))
+                conn.execute('DELETE FROM seen WHERE expires <= ?', (now,))
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def seen(self, fingerprint, ttl, now=None):
+        now = time.time() if now is None else now
+        with self._connect() as conn:
+            row = conn.execute('SELECT expires FROM seen WHERE fingerprint = ?', (fingerprint,)).fetchone()
+            if row and row[0] > now:
+                return True
+            conn.execute('INSERT OR REPLACE INTO seen (fingerprint, expires) VALUES (?, ?)',
+                         (fingerprint, now + ttl))
+        return False
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT: đọc + ghi bucket là 1 thao tác nguyên tử giữa các process"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    """Store theo cấu hình RATELIMIT_STORAGE (1 instance cho mỗi process)"""
+    config = current_app.config
+    storage = config.get('RATELIMIT_STORAGE', 'memory')
+    key = (storage, config.get('RATELIMIT_SQLITE_PATH'))
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = SQLiteStore(key[1]) if storage == 'sqlite' else MemoryStore()
+                _stores[key] = store
+    return store
@@ -2,6 +2,7 @@
 SEO Keywords Configuration
 Dễ dàng chỉnh sửa keywords mà không cần sửa code logic
 """
+import re
 
 # Keywords cho Media/Image SEO
 # ==================== MEDIA / IMAGE SEO KEYWORDS ====================
@@ -58,4 +59,19 @@ KEYWORD_SCORES = {
     'secondary': 12,    # Chỉ có secondary
     'brand': 8,         # Chỉ có brand
     'general': 5        # Chỉ có general keywords
-}
\ No newline at end of file
+}
+
+
+# ==================== MATCHER ĐÃ BIÊN DỊCH ====================
+def compile_keyword_matchers(keywords):
+    """
+    Biên dịch mỗi nhóm keywords thành 1 regex (so khớp substring như `kw in text`).
+    Được tạo 1 lần lúc import, worker gunicorn dùng chung bản đã warm trước khi fork.
+    """
+    return {
+        group: re.compile('|'.join(re.escape(kw) for kw in sorted(kws, key=len, reverse=True)))
+        for group, kws in keywords.items()
+    }
+
+
+MEDIA_KEYWORD_MATCHERS = compile_keyword_matchers(MEDIA_KEYWORDS)
@@ -0,0 +1,365 @@
+"""
+Sitemap + RSS dựng sẵn thành file tĩnh trong SITEMAP_DIR
+
+- /sitemap.xml: sitemap index trỏ tới các shard (tối đa SITEMAP_SHARD_SIZE URL mỗi shard)
+- /sitemap-images.xml: index các shard ảnh (ảnh sản phẩm / blog, alt + title lấy từ Media)
+- /blog/rss.xml: 50 bài viết mới nhất
+
+Shard chia theo khoảng id (id // SITEMAP_SHARD_SIZE) nên thêm/xóa bản ghi chỉ làm đổi
+shard chứa nó. Mỗi lần build chỉ chạy 1 câu GROUP BY lấy "dấu vân tay" từng shard
+(số dòng, số dòng active, tổng id, updated_at lớn nhất), so với manifest.json và
+chỉ ghi lại shard nào thay đổi. Crawler chỉ đọc file, không bao giờ quét bảng.
+
+URL tuyệt đối lấy từ SITE_URL (bắt buộc, không dùng Host của request: file build xong được trả cho mọi người).
+Build: flask --app run sitemap build [--force]  (cron), hoặc worker hàng đợi 'sitemap':
+    flask --app run jobs run --queue sitemap --loop
+Request đọc sitemap chỉ trả file đã có; file cũ hơn SITEMAP_REFRESH_SECONDS thì ghi 1 job vào hàng đợi
+(không truy vấn database), chưa build lần nào thì 404.
+"""
+import json
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+from flask import current_app, url_for
+from sqlalchemy import case, func
+from app import db
+from app.models import Product, Blog, Category, Media
+
+MANIFEST = 'manifest.json'
+INDEX_FILE = 'sitemap.xml'
+IMAGES_INDEX_FILE = 'sitemap-images.xml'
+RSS_FILE = 'rss.xml'
+RSS_ITEMS = 50
+
+# Trang tĩnh luôn có trong shard "pages" (cùng với danh mục)
+STATIC_PAGES = [
+    ('main.index', 'daily', '1.0'),
+    ('main.products', 'daily', '0.9'),
+    ('main.blog', 'daily', '0.8'),
+    ('main.about', 'monthly', '0.5'),
+    ('main.faq', 'monthly', '0.5'),
+    ('main.contact', 'yearly', '0.4'),
+    ('main.policy', 'yearly', '0.3'),
+]
+
+# Các loại trang chi tiết được chia shard theo id
+SECTIONS = {
+    'products': {'model': Product, 'endpoint': 'main.product_detail', 'changefreq': 'weekly', 'priority': '0.8'},
+    'blogs': {'model': Blog, 'endpoint': 'main.blog_detail', 'changefreq': 'monthly', 'priority': '0.7'},
+}
+
+QUEUE = 'sitemap'
+
+
+def get_sitemap_dir():
+    path = current_app.config['SITEMAP_DIR']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _site_url():
+    site_url = current_app.config.get('SITE_URL')
+    if not site_url:
+        raise RuntimeError('Chưa cấu hình SITE_URL (vd: https://ubvietnam.vn) để tạo sitemap')
+    return site_url.rstrip('/') + '/'
+
+
+def _w3c(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%S+00:00') if value else None
+
+
+# ==================== DẤU VÂN TAY SHARD ====================
+def _section_fingerprints(model, size):
+    """1 câu GROUP BY: {số shard: (fingerprint, lastmod)}"""
+    bucket = (model.id // size).label('bucket')
+    rows = db.session.query(
+        bucket,
+        func.count(model.id),
+        func.sum(case((model.is_active.is_(True), 1), else_=0)),
+        func.sum(model.id),
+        func.max(model.updated_at),
+    ).group_by(bucket).all()
+    return {
+        int(row[0]): (f'{row[1]}:{row[2]}:{row[3]}:{_w3c(row[4])}', _w3c(row[4]))
+        for row in rows if row[2]
+    }
+
+
+def _pages_fingerprint():
+    row = db.session.query(
+        func.count(Category.id),
+        func.sum(case((Category.is_active.is_(True), Category.id), else_=0)),
+        func.max(Category.created_at),
+    ).one()
+    return f'{row[0]}:{row[1]}:{_w3c(row[2])}:{len(STATIC_PAGES)}'
+
+
+def _media_fingerprint():
+    """Alt/title của Media dùng trong sitemap ảnh: đổi Media bất kỳ -> build lại shard ảnh"""
+    row = db.session.query(func.count(Media.id), func.sum(Media.id), func.max(Media.updated_at)).one()
+    return f'{row[0]}:{row[1]}:{_w3c(row[2])}'
+
+
+def _rss_fingerprint():
+    row = db.session.query(
+        func.count(Blog.id),
+        func.sum(case((Blog.is_active.is_(True), Blog.id), else_=0)),
+        func.max(Blog.updated_at),
+    ).one()
+    return f'{row[0]}:{row[1]}:{_w3c(row[2])}'
+
+
+def collect_fingerprints(size):
+    """
+    Tính fingerprint cho mọi file cần có
+    Returns: {tên file: {'fingerprint': ..., 'lastmod': ..., 'kind': ...}}
+    """
+    shards = {'sitemap-pages.xml': {'fingerprint': _pages_fingerprint(), 'lastmod': None, 'kind': 'pages'}}
+    media_fp = _media_fingerprint()
+
+    for section, spec in SECTIONS.items():
+        for number, (fingerprint, lastmod) in _section_fingerprints(spec['model'], size).items():
+            shards[f'sitemap-{section}-{number}.xml'] = {
+                'fingerprint': fingerprint, 'lastmod': lastmod, 'kind': 'urls',
+                'section': section, 'number': number,
+            }
+            shards[f'sitemap-images-{section}-{number}.xml'] = {
+                'fingerprint': f'{fingerprint}|{media_fp}', 'lastmod': lastmod, 'kind': 'images',
+                'section': section, 'number': number,
+            }
+
+    shards[RSS_FILE] = {'fingerprint': _rss_fingerprint(), 'lastmod': None, 'kind': 'rss'}
+    return shards
+
+
+# ==================== GHI FILE ====================
+def _write_atomic(path, chunks):
+    """Ghi ra file tạm rồi đổi tên: request đang đọc file cũ không bị đọc dở"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def _url_entry(loc, lastmod=None, changefreq=None, priority=None):
+    parts = [f'<url><loc>{escape(loc)}</loc>']
+    if lastmod:
+        parts.append(f'<lastmod>{lastmod}</lastmod>')
+    if changefreq:
+        parts.append(f'<changefreq>{changefreq}</changefreq>')
+    if priority:
+        parts.append(f'<priority>{priority}</priority>')
+    parts.append('</url>\n')
+    return ''.join(parts)
+
+
+def _image_url(image, site_url):
+    if image.startswith(('http://', 'https://')):
+        return image
+    return site_url + image.lstrip('/')
+
+
+def _iter_pages():
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for endpoint, changefreq, priority in STATIC_PAGES:
+        yield _url_entry(url_for(endpoint, _external=True), changefreq=changefreq, priority=priority)
+    categories = db.session.query(Category.id, Category.created_at).filter(
+        Category.is_active.is_(True)
+    ).order_by(Category.id)
+    for category_id, created_at in categories:
+        yield _url_entry(url_for('main.products', category=category_id, _external=True),
+                         _w3c(created_at), 'weekly', '0.7')
+    yield '</urlset>\n'
+
+
+def _shard_query(spec, number, size, *columns):
+    model = spec['model']
+    return db.session.query(model.slug, *columns).filter(
+        model.id >= number * size,
+        model.id < (number + 1) * size,
+        model.is_active.is_(True),
+    ).order_by(model.id).execution_options(yield_per=1000)
+
+
+def _iter_urls(spec, number, size):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for slug, updated_at in _shard_query(spec, number, size, spec['model'].updated_at):
+        yield _url_entry(url_for(spec['endpoint'], slug=slug, _external=True),
+                         _w3c(updated_at), spec['changefreq'], spec['priority'])
+    yield '</urlset>\n'
+
+
+def _iter_images(spec, number, size, site_url):
+    model = spec['model']
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield ('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+           'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">\n')
+    query = _shard_query(spec, number, size, model.id, model.image, Media.alt_text, Media.title).outerjoin(
+        Media, Media.filepath == model.image
+    ).filter(model.image.isnot(None), model.image != '')
+    last_id = None
+    for slug, row_id, image, alt_text, title in query:
+        # 1 ảnh có thể có nhiều bản ghi Media trùng đường dẫn -> lấy bản đầu tiên
+        if row_id == last_id:
+            continue
+        last_id = row_id
+        parts = [f'<url><loc>{escape(url_for(spec["endpoint"], slug=slug, _external=True))}</loc>',
+                 f'<image:image><image:loc>{escape(_image_url(image, site_url))}</image:loc>']
+        if title or alt_text:
+            parts.append(f'<image:title>{escape(title or alt_text)}</image:title>')
+        if alt_text:
+            parts.append(f'<image:caption>{escape(alt_text)}</image:caption>')
+        parts.append('</image:image></url>\n')
+        yield ''.join(parts)
+    yield '</urlset>\n'
+
+
+def _iter_rss():
+    config = current_app.config
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel>\n'
+    yield f'<title>{escape(config.get("SITE_NAME", ""))} - Tin tức</title>\n'
+    yield f'<link>{escape(url_for("main.blog", _external=True))}</link>\n'
+    yield f'<description>{escape(config.get("SITE_DESCRIPTION", ""))}</description>\n'
+    yield '<language>vi</language>\n'
+    yield (f'<atom:link href="{escape(url_for("main.blog_rss", _external=True))}" '
+           'rel="self" type="application/rss+xml"/>\n')
+
+    blogs = db.session.query(
+        Blog.title, Blog.slug, Blog.excerpt, Blog.meta_description, Blog.author, Blog.image, Blog.created_at
+    ).filter(Blog.is_active.is_(True)).order_by(Blog.created_at.desc()).limit(RSS_ITEMS)
+    for title, slug, excerpt, meta_description, author, image, created_at in blogs:
+        link = url_for('main.blog_detail', slug=slug, _external=True)
+        parts = ['<item>', f'<title>{escape(title)}</title>', f'<link>{escape(link)}</link>',
+                 f'<guid isPermaLink="true">{escape(link)}</guid>']
+        description = excerpt or meta_description
+        if description:
+            parts.append(f'<description>{escape(description)}</description>')
+        if author:
+            parts.append(f'<author>{escape(author)}</author>')
+        if created_at:
+            parts.append(f'<pubDate>{format_datetime(created_at.replace(tzinfo=timezone.utc), usegmt=True)}</pubDate>')
+        parts.append('</item>\n')
+        yield ''.join(parts)
+    yield '</channel></rss>\n'
+
+
+def _iter_index(site_url, shards):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for name, info in shards:
+        loc = escape(url_for('main.sitemap_shard', name=name[:-len('.xml')], _external=True))
+        lastmod = f'<lastmod>{info["lastmod"]}</lastmod>' if info.get('lastmod') else ''
+        yield f'<sitemap><loc>{loc}</loc>{lastmod}</sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def _shard_chunks(info, size, site_url):
+    if info['kind'] == 'pages':
+        return _iter_pages()
+    if info['kind'] == 'rss':
+        return _iter_rss()
+    spec = SECTIONS[info['section']]
+    if info['kind'] == 'images':
+        return _iter_images(spec, info['number'], size, site_url)
+    return _iter_urls(spec, info['number'], size)
+
+
+# ==================== BUILD ====================
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_sitemaps(force=False):
+    """
+    Build lại các file có fingerprint thay đổi (force=True: build lại tất cả)
+    Returns: dict built, removed, unchanged, seconds
+    """
+    started = time.perf_counter()
+    directory = get_sitemap_dir()
+    size = current_app.config.get('SITEMAP_SHARD_SIZE', 50000)
+    site_url = _site_url()
+
+    manifest = _read_manifest(directory)
+    if manifest.get('site_url') != site_url or manifest.get('shard_size') != size:
+        force = True
+    old_files = manifest.get('files', {})
+
+    built = []
+    # url_for(_external=True) theo SITE_URL, kể cả khi chạy từ CLI (không có request)
+    with current_app.test_request_context('/', base_url=site_url):
+        files = collect_fingerprints(size)
+
+        for name, info in files.items():
+            path = os.path.join(directory, name)
+            previous = old_files.get(name, {})
+            if not force and previous.get('fingerprint') == info['fingerprint'] and os.path.exists(path):
+                continue
+            _write_atomic(path, _shard_chunks(info, size, site_url))
+            built.append(name)
+
+        removed = [name for name in old_files if name not in files]
+        for name in removed:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+        indexes_missing = not all(os.path.exists(os.path.join(directory, name))
+                                  for name in (INDEX_FILE, IMAGES_INDEX_FILE))
+        if built or removed or force or indexes_missing:
+            shards = [(name, info) for name, info in files.items() if info['kind'] != 'rss']
+            _write_atomic(os.path.join(directory, INDEX_FILE), _iter_index(site_url, shards))
+            _write_atomic(os.path.join(directory, IMAGES_INDEX_FILE), _iter_index(
+                site_url, [(name, info) for name, info in shards if info['kind'] == 'images']
+            ))
+
+    # Ghi manifest sau cùng: nếu build dở bị dừng, lần sau sẽ build lại các shard đó
+    _write_atomic(os.path.join(directory, MANIFEST), [json.dumps({
+        'site_url': site_url,
+        'shard_size': size,
+        'built_at': datetime.utcnow().isoformat(),
+        'files': {name: {'fingerprint': info['fingerprint']} for name, info in files.items()},
+    }, indent=1)])
+
+    return {
+        'built': built,
+        'removed': removed,
+        'unchanged': len(files) - len(built),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def process_sitemap_jobs(jobs):
+    """Handler hàng đợi 'sitemap': nhiều job dồn lại chỉ build 1 lần"""
+    result = build_sitemaps()
+    print(f"[Sitemap] Build {len(result['built'])} file, xóa {len(result['removed'])}, "
+          f"giữ nguyên {result['unchanged']} ({result['seconds']}s)")
+    return []
+
+
+def request_rebuild():
+    """
+    Gọi trước khi trả file sitemap/RSS: file cũ hơn SITEMAP_REFRESH_SECONDS -> ghi 1 job build (nếu chưa có
+    job đang chờ). Chỉ đọc mtime + file hàng đợi, không truy vấn database, không build trong request
+    """
+    from app.jobs import enqueue, pending_count
+
+    refresh = current_app.config.get('SITEMAP_REFRESH_SECONDS', 3600)
+    if not refresh:
+        return
+    try:
+        age = time.time() - os.path.getmtime(os.path.join(get_sitemap_dir(), MANIFEST))
+    except OSError:
+        age = None
+    if (age is None or age >= refresh) and not pending_count(QUEUE):
+        enqueue(QUEUE, {'queued_at': datetime.utcnow().isoformat()})
@@ -0,0 +1,767 @@
+"""
+Nơi lưu file ảnh (STORAGE_BACKEND), cùng 1 interface cho upload / xóa / liệt kê / URL thumbnail
+
+- 'cloudinary' (mặc định): Cloudinary, thumbnail bằng URL biến đổi (c_fill / c_limit). Gọi API qua
+  app/cloudinary_client.py (timeout, thử lại, circuit breaker); Cloudinary lỗi -> lưu tạm vào 'local'
+  và upload lại sau (CLOUDINARY_FALLBACK_LOCAL)
+- 'local': đĩa local, đặt tên theo nội dung (sha256, chia thư mục theo 2 cặp ký tự đầu:
+  ab/cd/abcd...ef.jpg), upload trùng nội dung dùng lại file cũ. Phục vụ tại STORAGE_LOCAL_URL
+  bằng send_file (wsgi.file_wrapper -> sendfile của gunicorn, USE_X_SENDFILE cho nginx/apache),
+  Cache-Control immutable vì nội dung của 1 URL không bao giờ đổi
+- 's3': S3 hoặc dịch vụ tương thích (MinIO, R2...) qua S3_ENDPOINT_URL, đặt tên theo nội dung
+  như 'local'. Cần cài boto3 (không có trong requirements.txt). Thử với MinIO chạy local:
+      docker run -p 9000:9000 minio/minio server /data
+      STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://localhost:9000 S3_BUCKET=ubvn \\
+      S3_ACCESS_KEY_ID=minioadmin S3_SECRET_ACCESS_KEY=minioadmin python -m benchmarks.storage_backends
+- 'static': file cũ trong static/uploads (trước khi chuyển sang Cloudinary), chỉ đọc / xóa
+
+'local' và 's3' lưu thêm thumbnail <tên>_thumb<ext> (MEDIA_THUMBNAIL_SIZE) lúc upload.
+Upload thẳng từ trình duyệt (app/direct_uploads.py): 'cloudinary' (Upload API có chữ ký) và 'local'
+(endpoint giả lập Cloudinary tại STORAGE_LOCAL_URL/_upload, dùng cho dev / test).
+Mọi backend đều được dùng để nhận diện URL cũ (xóa / dọn ảnh mồ côi), chỉ STORAGE_BACKEND nhận upload mới.
+"""
+import hashlib
+import hmac
+import io
+import os
+import re
+import shutil
+import time
+import urllib.request
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from urllib.parse import urlparse
+from flask import current_app, send_from_directory, request, jsonify, url_for
+
+# Kết quả upload
+StoredFile = namedtuple('StoredFile', ['url', 'key', 'size', 'width', 'height', 'format'])
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class StorageError(Exception):
+    """Upload / xóa thất bại (lỗi mạng, cấu hình thiếu, file không phải ảnh...)"""
+
+
+# ==================== HÀM DÙNG CHUNG ====================
+def _open(file):
+    """bytes / FileStorage / file object -> file object đọc từ đầu (không đọc cả file vào RAM)"""
+    if isinstance(file, (bytes, bytearray)):
+        return io.BytesIO(file)
+    stream = getattr(file, 'stream', file)
+    stream.seek(0)
+    return stream
+
+
+def _digest(stream):
+    """sha256 + số byte, đọc từng khối 1MB rồi quay về đầu file"""
+    sha = hashlib.sha256()
+    size = 0
+    for block in iter(lambda: stream.read(1024 * 1024), b''):
+        sha.update(block)
+        size += len(block)
+    stream.seek(0)
+    return sha.hexdigest(), size
+
+
+def _size(file):
+    """Số byte của bytes / file object (seek tới cuối), None nếu không biết"""
+    if isinstance(file, (bytes, bytearray)):
+        return len(file)
+    stream = getattr(file, 'stream', file)
+    try:
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(0)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def _file_path(file):
+    """Đường dẫn trên đĩa nếu file object là file thật (open(path)), None nếu không"""
+    name = getattr(getattr(file, 'stream', file), 'name', None)
+    return name if isinstance(name, str) and os.path.isfile(name) else None
+
+
+def _image_info(stream, thumb_size):
+    """
+    Kích thước, định dạng và bytes thumbnail (thumb_size x thumb_size, giữ tỉ lệ) của ảnh
+    JPEG được giải mã ở độ phân giải thấp (draft) nên ảnh lớn không chiếm nhiều RAM
+    Ảnh Pillow không đọc được -> StorageError
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(stream) as img:
+            width, height, fmt = img.width, img.height, (img.format or '').lower()
+            img.draft('RGB', (thumb_size, thumb_size))
+            img.thumbnail((thumb_size, thumb_size), Image.Resampling.LANCZOS)
+            if fmt in ('jpeg', 'jpg') and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            thumb = io.BytesIO()
+            img.save(thumb, format=fmt or 'png', quality=80)
+    except Exception as e:
+        raise StorageError(f'Không đọc được ảnh: {e}')
+    finally:
+        stream.seek(0)
+    return width, height, fmt, thumb.getvalue()
+
+
+def _extension(filename):
+    """Phần mở rộng (chữ thường) của tên file gốc"""
+    return os.path.splitext(filename or '')[1].lower()
+
+
+def _thumb_name(path):
+    name, ext = os.path.splitext(path)
+    return f'{name}_thumb{ext}'
+
+
+def _is_thumb(path):
+    return os.path.splitext(path)[0].endswith('_thumb')
+
+
+def _download(url, max_bytes, timeout=30):
+    """Tải ảnh từ URL ngoài (tối đa max_bytes)"""
+    request = urllib.request.Request(url, headers={'User-Agent': 'ubvn-media-import'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = response.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise StorageError(f'Ảnh lớn hơn {max_bytes} bytes: {url}')
+    return data
+
+
+def _sign(params):
+    """HMAC-SHA256 (SECRET_KEY) của các tham số, sắp theo tên - chữ ký upload thẳng của backend local"""
+    payload = '&'.join(f'{key}={params[key]}' for key in sorted(params))
+    return hmac.new(current_app.config['SECRET_KEY'].encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+# ==================== INTERFACE ====================
+class Storage:
+    """
+    Interface chung. key: định danh file trong backend (hashable), url: URL lưu trong DB
+    - save(file, folder, filename) -> StoredFile
+    - save_url(url, folder) -> StoredFile
+    - key_for(url) -> key nếu URL thuộc backend này, None nếu không
+    - delete_many(keys) -> list key xóa lỗi (file không còn coi như đã xóa)
+    - list_files(cutoff) -> {key: url} các file tạo trước cutoff (datetime UTC), bỏ qua thumbnail
+    - thumbnail_url(url, size) / preview_url(url, width)
+    - direct_upload(folder, public_id) -> {'upload_url', 'fields'}: tham số đã ký để trình duyệt upload thẳng
+    - verify_direct_upload(result, fields) -> StoredFile: kiểm tra kết quả upload thẳng (StorageError nếu giả mạo)
+    """
+    name = None
+
+    def save(self, file, folder, filename):
+        raise StorageError(f'Backend {self.name} không nhận upload mới')
+
+    def save_url(self, url, folder):
+        data = _download(url, current_app.config.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+        return self.save(data, folder, urlparse(url).path.rsplit('/', 1)[-1] or 'image')
+
+    def key_for(self, url):
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        raise NotImplementedError
+
+    def list_files(self, cutoff):
+        return {}
+
+    def thumbnail_url(self, url, size):
+        return url
+
+    def preview_url(self, url, width):
+        return url
+
+    def direct_upload(self, folder, public_id):
+        raise StorageError(f'Backend {self.name} không hỗ trợ upload thẳng từ trình duyệt')
+
+    def verify_direct_upload(self, result, fields):
+        raise StorageError(f'Backend {self.name} không hỗ trợ upload thẳng từ trình duyệt')
+
+
+# ==================== CLOUDINARY ====================
+class CloudinaryStorage(Storage):
+    """key = (resource_type, type, public_id)"""
+    name = 'cloudinary'
+
+    _VERSION_RE = re.compile(r'^v\d+$')
+    _TRANSFORMATION_RE = re.compile(r'^[a-z]{1,3}_[^/]*$')
+
+    def __init__(self, config):
+        self.configured = bool(config.get('CLOUDINARY_CLOUD_NAME'))
+        self.gc_prefix = config.get('ASSET_GC_PREFIX', 'enterprise/')
+        self.fallback = config.get('CLOUDINARY_FALLBACK_LOCAL', True)
+        self.chunk_size = config.get('CLOUDINARY_CHUNK_SIZE', 6 * 1024 * 1024)
+
+    def _client(self):
+        """Gọi SDK qua app/cloudinary_client.py (timeout, thử lại, circuit breaker)"""
+        from app.cloudinary_client import get_client
+        return get_client()
+
+    def _uploader(self):
+        from app.utils import get_cloudinary_uploader
+        return get_cloudinary_uploader()
+
+    def _api(self):
+        self._uploader()
+        import cloudinary.api
+        return cloudinary.api
+
+    def _stored(self, result):
+        return StoredFile(
+            url=result.get('secure_url'),
+            key=(result.get('resource_type', 'image'), result.get('type', 'upload'), result.get('public_id')),
+            size=result.get('bytes', 0),
+            width=result.get('width', 0),
+            height=result.get('height', 0),
+            format=result.get('format', 'unknown'),
+        )
+
+    def upload(self, file, folder, filename):
+        """Upload lên Cloudinary, không lưu tạm local (CloudinaryUnavailable nếu Cloudinary lỗi)"""
+        options = dict(
+            folder=folder,
+            public_id=os.path.splitext(filename)[0],
+            overwrite=True,
+            resource_type='image',
+            use_filename=True,
+            unique_filename=False
+        )
+        path = _file_path(file)
+        if path and os.path.getsize(path) > self.chunk_size:
+            # File lớn trên đĩa (vd. upload theo đoạn): upload_large gửi từng đoạn chunk_size,
+            # SDK tự mở / đóng file, không đọc cả file vào RAM
+            return self._stored(self._client().call(
+                'upload', self._uploader().upload_large, path, chunk_size=self.chunk_size, **options
+            ))
+        return self._stored(self._client().call('upload', self._uploader().upload, file, **options))
+
+    def save(self, file, folder, filename):
+        from app.cloudinary_client import CloudinaryUnavailable
+        try:
+            return self.upload(file, folder, filename)
+        except CloudinaryUnavailable as e:
+            if not self.fallback:
+                raise
+            return self._save_local(file, folder, filename, e)
+
+    def save_url(self, url, folder):
+        from app.cloudinary_client import CloudinaryUnavailable
+        try:
+            # Cloudinary tự tải ảnh từ URL
+            return self._stored(self._client().call(
+                'upload', self._uploader().upload, url, folder=folder, resource_type='image'
+            ))
+        except CloudinaryUnavailable as e:
+            if not self.fallback:
+                raise
+            data = _download(url, current_app.config.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+            return self._save_local(data, folder, urlparse(url).path.rsplit('/', 1)[-1] or 'image', e)
+
+    def _save_local(self, file, folder, filename, error):
+        """
+        Cloudinary không dùng được: lưu vào storage local, ghi job upload lại (hàng đợi cloudinary_resync,
+        thread nền của worker web xử lý khi breaker đóng - xem app/cloudinary_client.py)
+        """
+        from app.cloudinary_client import RESYNC_QUEUE
+        from app.jobs import enqueue
+        from app.metrics import record_storage_fallback
+
+        stored = get_backend(LocalStorage.name).save(file, folder, filename)
+        enqueue(RESYNC_QUEUE, {'url': stored.url, 'folder': folder, 'filename': filename,
+                               'queued_at': datetime.utcnow().isoformat()})
+        record_storage_fallback('saved')
+        print(f"[Storage] {error} -> lưu tạm {stored.url}, sẽ upload lại lên Cloudinary")
+        return stored
+
+    def key_for(self, url):
+        """.../<cloud>/<resource_type>/<type>/[transformations/][v123/]<public_id>.<ext>"""
+        if not url.startswith(('http://', 'https://')):
+            return None
+        parsed = urlparse(url)
+        if parsed.netloc != 'res.cloudinary.com':
+            return None
+        parts = [part for part in parsed.path.split('/') if part]
+        if len(parts) < 5:
+            return None
+        resource_type, delivery_type, rest = parts[1], parts[2], parts[3:]
+
+        versions = [index for index, part in enumerate(rest) if self._VERSION_RE.match(part)]
+        if versions:
+            rest = rest[versions[0] + 1:]
+        else:
+            while len(rest) > 1 and (',' in rest[0] or self._TRANSFORMATION_RE.match(rest[0])):
+                rest = rest[1:]
+
+        public_id = '/'.join(rest)
+        if resource_type != 'raw':
+            public_id = os.path.splitext(public_id)[0]
+        return (resource_type, delivery_type, public_id) if public_id else None
+
+    def delete_many(self, keys):
+        """Admin API delete_resources: tối đa 100 public_id mỗi lần gọi, theo từng (resource_type, type)"""
+        groups = defaultdict(list)
+        for key in keys:
+            groups[key[:2]].append(key)
+
+        failed = []
+        for (resource_type, delivery_type), group in groups.items():
+            for start in range(0, len(group), 100):
+                chunk = group[start:start + 100]
+                try:
+                    result = self._client().call(
+                        'delete', self._api().delete_resources,
+                        [key[2] for key in chunk], resource_type=resource_type, type=delivery_type
+                    )
+                except Exception as e:
+                    print(f"[Storage] Lỗi xóa Cloudinary ({len(chunk)} ảnh): {e}")
+                    failed.extend(chunk)
+                    continue
+                deleted = result.get('deleted', {})
+                failed.extend(key for key in chunk if deleted.get(key[2]) not in ('deleted', 'not_found'))
+        return failed
+
+    def list_files(self, cutoff):
+        """Resource trong thư mục ASSET_GC_PREFIX (Admin API, 500 mỗi trang), bỏ qua nếu chưa cấu hình"""
+        if not self.configured:
+            return {}
+        files = {}
+        cursor = None
+        while True:
+            page = self._client().call(
+                'list', self._api().resources,
+                type='upload', resource_type='image', prefix=self.gc_prefix, max_results=500,
+                **({'next_cursor': cursor} if cursor else {})
+            )
+            for resource in page.get('resources', []):
+                created = datetime.strptime(resource['created_at'][:19], '%Y-%m-%dT%H:%M:%S')
+                if created < cutoff:
+                    key = (resource['resource_type'], resource['type'], resource['public_id'])
+                    files[key] = resource.get('secure_url') or resource['public_id']
+            cursor = page.get('next_cursor')
+            if not cursor:
+                return files
+
+    def _transform(self, url, transformation):
+        if '/upload/' not in url:
+            return url
+        head, tail = url.split('/upload/', 1)
+        return f'{head}/upload/{transformation}/{tail}'
+
+    def thumbnail_url(self, url, size):
+        return self._transform(url, f'c_fill,w_{size},h_{size},q_auto,f_auto')
+
+    def preview_url(self, url, width):
+        return self._transform(url, f'c_limit,w_{width},q_auto,f_auto')
+
+    def direct_upload(self, folder, public_id):
+        """
+        Tham số upload có chữ ký (api_secret không rời server): folder, public_id, định dạng cho phép
+        đều được ký nên trình duyệt không đổi được. Cloudinary tự từ chối timestamp cũ hơn 1 giờ
+        """
+        self._uploader()
+        import cloudinary
+        from cloudinary.utils import api_sign_request
+
+        config = cloudinary.config()
+        fields = {
+            'timestamp': int(time.time()),
+            'folder': folder,
+            'public_id': public_id,
+            'allowed_formats': ','.join(sorted(current_app.config.get('ALLOWED_EXTENSIONS', ()))),
+        }
+        fields['signature'] = api_sign_request(fields, config.api_secret)
+        fields['api_key'] = config.api_key
+        return {'upload_url': f'https://api.cloudinary.com/v1_1/{config.cloud_name}/image/upload', 'fields': fields}
+
+    def verify_direct_upload(self, result, fields):
+        """
+        Kết quả phải đúng public_id đã ký và có chữ ký Cloudinary hợp lệ. Chữ ký chỉ phủ public_id + version
+        nên URL / kích thước / định dạng không lấy từ JSON trình duyệt gửi lên mà hỏi lại Admin API
+        (CloudinaryUnavailable nếu Cloudinary lỗi - trình duyệt gửi lại sau)
+        """
+        self._uploader()
+        from cloudinary.utils import cloudinary_url, verify_api_response_signature
+
+        public_id = result.get('public_id')
+        if public_id != f"{fields['folder']}/{fields['public_id']}" or not result.get('signature') \
+                or not verify_api_response_signature(public_id, result.get('version'), result['signature']):
+            raise StorageError('Kết quả upload không hợp lệ (sai chữ ký Cloudinary)')
+
+        resource = self._client().call('resource', self._api().resource, public_id, resource_type='image')
+        if str(resource.get('version')) != str(result.get('version')) \
+                or resource.get('format') not in current_app.config.get('ALLOWED_EXTENSIONS', ()):
+            raise StorageError('Kết quả upload không hợp lệ (ảnh trên Cloudinary không khớp)')
+        url, _ = cloudinary_url(public_id, version=resource['version'], format=resource['format'],
+                                resource_type='image', type='upload', secure=True)
+        return StoredFile(url, ('image', 'upload', public_id), resource.get('bytes', 0),
+                          resource.get('width', 0), resource.get('height', 0), resource['format'])
+
+
+# ==================== ĐĨA LOCAL, ĐẶT TÊN THEO NỘI DUNG ====================
+class LocalStorage(Storage):
+    """key = đường dẫn tương đối trong STORAGE_LOCAL_DIR (ab/cd/<sha256><ext>)"""
+    name = 'local'
+
+    def __init__(self, config):
+        self.root = os.path.abspath(config['STORAGE_LOCAL_DIR'])
+        self.url_prefix = config.get('STORAGE_LOCAL_URL', '/files').rstrip('/') + '/'
+        self.thumb_size = config.get('MEDIA_THUMBNAIL_SIZE', 300)
+
+    def path_for(self, key):
+        return os.path.join(self.root, key)
+
+    def _write(self, key, source):
+        """Ghi nguyên tử (file tạm + rename), bỏ qua nếu đã có (cùng key = cùng nội dung). source: bytes / file object"""
+        path = self.path_for(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            if isinstance(source, bytes):
+                f.write(source)
+            else:
+                shutil.copyfileobj(source, f, 1024 * 1024)
+        os.replace(tmp_path, path)
+
+    def save(self, file, folder, filename):
+        stream = _open(file)
+        width, height, fmt, thumb = _image_info(stream, self.thumb_size)
+        digest, size = _digest(stream)
+        key = f'{digest[:2]}/{digest[2:4]}/{digest}{_extension(filename)}'
+        self._write(key, stream)
+        self._write(_thumb_name(key), thumb)
+        return StoredFile(self.url_prefix + key, key, size, width, height, fmt)
+
+    def key_for(self, url):
+        if not url.startswith(self.url_prefix):
+            return None
+        key = os.path.normpath(url[len(self.url_prefix):].split('?', 1)[0])
+        return None if key.startswith('..') or os.path.isabs(key) else key.replace(os.sep, '/')
+
+    def delete_many(self, keys):
+        failed = []
+        for key in keys:
+            try:
+                for path in (self.path_for(key), self.path_for(_thumb_name(key))):
+                    if os.path.isfile(path):
+                        os.remove(path)
+            except OSError as e:
+                print(f"[Storage] Lỗi xóa {key}: {e}")
+                failed.append(key)
+        return failed
+
+    def list_files(self, cutoff):
+        files = {}
+        for root, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(root, name)
+                if _is_thumb(name) or name.endswith('.tmp'):
+                    continue
+                if datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff:
+                    key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                    files[key] = self.url_prefix + key
+        return files
+
+    def thumbnail_url(self, url, size):
+        key = self.key_for(url)
+        thumb = key and _thumb_name(key)
+        return self.url_prefix + thumb if thumb and os.path.exists(self.path_for(thumb)) else url
+
+    def direct_upload(self, folder, public_id):
+        """Cùng dạng với Cloudinary, upload_url là endpoint giả lập của app (init_storage), ký bằng SECRET_KEY"""
+        fields = {'timestamp': int(time.time()), 'folder': folder, 'public_id': public_id}
+        fields['signature'] = _sign(fields)
+        return {'upload_url': url_for('storage_direct_upload'), 'fields': fields}
+
+    def verify_direct_upload(self, result, fields):
+        """Chữ ký của endpoint giả lập gắn key với đúng lần ký upload; kích thước / định dạng đọc lại từ file"""
+        key = str(result.get('public_id') or '')
+        expected = _sign({'public_id': key, 'version': result.get('version'), 'upload': fields.get('signature')})
+        path = self.path_for(key)
+        if not hmac.compare_digest(expected, str(result.get('signature') or '')) \
+                or self.key_for(self.url_prefix + key) != key or not os.path.isfile(path):
+            raise StorageError('Kết quả upload không hợp lệ (sai chữ ký)')
+
+        from PIL import Image
+        with Image.open(path) as img:
+            width, height, fmt = img.width, img.height, (img.format or '').lower()
+        return StoredFile(self.url_prefix + key, key, os.path.getsize(path), width, height, fmt)
+
+
+# ==================== FILE CŨ TRONG static/uploads ====================
+class StaticFiles(Storage):
+    """
+    key = đường dẫn tương đối trong thư mục static (uploads/...); chấp nhận /static/x, /x, x
+    Chỉ nhận file nằm trong UPLOAD_FOLDER (không bao giờ xóa logo, css... của site)
+    """
+    name = 'static'
+
+    def __init__(self, config, static_folder):
+        self.static_folder = os.path.abspath(static_folder)
+        self.upload_folder = os.path.abspath(config['UPLOAD_FOLDER'])
+
+    def path_for(self, key):
+        return os.path.join(self.static_folder, key)
+
+    def key_for(self, url):
+        if url.startswith(('http://', 'https://', '//')):
+            return None
+        path = url.split('?', 1)[0].lstrip('/')
+        if path.startswith('static/'):
+            path = path[len('static/'):]
+        full_path = os.path.abspath(os.path.join(self.static_folder, path))
+        if os.path.commonpath([full_path, self.upload_folder]) != self.upload_folder or full_path == self.upload_folder:
+            return None
+        return os.path.relpath(full_path, self.static_folder).replace(os.sep, '/')
+
+    def delete_many(self, keys):
+        failed = []
+        for key in keys:
+            try:
+                for path in (self.path_for(key), _thumb_name(self.path_for(key))):
+                    if os.path.isfile(path):
+                        os.remove(path)
+            except OSError as e:
+                print(f"[Storage] Lỗi xóa {key}: {e}")
+                failed.append(key)
+        return failed
+
+    def list_files(self, cutoff):
+        files = {}
+        for root, _, names in os.walk(self.upload_folder):
+            for name in names:
+                path = os.path.join(root, name)
+                if _is_thumb(name):
+                    continue
+                if datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff:
+                    key = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                    files[key] = '/static/' + key
+        return files
+
+    def thumbnail_url(self, url, size):
+        """<tên>_thumb<ext> nếu đã tạo (flask media thumbnails), không thì ảnh gốc"""
+        key = self.key_for(url)
+        if key and os.path.exists(_thumb_name(self.path_for(key))):
+            return '/static/' + _thumb_name(key)
+        return url
+
+
+# ==================== S3 / MINIO ====================
+class S3Storage(Storage):
+    """key = <S3_PREFIX><2 ký tự đầu sha256>/<sha256><ext>"""
+    name = 's3'
+
+    def __init__(self, config, client=None):
+        self.bucket = config['S3_BUCKET']
+        self.prefix = config.get('S3_PREFIX', 'media/')
+        self.endpoint_url = config.get('S3_ENDPOINT_URL')
+        self.region = config.get('S3_REGION')
+        self.access_key = config.get('S3_ACCESS_KEY_ID')
+        self.secret_key = config.get('S3_SECRET_ACCESS_KEY')
+        self.thumb_size = config.get('MEDIA_THUMBNAIL_SIZE', 300)
+        public_url = config.get('S3_PUBLIC_URL')
+        if not public_url:
+            if self.endpoint_url:
+                public_url = f'{self.endpoint_url.rstrip("/")}/{self.bucket}'
+            else:
+                public_url = f'https://{self.bucket}.s3.{self.region or "us-east-1"}.amazonaws.com'
+        self.public_url = public_url.rstrip('/') + '/'
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+                from botocore.config import Config as BotoConfig
+            except ImportError:
+                raise StorageError('STORAGE_BACKEND=s3 cần cài boto3 (pip install boto3)')
+            self._client = boto3.client(
+                's3',
+                endpoint_url=self.endpoint_url,
+                region_name=self.region,
+                aws_access_key_id=self.access_key,
+                aws_secret_access_key=self.secret_key,
+                # MinIO / endpoint tự host: URL dạng <endpoint>/<bucket>/<key>
+                config=BotoConfig(s3={'addressing_style': 'path'} if self.endpoint_url else {}),
+            )
+        return self._client
+
+    def _put(self, key, stream, content_type):
+        """upload_fileobj: file lớn được gửi multipart từng phần, không đọc cả file vào RAM"""
+        self.client.upload_fileobj(stream, self.bucket, key, ExtraArgs={
+            'ContentType': content_type,
+            'CacheControl': f'public, max-age={IMMUTABLE_MAX_AGE}, immutable',
+        })
+
+    def save(self, file, folder, filename):
+        stream = _open(file)
+        width, height, fmt, thumb = _image_info(stream, self.thumb_size)
+        digest, size = _digest(stream)
+        key = f'{self.prefix}{digest[:2]}/{digest}{_extension(filename)}'
+        content_type = f'image/{fmt}'
+        try:
+            self._put(key, stream, content_type)
+            self._put(_thumb_name(key), io.BytesIO(thumb), content_type)
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(f'Lỗi upload S3: {e}')
+        return StoredFile(self.public_url + key, key, size, width, height, fmt)
+
+    def key_for(self, url):
+        if not url.startswith(self.public_url):
+            return None
+        key = url[len(self.public_url):].split('?', 1)[0]
+        return key if key.startswith(self.prefix) else None
+
+    def delete_many(self, keys):
+        """DeleteObjects: tối đa 1000 object mỗi lần gọi (file + thumbnail)"""
+        objects = [candidate for key in keys for candidate in (key, _thumb_name(key))]
+        failed = set()
+        for start in range(0, len(objects), 1000):
+            chunk = objects[start:start + 1000]
+            try:
+                result = self.client.delete_objects(
+                    Bucket=self.bucket, Delete={'Objects': [{'Key': key} for key in chunk], 'Quiet': True}
+                )
+            except Exception as e:
+                print(f"[Storage] Lỗi xóa S3 ({len(chunk)} object): {e}")
+                failed.update(chunk)
+                continue
+            failed.update(error['Key'] for error in result.get('Errors', []))
+        return [key for key in keys if key in failed]
+
+    def list_files(self, cutoff):
+        files = {}
+        for page in self.client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get('Contents', []):
+                modified = item['LastModified'].replace(tzinfo=None)
+                if not _is_thumb(item['Key']) and modified < cutoff:
+                    files[item['Key']] = self.public_url + item['Key']
+        return files
+
+    def thumbnail_url(self, url, size):
+        key = self.key_for(url)
+        return self.public_url + _thumb_name(key) if key else url
+
+
+# ==================== CHỌN BACKEND ====================
+def get_backend(name):
+    """Backend theo tên (1 instance cho mỗi app)"""
+    backends = current_app.extensions.setdefault('storage', {})
+    backend = backends.get(name)
+    if backend is None:
+        config = current_app.config
+        if name == CloudinaryStorage.name:
+            backend = CloudinaryStorage(config)
+        elif name == LocalStorage.name:
+            backend = LocalStorage(config)
+        elif name == S3Storage.name:
+            backend = S3Storage(config)
+        elif name == StaticFiles.name:
+            backend = StaticFiles(config, current_app.static_folder)
+        else:
+            raise StorageError(f'STORAGE_BACKEND không hợp lệ: {name}')
+        backends[name] = backend
+    return backend
+
+
+def get_storage():
+    """Backend nhận upload mới (STORAGE_BACKEND)"""
+    return get_backend(current_app.config.get('STORAGE_BACKEND', 'cloudinary'))
+
+
+def known_backends():
+    """Các backend dùng để nhận diện URL đã lưu trong DB ('static' cuối cùng vì nhận cả đường dẫn tương đối)"""
+    names = [CloudinaryStorage.name, LocalStorage.name]
+    if current_app.config.get('S3_BUCKET'):
+        names.append(S3Storage.name)
+    names.append(StaticFiles.name)
+    return [get_backend(name) for name in names]
+
+
+def locate(url):
+    """URL -> (backend, key), (None, None) nếu URL không do hệ thống lưu (ảnh ngoài, rỗng...)"""
+    url = (url or '').strip()
+    if url:
+        for backend in known_backends():
+            key = backend.key_for(url)
+            if key is not None:
+                return backend, key
+    return None, None
+
+
+def thumbnail_url(url, size):
+    backend, _ = locate(url)
+    return backend.thumbnail_url(url, size) if backend else url
+
+
+def preview_url(url, width):
+    backend, _ = locate(url)
+    return backend.preview_url(url, width) if backend else url
+
+
+# ==================== PHỤC VỤ FILE LOCAL ====================
+def init_storage(app):
+    """
+    Route phục vụ file của backend 'local' tại STORAGE_LOCAL_URL/<key>
+    + endpoint upload thẳng giả lập Cloudinary tại STORAGE_LOCAL_URL/_upload (chỉ nhận request đã ký)
+    """
+    prefix = app.config.get('STORAGE_LOCAL_URL', '/files').rstrip('/')
+
+    def serve_local_file(key):
+        response = send_from_directory(get_backend(LocalStorage.name).root, key, max_age=IMMUTABLE_MAX_AGE)
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        return response
+
+    app.add_url_rule(f'{prefix}/<path:key>', 'storage_file', serve_local_file)
+    app.add_url_rule(f'{prefix}/_upload', 'storage_direct_upload', direct_upload_local, methods=['POST'])
+
+
+def _upload_error(message, status):
+    # Cùng dạng lỗi với Upload API của Cloudinary
+    response = jsonify({'error': {'message': message}})
+    response.status_code = status
+    return response
+
+
+def direct_upload_local():
+    """
+    Endpoint giả lập Upload API của Cloudinary cho backend 'local' (dev / test upload thẳng từ trình duyệt):
+    nhận multipart fields đã ký (LocalStorage.direct_upload) + file, trả JSON cùng dạng Cloudinary
+    (public_id, version, signature, secure_url, bytes, width, height, format)
+    """
+    fields = {name: request.form.get(name, '') for name in ('timestamp', 'folder', 'public_id')}
+    if not hmac.compare_digest(_sign(fields), request.form.get('signature', '')):
+        return _upload_error('Invalid Signature', 401)
+    ttl = current_app.config.get('DIRECT_UPLOAD_TTL', 600)
+    if not fields['timestamp'].isdigit() or int(fields['timestamp']) + ttl < time.time():
+        return _upload_error('Stale request', 401)
+
+    file = request.files.get('file')
+    extensions = current_app.config.get('ALLOWED_EXTENSIONS', ())
+    if not file or _extension(file.filename).lstrip('.') not in extensions:
+        return _upload_error('Invalid image file', 400)
+    try:
+        stored = get_backend(LocalStorage.name).save(file, fields['folder'], file.filename)
+    except StorageError as e:
+        return _upload_error(str(e), 400)
+
+    version = int(time.time())
+    return jsonify({
+        'public_id': stored.key,
+        'version': version,
+        'signature': _sign({'public_id': stored.key, 'version': version, 'upload': request.form['signature']}),
+        'resource_type': 'image',
+        'format': stored.format,
+        'bytes': stored.size,
+        'width': stored.width,
+        'height': stored.height,
+        'secure_url': stored.url,
+        'original_filename': os.path.splitext(file.filename)[0],
+    })
@@ -1,11 +1,34 @@
 import os
 import re
+import time
+import unicodedata
 from datetime import datetime
-from PIL import Image
 from werkzeug.utils import secure_filename
 from flask import current_app
 from app import db
-import cloudinary.uploader
+from app.metrics import observe_upload
+
+# Pillow và Cloudinary được import khi dùng lần đầu (xem get_cloudinary_uploader)
+# để worker chỉ phục vụ trang public không phải load các thư viện này
+_cloudinary_configured = False
+
+
+def get_cloudinary_uploader():
+    """Import và cấu hình Cloudinary ở lần dùng đầu tiên, trả về module cloudinary.uploader"""
+    global _cloudinary_configured
+    import cloudinary
+    import cloudinary.uploader
+
+    if not _cloudinary_configured:
+        cloudinary.config(
+            cloud_name=current_app.config.get('CLOUDINARY_CLOUD_NAME'),
+            api_key=current_app.config.get('CLOUDINARY_API_KEY'),
+            api_secret=current_app.config.get('CLOUDINARY_API_SECRET'),
+            secure=True
+        )
+        _cloudinary_configured = True
+
+    return cloudinary.uploader
 
 
 def allowed_file(filename):
@@ -15,25 +38,98 @@ def allowed_file(filename):
         filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+# ==================== SLUG ====================
+def _build_slug_table():
+    """
+    Bảng str.translate cho slugify (tạo 1 lần khi import):
+    - Dấu thanh/dấu mũ sau khi tách NFD (U+0300-U+036F) -> bỏ
+    - đ/Đ (không tách được bằng NFD) -> d
+    - Khoảng trắng (kể cả khoảng trắng Unicode) -> '-'
+    - Ký tự ASCII không phải chữ/số/'-' -> bỏ
+    """
+    table = {cp: None for cp in range(0x300, 0x370)}
+    table[ord('đ')] = 'd'
+    table[ord('Đ')] = 'd'
+    for cp in range(0x80):
+        char = chr(cp)
+        if not (char.isalnum() or char == '-'):
+            table[cp] = None
+    for cp in list(range(0x3001)) + [0x2028, 0x2029, 0x205f]:
+        if chr(cp).isspace():
+            table[cp] = '-'
+    return table
+
+
+_SLUG_TABLE = _build_slug_table()
+# Bản cho slugify_many: giữ lại '\x00' làm ranh giới giữa các chuỗi
+_SLUG_BATCH_TABLE = {**_SLUG_TABLE, 0: '\x00'}
+_SLUG_DASHES = re.compile(r'-{2,}')
+
+
 def slugify(text):
     """
     Chuyển text thành slug SEO-friendly
     VD: "Máy lọc nước A.O.Smith" -> "may-loc-nuoc-aosmith"
     """
-    text = text.lower()
-    # Chuyển tiếng Việt không dấu
-    text = re.sub(r'[àáạảãâầấậẩẫăằắặẳẵ]', 'a', text)
-    text = re.sub(r'[èéẹẻẽêềếệểễ]', 'e', text)
-    text = re.sub(r'[ìíịỉĩ]', 'i', text)
-    text = re.sub(r'[òóọỏõôồốộổỗơờớợởỡ]', 'o', text)
-    text = re.sub(r'[ùúụủũưừứựửữ]', 'u', text)
-    text = re.sub(r'[ỳýỵỷỹ]', 'y', text)
-    text = re.sub(r'[đ]', 'd', text)
-    # Xóa ký tự đặc biệt
-    text = re.sub(r'[^a-z0-9\s-]', '', text)
-    # Thay space bằng dash
-    text = re.sub(r'[\s-]+', '-', text)
-    return text.strip('-')
+    text = unicodedata.normalize('NFD', text.lower()).translate(_SLUG_TABLE)
+    # Ký tự không phải ASCII còn lại (không thuộc tiếng Việt) -> bỏ
+    text = text.encode('ascii', 'ignore').decode('ascii')
+    return _SLUG_DASHES.sub('-', text).strip('-')
+
+
+def slugify_many(texts):
+    """
+    slugify cho nhiều chuỗi cùng lúc (ghép lại để chuẩn hóa 1 lần thay vì từng chuỗi)
+    Returns: list slug theo đúng thứ tự đầu vào
+    """
+    if not texts:
+        return []
+    joined = '\x00'.join(text.replace('\x00', '') for text in texts)
+    joined = unicodedata.normalize('NFD', joined.lower()).translate(_SLUG_BATCH_TABLE)
+    joined = _SLUG_DASHES.sub('-', joined.encode('ascii', 'ignore').decode('ascii'))
+    return [slug.strip('-') for slug in joined.split('\x00')]
+
+
+def unique_slugs(model, texts, column='slug', max_length=None):
+    """
+    Tạo slug không trùng cho nhiều bản ghi mới
+    - 1 query cho mỗi 200 slug gốc: lấy các slug đang có = base hoặc LIKE 'base-%'
+      (không so sánh khoảng: thứ tự chuỗi theo collation, PostgreSQL en_US bỏ qua dấu '-' / '.')
+    - Trùng trong DB hoặc trùng trong chính batch -> thêm hậu tố -2, -3, ...
+    Returns: list slug theo đúng thứ tự texts
+    """
+    from sqlalchemy import or_
+
+    bases = []
+    for slug in slugify_many(texts):
+        slug = slug or 'item'
+        if max_length:
+            slug = slug[:max_length - 4].rstrip('-')
+        bases.append(slug)
+
+    col = getattr(model, column)
+    distinct = sorted(set(bases))
+    taken = set()
+    # Chia nhóm vì SQLite giới hạn độ sâu biểu thức OR (~1000)
+    for start in range(0, len(distinct), 200):
+        rows = db.session.query(col).filter(
+            or_(*[or_(col == base, col.startswith(base + '-', autoescape=True))
+                  for base in distinct[start:start + 200]])
+        ).all()
+        taken.update(row[0] for row in rows)
+
+    result = []
+    next_suffix = {}
+    for base in bases:
+        slug = base
+        suffix = next_suffix.get(base, 2)
+        while slug in taken:
+            slug = f'{base}-{suffix}'
+            suffix += 1
+        next_suffix[base] = suffix
+        taken.add(slug)
+        result.append(slug)
+    return result
 
 
 def generate_seo_filename(original_filename, alt_text=None):
@@ -63,6 +159,7 @@ def generate_seo_filename(original_filename, alt_text=None):
 
 def get_image_dimensions(filepath):
     """Lấy kích thước ảnh"""
+    from PIL import Image
     try:
         with Image.open(filepath) as img:
             return img.size  # (width, height)
@@ -80,6 +177,7 @@ def optimize_image(filepath, max_width=1920, max_height=1080, quality=85):
 
     Returns: dict với thông tin ảnh sau khi tối ưu
     """
+    from PIL import Image
     try:
         with Image.open(filepath) as img:
             # Convert RGBA/LA/P sang RGB nếu cần (cho JPEG)
@@ -126,6 +224,7 @@ def optimize_image(filepath, max_width=1920, max_height=1080, quality=85):
 
 def create_thumbnail(filepath, size=(300, 300)):
     """Tạo thumbnail cho ảnh"""
+    from PIL import Image
     try:
         filename, ext = os.path.splitext(filepath)
         thumb_path = f"{filename}_thumb{ext}"
@@ -153,134 +252,66 @@ def get_image_from_form(form_image_field, field_name, folder='uploads'):
     return None
 
 
+def upload_folder_path(folder='general', album=None):
+    """Thư mục lưu ảnh upload: enterprise/<folder>[/<album>]"""
+    path = f"enterprise/{folder or 'general'}"
+    if album:
+        path = f"{path}/{secure_filename(album)}"
+    return path
 
-import cloudinary.uploader
 
 def save_upload_file(file, folder='general', album=None, alt_text=None, optimize=True):
     """
-    Upload file lên Cloudinary thay vì lưu cục bộ.
+    Upload file vào storage đang dùng (STORAGE_BACKEND: cloudinary / local / s3, xem app/storage.py)
     - folder: thư mục (products, banners, blogs, ...)
     - album: tên album (sẽ được thêm vào folder nếu có)
     - alt_text: dùng để tạo tên file SEO-friendly
     Returns: (image_url, file_info_dict) hoặc (None, None)
     """
+    from app.storage import get_storage
+
     if not file or not hasattr(file, 'filename') or not allowed_file(file.filename):
         return None, None
 
     # Tạo tên file SEO-friendly
     filename = generate_seo_filename(file.filename, alt_text)
 
-    # Tạo đường dẫn thư mục trên Cloudinary
-    cloud_folder = f"enterprise/{folder}"
-    if album:
-        cloud_folder = f"{cloud_folder}/{secure_filename(album)}"
+    # Thư mục logic (Cloudinary dùng làm folder, local / S3 đặt tên theo nội dung nên bỏ qua)
+    cloud_folder = upload_folder_path(folder, album)
 
+    started = time.perf_counter()
     try:
-        # Upload lên Cloudinary
-        upload_result = cloudinary.uploader.upload(
-            file,
-            folder=cloud_folder,
-            public_id=os.path.splitext(filename)[0],
-            overwrite=True,
-            resource_type="image",
-            use_filename=True,
-            unique_filename=False
-        )
-
-        image_url = upload_result.get("secure_url")
-        width = upload_result.get("width", 0)
-        height = upload_result.get("height", 0)
-        file_size = upload_result.get("bytes", 0)
-        file_type = upload_result.get("format", "unknown")
+        stored = get_storage().save(file, cloud_folder, filename)
 
         file_info = {
             'filename': filename,
             'original_filename': file.filename,
-            'filepath': image_url,  # URL Cloudinary
-            'file_type': file_type,
-            'file_size': file_size,
-            'width': width,
-            'height': height,
+            'filepath': stored.url,
+            'file_type': stored.format,
+            'file_size': stored.size,
+            'width': stored.width,
+            'height': stored.height,
             'album': album
         }
 
-        return image_url, file_info
+        observe_upload(time.perf_counter() - started, ok=True)
+        return stored.url, file_info
 
     except Exception as e:
-        print(f"[Cloudinary upload error]: {e}")
+        observe_upload(time.perf_counter() - started, ok=False)
+        print(f"[Upload error]: {e}")
         return None, None
 
 
-
-import os
-import cloudinary.uploader
-
-import os
-import cloudinary.uploader
-
 def delete_file(filepath):
-    """Xóa file khỏi Cloudinary hoặc local"""
-    try:
-        if "res.cloudinary.com" in filepath:
-            parts = filepath.split("/upload/")[-1]
-            # Loại bỏ phần version (vd: v1759744420/)
-            if parts.startswith("v") and "/" in parts:
-                parts = "/".join(parts.split("/")[1:])
-            # Bỏ phần mở rộng .jpg/.png
-            public_id = os.path.splitext(parts)[0]
-
-            result = cloudinary.uploader.destroy(public_id)
-            print(f"[Cloudinary delete]: {public_id} -> {result}")
-            return result.get("result") == "ok"
-
-        # Nếu là file local
-        elif filepath.startswith('/static/'):
-            file_path = filepath.replace('/static/', '')
-            full_path = os.path.join(
-                os.path.dirname(__file__), 'static', file_path
-            )
-            abs_path = os.path.abspath(full_path)
-            if os.path.exists(abs_path):
-                os.remove(abs_path)
-                print(f"[Local delete]: {abs_path}")
-                return True
-
-    except Exception as e:
-        print(f"[Delete Error]: {e}")
-    return False
-
-
-
-
-def get_albums():
-    """Lấy danh sách albums với số lượng file"""
-    from app.models import Media
-    from sqlalchemy import func
-
-    # Lấy albums từ DB
-    album_counts = db.session.query(
-        Media.album,
-        func.count(Media.id).label('count')
-    ).filter(
-        Media.album.isnot(None),
-        Media.album != ''
-    ).group_by(Media.album).all()
-
-    albums_dict = {album_name: count for album_name, count in album_counts}
-
-    # Lấy thư mục vật lý (kể cả rỗng)
-    albums_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'albums')
-    if os.path.exists(albums_path):
-        for folder_name in os.listdir(albums_path):
-            folder_path = os.path.join(albums_path, folder_name)
-            if os.path.isdir(folder_path) and folder_name not in albums_dict:
-                albums_dict[folder_name] = 0
-
-    # Convert sang list và sort
-    albums = [{'name': name, 'count': count} for name, count in albums_dict.items()]
-    albums.sort(key=lambda x: x['name'])
+    """
+    Xóa ngay 1 ảnh khỏi Cloudinary hoặc local (không kiểm tra ảnh còn được dùng hay không)
+    Xóa dữ liệu thông thường không cần gọi hàm này: ảnh cũ tự vào hàng đợi xóa (app/asset_cleanup.py)
+    """
+    from app.asset_cleanup import parse_asset, delete_assets
 
-    return albums
+    key = parse_asset(filepath)
+    return key is not None and not delete_assets([key])
 
 
 def handle_image_upload(form_field, field_name, folder='general', alt_text=None):
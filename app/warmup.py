@@ -0,0 +1,81 @@
+"""
+Warm-up cho app: biên dịch trước templates để worker mới khởi động nhanh
+"""
+import time
+
+
+def compile_templates(app):
+    """
+    Biên dịch toàn bộ templates của app.
+    Nếu app có bytecode cache thì bytecode được ghi ra cache luôn.
+
+    Returns: dict {'compiled': số template, 'errors': [(tên, lỗi)], 'seconds': thời gian}
+    """
+    env = app.jinja_env
+    compiled = 0
+    errors = []
+    started = time.perf_counter()
+
+    for name in env.list_templates(extensions=['html', 'xml', 'txt']):
+        try:
+            env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            errors.append((name, str(e)))
+
+    return {
+        'compiled': compiled,
+        'errors': errors,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def warm_shared_state(app):
+    """
+    Load trước các dữ liệu chỉ-đọc dùng chung (chạy trong gunicorn master khi --preload):
+    - templates đã biên dịch (jinja_env.cache)
+    - matcher SEO đã biên dịch (app.seo_config, load cùng admin)
+    - danh sách danh mục (app.cache)
+    Sau khi fork, các worker dùng chung bản copy-on-write này.
+    """
+    from app.cache import get_active_categories
+
+    result = compile_templates(app)
+
+    with app.app_context():
+        try:
+            get_active_categories()
+        except Exception as e:
+            # DB chưa sẵn sàng (vd lúc build) thì worker sẽ tự load sau
+            print(f"[Warmup] Bỏ qua warm danh mục: {e}")
+
+    return result
+
+
+def prepare_for_fork(app):
+    """
+    Gọi trong master ngay trước khi fork worker:
+    đóng kết nối DB của master và freeze GC để các object đã warm không bị
+    ghi lại (làm mất copy-on-write) khi GC của worker quét qua
+    """
+    import gc
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+    gc.collect()
+    gc.freeze()
+
+
+def after_fork(app):
+    """
+    Gọi trong worker ngay sau khi fork:
+    bỏ pool kết nối kế thừa từ master (không đóng socket của master)
+    """
+    from app import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
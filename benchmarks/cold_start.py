@@ -0,0 +1,105 @@
+"""
+Benchmark cold-start: thời gian tới byte đầu tiên của request đầu tiên trên một worker mới
+
+So sánh 2 chế độ:
+- nocache: không có bytecode cache, mỗi worker tự compile templates khi có request đầu
+- warm:    đã chạy `flask warm` lúc build, worker chỉ load bytecode từ cache
+
+Chạy:  python -m benchmarks.cold_start [--runs 5] [--output cold_start.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from benchmarks.common import ROOT_DIR, prepare_env, init_db, git_revision, dump_result
+
+PAGES = ['/', '/products', '/product/cat-say-loai-1', '/blog', '/blog/ung-dung-cat-say-1',
+         '/contact', '/faq', '/about', '/policy']
+
+
+def child():
+    """Chạy trong process con: đo thời gian tạo app và request đầu tiên cho từng trang"""
+    started = time.perf_counter()
+    from app import create_app
+    app = create_app()
+    client = app.test_client()
+    app_ready = time.perf_counter()
+
+    timings = {}
+    for page in PAGES:
+        t0 = time.perf_counter()
+        response = client.get(page)
+        first = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        client.get(page)
+        second = time.perf_counter() - t0
+
+        timings[page] = {
+            'status': response.status_code,
+            'first_ms': round(first * 1000, 2),
+            'second_ms': round(second * 1000, 2)
+        }
+
+    print(json.dumps({
+        'create_app_ms': round((app_ready - started) * 1000, 2),
+        'total_first_ms': round(sum(t['first_ms'] for t in timings.values()), 2),
+        'pages': timings
+    }))
+
+
+def run_child(env):
+    output = subprocess.check_output([sys.executable, '-m', 'benchmarks.cold_start', '--child'],
+                                     cwd=ROOT_DIR, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child()
+
+    workdir = prepare_env()
+    cache_dir = os.environ['TEMPLATE_CACHE_DIR']
+
+    from app import create_app
+    init_db(create_app())
+
+    result = {'revision': git_revision(), 'runs': args.runs, 'modes': {}}
+
+    for mode in ('nocache', 'warm'):
+        env = dict(os.environ)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+        if mode == 'nocache':
+            env['TEMPLATE_CACHE_DIR'] = ''
+        else:
+            subprocess.check_call([sys.executable, '-m', 'flask', '--app', 'run', 'warm'],
+                                  cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL)
+
+        runs = [run_child(env) for _ in range(args.runs)]
+        totals = sorted(r['total_first_ms'] for r in runs)
+        result['modes'][mode] = {
+            'create_app_ms_median': sorted(r['create_app_ms'] for r in runs)[len(runs) // 2],
+            'total_first_ms_median': totals[len(totals) // 2],
+            'first_ms_median_per_page': {
+                page: sorted(r['pages'][page]['first_ms'] for r in runs)[len(runs) // 2]
+                for page in PAGES
+            }
+        }
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    dump_result(result, args.output)
+
+
+if __name__ == '__main__':
+    main()
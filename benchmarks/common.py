@@ -0,0 +1,101 @@
+"""
+Tiện ích dùng chung cho các benchmark
+
+Các benchmark chạy trên một database SQLite tạm, KHÔNG đụng tới database thật.
+Biến môi trường phải được đặt TRƯỚC khi import app (Config đọc env lúc import).
+"""
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def prepare_env(workdir=None, **overrides):
+    """
+    Đặt biến môi trường cho một lần chạy benchmark
+    Returns: thư mục làm việc (chứa bench.db, jinja_cache, ...)
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix='ubvn-bench-')
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(workdir, 'bench.db'))
+    os.environ.setdefault('TEMPLATE_CACHE_DIR', os.path.join(workdir, 'jinja_cache'))
+    for key, value in overrides.items():
+        os.environ[key] = value
+    return workdir
+
+
+def init_db(app):
+    """Tạo bảng và seed dữ liệu tối thiểu nếu database còn trống"""
+    from app import db
+    from app.models import Category, Product, Blog, FAQ, Banner
+
+    with app.app_context():
+        db.create_all()
+        if Category.query.count():
+            return
+
+        for i in range(1, 6):
+            db.session.add(Category(name=f'Cát Sấy Số {i}', slug=f'cat-say-so-{i}', is_active=True))
+        db.session.flush()
+
+        for i in range(1, 31):
+            db.session.add(Product(
+                name=f'Cát Sấy Số {i % 5 + 1} - Loại {i}',
+                slug=f'cat-say-loai-{i}',
+                description='<p>Cát sấy chất lượng cao, dùng cho công nghiệp và xây dựng.</p>',
+                price=180000 + i * 1000,
+                category_id=i % 5 + 1,
+                is_featured=(i % 3 == 0),
+                is_active=True
+            ))
+
+        for i in range(1, 13):
+            blog = Blog(
+                title=f'Ứng dụng cát sấy trong công nghiệp #{i}',
+                slug=f'ung-dung-cat-say-{i}',
+                excerpt='Cát sấy được ứng dụng trong nhiều ngành nghề.',
+                content='<p>Cát sấy là vật liệu quan trọng trong xây dựng.</p>' * 20,
+                is_featured=(i <= 3),
+                is_active=True
+            )
+            blog.calculate_reading_time()
+            db.session.add(blog)
+
+        for i in range(1, 5):
+            db.session.add(FAQ(question=f'Câu hỏi số {i}?', answer='Trả lời.', order=i, is_active=True))
+        db.session.add(Banner(title='Cát sấy UB', image='/static/img/logo.png', order=0, is_active=True))
+
+        db.session.commit()
+
+
+def git_revision():
+    """Commit hiện tại (để so sánh kết quả giữa các commit)"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def percentile(values, pct):
+    """Percentile theo nearest-rank, values không cần sort trước"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def dump_result(result, output=None):
+    """In kết quả JSON ra stdout và ghi file nếu có output"""
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    print(text)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
@@ -0,0 +1,257 @@
+"""
+Sinh dữ liệu giả lập (tiếng Việt) với số lượng tùy chọn cho benchmark
+
+Mở rộng seed/seed_data.py: danh mục "Cát Sấy Số N", sản phẩm theo cỡ hạt,
+bài viết HTML nhiều đoạn, media có alt/title/caption và album.
+Dùng random với seed cố định nên cùng tham số luôn sinh ra cùng dữ liệu
+(kết quả benchmark giữa các commit so sánh được với nhau).
+
+Chạy:
+    python -m benchmarks.datagen --products 5000 --blogs 1000 --media 3000
+    DATABASE_URL=sqlite:////tmp/big.db python -m benchmarks.datagen --scale 10
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import prepare_env
+
+# Mặc định ứng với --scale 1
+DEFAULT_COUNTS = {'categories': 5, 'products': 200, 'blogs': 60, 'media': 150}
+
+SIZES = [
+    ('Loại 1 (0.15mm - 0.3mm)', 180000),
+    ('Loại 2 (0.3mm - 0.6mm)', 185000),
+    ('Loại 3 (0.6mm - 1.2mm)', 190000),
+    ('Loại 4 (1.2mm - 2mm)', 195000),
+    ('Loại 5 (2mm - 4mm)', 200000),
+]
+
+SUBJECTS = ['Cát sấy', 'Cát thạch anh', 'Cát lọc nước', 'Cát sấy khô', 'Cát phun', 'Cát đúc']
+USES = ['xây dựng', 'lọc nước', 'đúc kim loại', 'phun sơn', 'sân golf', 'bể bơi',
+        'vữa khô', 'keo dán gạch', 'sơn epoxy', 'sản xuất kính']
+ADJECTIVES = ['chất lượng cao', 'giá rẻ', 'độ sạch cao', 'đạt chuẩn', 'không lẫn tạp chất',
+              'hạt đều', 'độ ẩm thấp', 'nhập khẩu', 'sấy khô tự nhiên']
+PLACES = ['Hà Nội', 'TP. Hồ Chí Minh', 'Đà Nẵng', 'Bình Dương', 'Đồng Nai', 'Hải Phòng',
+          'Cần Thơ', 'Bắc Ninh', 'Long An', 'Quảng Ninh']
+SENTENCES = [
+    '{s} {a} được ứng dụng rộng rãi trong ngành {u}.',
+    'Chúng tôi cung cấp {s_lower} {a} cho các công trình tại {p}.',
+    'Quy trình sấy hiện đại giúp {s_lower} giữ được độ ổn định khi dùng cho {u}.',
+    'Khách hàng tại {p} tin dùng {s_lower} của chúng tôi nhờ chất lượng {a}.',
+    'Sản phẩm được kiểm định nghiêm ngặt trước khi giao tới {p}.',
+    'Với ngành {u}, việc chọn đúng cỡ hạt quyết định tới chất lượng thành phẩm.',
+    'Giao hàng nhanh, hỗ trợ tư vấn kỹ thuật miễn phí cho mọi đơn hàng.',
+    '{s} đóng bao 25kg, 50kg hoặc bao jumbo theo yêu cầu.',
+]
+ALBUMS = ['San pham', 'Banner', 'Tin tuc', 'Du an', 'Nha may', None]
+
+
+class TextGenerator:
+    """Sinh câu/đoạn văn/HTML tiếng Việt từ các mẫu câu có sẵn"""
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def sentence(self):
+        subject = self.rng.choice(SUBJECTS)
+        return self.rng.choice(SENTENCES).format(
+            s=subject, s_lower=subject.lower(), a=self.rng.choice(ADJECTIVES),
+            u=self.rng.choice(USES), p=self.rng.choice(PLACES)
+        )
+
+    def paragraph(self, sentences=4):
+        return ' '.join(self.sentence() for _ in range(sentences))
+
+    def html(self, paragraphs=6):
+        """Nội dung bài viết: đoạn văn xen kẽ tiêu đề h2/h3, danh sách, ảnh"""
+        parts = []
+        for i in range(paragraphs):
+            if i and i % 3 == 0:
+                tag = 'h2' if i % 2 else 'h3'
+                parts.append(f'<{tag}>{self.rng.choice(SUBJECTS)} cho {self.rng.choice(USES)}</{tag}>')
+            parts.append(f'<p>{self.paragraph(self.rng.randint(3, 6))}</p>')
+            if i % 4 == 2:
+                items = ''.join(f'<li>{self.rng.choice(ADJECTIVES).capitalize()}</li>' for _ in range(3))
+                parts.append(f'<ul>{items}</ul>')
+            if i % 5 == 4:
+                parts.append(f'<p><img src="https://res.cloudinary.com/demo/image/upload/bench/{i}.jpg"'
+                             f' alt="{self.rng.choice(SUBJECTS)} {self.rng.choice(USES)}"></p>')
+        return '\n'.join(parts)
+
+
+def scaled_counts(scale=1, **overrides):
+    """Số bản ghi theo scale, có thể ghi đè từng loại"""
+    counts = {name: max(1, int(value * scale)) for name, value in DEFAULT_COUNTS.items()}
+    counts.update({name: value for name, value in overrides.items() if value is not None})
+    return counts
+
+
+def generate(app, categories=5, products=200, blogs=60, media=150, seed=42, batch_size=1000):
+    """
+    Sinh dữ liệu vào database của app (chỉ chạy khi database còn trống)
+    Returns: dict số bản ghi đã tạo + thời gian
+    """
+    from app import db
+    from app.models import Category, Product, Blog, Media, FAQ, Banner
+    from app.utils import slugify
+
+    rng = random.Random(seed)
+    text = TextGenerator(rng)
+    started = time.perf_counter()
+    base_time = datetime(2024, 1, 1)
+
+    with app.app_context():
+        db.create_all()
+        if Category.query.count():
+            return {'skipped': True, 'reason': 'database đã có dữ liệu'}
+
+        def insert_batches(model, rows):
+            for start in range(0, len(rows), batch_size):
+                db.session.execute(db.insert(model), rows[start:start + batch_size])
+
+        # ---- Danh mục ----
+        insert_batches(Category, [{
+            'name': f'Cát Sấy Số {i}',
+            'slug': f'cat-say-so-{i}',
+            'description': f'Cát sấy số {i} chất lượng cao, dùng trong công nghiệp và xây dựng',
+            'is_active': True,
+            'created_at': base_time
+        } for i in range(1, categories + 1)])
+        category_ids = [row.id for row in db.session.query(Category.id).order_by(Category.id)]
+
+        # ---- Sản phẩm ----
+        rows = []
+        for i in range(1, products + 1):
+            size, price = SIZES[i % len(SIZES)]
+            name = f'{rng.choice(SUBJECTS)} {rng.choice(USES)} - {size}'
+            price = price + rng.randrange(0, 50) * 1000
+            rows.append({
+                'name': name,
+                'slug': f'{slugify(name)}-{i}',
+                'description': text.html(rng.randint(2, 5)),
+                'price': price if i % 17 else 0,
+                'old_price': price + 20000 if i % 4 == 0 else None,
+                'image': f'https://res.cloudinary.com/demo/image/upload/v1/products/sp-{i}.jpg',
+                'image_alt_text': f'{name} {rng.choice(ADJECTIVES)}',
+                'category_id': rng.choice(category_ids),
+                'is_featured': i % 10 == 0,
+                'is_active': i % 25 != 0,
+                'views': rng.randint(0, 5000),
+                'created_at': base_time + timedelta(minutes=i),
+                'updated_at': base_time + timedelta(minutes=i)
+            })
+        insert_batches(Product, rows)
+
+        # ---- Blog ----
+        rows = []
+        for i in range(1, blogs + 1):
+            title = f'{rng.choice(SUBJECTS)} trong {rng.choice(USES)} tại {rng.choice(PLACES)}'
+            blog = Blog(content=text.html(rng.randint(4, 40)))
+            blog.calculate_reading_time()
+            rows.append({
+                'title': title,
+                'slug': f'{slugify(title)}-{i}',
+                'excerpt': text.paragraph(2),
+                'content': blog.content,
+                'image': f'https://res.cloudinary.com/demo/image/upload/v1/blogs/bai-viet-{i}.jpg',
+                'author': 'Admin',
+                'is_featured': i % 8 == 0,
+                'is_active': i % 20 != 0,
+                'views': rng.randint(0, 10000),
+                'focus_keyword': rng.choice(SUBJECTS).lower(),
+                'word_count': blog.word_count,
+                'reading_time': blog.reading_time,
+                'created_at': base_time + timedelta(hours=i),
+                'updated_at': base_time + timedelta(hours=i)
+            })
+        insert_batches(Blog, rows)
+
+        # ---- Media ----
+        rows = []
+        for i in range(1, media + 1):
+            subject = rng.choice(SUBJECTS)
+            filename = f'{slugify(subject)}-{i}.jpg'
+            rows.append({
+                'filename': filename,
+                'original_filename': f'IMG_{1000 + i}.jpg',
+                'filepath': f'https://res.cloudinary.com/demo/image/upload/v1/media/{filename}',
+                'file_type': 'image',
+                'file_size': rng.randint(50_000, 2_000_000),
+                'width': rng.choice([800, 1200, 1600, 1920]),
+                'height': rng.choice([600, 800, 1080]),
+                'alt_text': f'{subject} {rng.choice(USES)}' if i % 6 else None,
+                'title': f'{subject} {rng.choice(ADJECTIVES)}' if i % 3 else None,
+                'caption': text.sentence() if i % 2 else None,
+                'album': rng.choice(ALBUMS),
+                'created_at': base_time + timedelta(minutes=i)
+            })
+        insert_batches(Media, rows)
+
+        # Bảng albums + album_id + media_count, cột tìm kiếm (INSERT theo batch không qua hook ORM)
+        from app.albums import backfill
+        from app.media_library import reindex_all
+        backfill()
+        reindex_all(batch_size)
+
+        # ---- FAQ + Banner (giống seed) ----
+        insert_batches(FAQ, [{
+            'question': f'{rng.choice(SUBJECTS)} dùng cho {rng.choice(USES)} được không?',
+            'answer': text.paragraph(2), 'order': i, 'is_active': True
+        } for i in range(1, 9)])
+        insert_batches(Banner, [{
+            'title': f'{subject} {ADJECTIVES[0]}',
+            'image': f'https://res.cloudinary.com/demo/image/upload/v1/banners/banner-{i}.jpg',
+            'order': i, 'is_active': True
+        } for i, subject in enumerate(SUBJECTS[:3])])
+
+        db.session.commit()
+
+    return {
+        'categories': categories, 'products': products, 'blogs': blogs, 'media': media,
+        'seed': seed, 'seconds': round(time.perf_counter() - started, 2)
+    }
+
+
+def sample_urls(app, seed=42, limit=200):
+    """
+    Lấy slug/danh mục/từ khóa thật từ database để dựng URL cho load test
+    Returns: dict categories, product_slugs, blog_slugs, keywords
+    """
+    from app.models import Category, Product, Blog
+
+    rng = random.Random(seed)
+    with app.app_context():
+        categories = [row.id for row in Category.query.with_entities(Category.id)]
+        products = [row.slug for row in Product.query.with_entities(Product.slug).filter_by(is_active=True)]
+        blogs = [row.slug for row in Blog.query.with_entities(Blog.slug).filter_by(is_active=True)]
+
+    return {
+        'categories': categories,
+        'product_slugs': rng.sample(products, min(limit, len(products))),
+        'blog_slugs': rng.sample(blogs, min(limit, len(blogs))),
+        'keywords': [s.split()[-1] for s in SUBJECTS] + [u.split()[0] for u in USES] + ['không-có-kết-quả']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1, help='Hệ số nhân số bản ghi mặc định')
+    for name in DEFAULT_COUNTS:
+        parser.add_argument(f'--{name}', type=int)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = prepare_env()
+    from app import create_app
+
+    counts = scaled_counts(args.scale, **{name: getattr(args, name) for name in DEFAULT_COUNTS})
+    result = generate(create_app(), seed=args.seed, **counts)
+    print(result)
+    print(f"DATABASE_URL={os.environ['DATABASE_URL']}  (thư mục: {workdir})")
+
+
+if __name__ == '__main__':
+    main()
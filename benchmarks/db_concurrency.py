@@ -0,0 +1,140 @@
+"""
+Load test đọc/ghi song song trên database (mô phỏng nhiều worker gunicorn)
+
+Mỗi cấu hình chạy trong process riêng (Config đọc env lúc import):
+- R process đọc danh sách sản phẩm (như /products)
+- W process tăng lượt xem (như /product/<slug>)
+trong `--duration` giây, báo cáo reads/s, writes/s, p95 và số lỗi (vd "database is locked").
+
+Cấu hình mặc định:
+- sqlite-wal:    SQLITE_JOURNAL_MODE=WAL, SQLITE_SYNCHRONOUS=NORMAL (mặc định của app)
+- sqlite-delete: SQLITE_JOURNAL_MODE=DELETE, SQLITE_SYNCHRONOUS=FULL (như trước khi tối ưu)
+- postgres:      chỉ chạy khi có --postgres-url (database trống, bảng sẽ được tạo)
+
+Chạy:  python -m benchmarks.db_concurrency [--readers 4 --writers 2 --duration 5]
+                                           [--postgres-url postgresql://...] [--output db.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT_DIR, init_db, git_revision, dump_result, percentile
+
+
+def worker(role, duration, queue):
+    from app import create_app, db
+    from app.models import Product
+
+    app = create_app()
+    latencies = []
+    errors = 0
+
+    with app.app_context():
+        product_ids = [p.id for p in Product.query.with_entities(Product.id).all()]
+        db.session.remove()
+        deadline = time.perf_counter() + duration
+
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                if role == 'read':
+                    Product.query.filter_by(is_active=True).order_by(
+                        Product.created_at.desc()).limit(12).all()
+                    db.session.rollback()
+                else:
+                    Product.query.filter_by(id=random.choice(product_ids)).update(
+                        {Product.views: Product.views + 1}, synchronize_session=False)
+                    db.session.commit()
+                latencies.append(time.perf_counter() - t0)
+            except Exception:
+                db.session.rollback()
+                errors += 1
+
+    queue.put((role, latencies, errors))
+
+
+def child(readers, writers, duration):
+    from app import create_app
+    init_db(create_app())
+
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=('read', duration, queue)) for _ in range(readers)]
+    procs += [ctx.Process(target=worker, args=('write', duration, queue)) for _ in range(writers)]
+    for p in procs:
+        p.start()
+
+    results = {'read': ([], 0), 'write': ([], 0)}
+    for _ in procs:
+        role, latencies, errors = queue.get()
+        results[role] = (results[role][0] + latencies, results[role][1] + errors)
+    for p in procs:
+        p.join()
+
+    summary = {}
+    for role, (latencies, errors) in results.items():
+        summary[role] = {
+            'ops_per_sec': round(len(latencies) / duration, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'errors': errors
+        }
+    print(json.dumps(summary))
+
+
+def run_config(env_overrides, args):
+    env = dict(os.environ, TEMPLATE_CACHE_DIR='', **env_overrides)
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'benchmarks.db_concurrency', '--child',
+         '--readers', str(args.readers), '--writers', str(args.writers),
+         '--duration', str(args.duration)],
+        cwd=ROOT_DIR, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('--postgres-url')
+    parser.add_argument('--output')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.readers, args.writers, args.duration)
+
+    configs = {
+        'sqlite-wal': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL'},
+        'sqlite-delete': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL'},
+    }
+    if args.postgres_url:
+        configs['postgres'] = {'DATABASE_URL': args.postgres_url}
+
+    result = {'revision': git_revision(), 'readers': args.readers, 'writers': args.writers,
+              'duration': args.duration, 'configs': {}}
+
+    for name, overrides in configs.items():
+        workdir = None
+        if 'DATABASE_URL' not in overrides:
+            workdir = tempfile.mkdtemp(prefix='ubvn-bench-')
+            overrides = dict(overrides, DATABASE_URL='sqlite:///' + os.path.join(workdir, 'bench.db'))
+        try:
+            result['configs'][name] = run_config(overrides, args)
+        finally:
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    dump_result(result, args.output)
+
+
+if __name__ == '__main__':
+    main()
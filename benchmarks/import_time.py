@@ -0,0 +1,80 @@
+"""
+Benchmark thời gian import lúc khởi động app (python -X importtime)
+
+Với mỗi ADMIN_MODE (eager / lazy / off), chạy một process mới:
+    python -X importtime -c "from app import create_app; create_app()"
+rồi tổng hợp thời gian import, các module nặng nhất và RSS của process.
+
+Chạy:  python -m benchmarks.import_time [--top 15] [--output import_time.json]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+from benchmarks.common import ROOT_DIR, prepare_env, git_revision, dump_result
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+# Các module nên được load lazy trên worker public
+WATCHED = ['cloudinary', 'PIL', 'app.admin.routes', 'app.seo_config']
+
+CHILD_CODE = (
+    "from app import create_app; app = create_app(); "
+    "print([l for l in open('/proc/self/status') if l.startswith('VmRSS')][0].split()[1])"
+)
+
+
+def profile(admin_mode, top):
+    env = dict(os.environ, ADMIN_MODE=admin_mode)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD_CODE],
+                          cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True)
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                'module': name,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000
+            })
+
+    loaded = {m['module'] for m in modules}
+
+    # Thời gian import của từng package gốc (flask_sqlalchemy, flask_migrate, ...) và module app.*
+    packages = {}
+    for m in modules:
+        name = m['module']
+        if ('.' not in name and name != 'app') or (name.startswith('app.') and name.count('.') <= 2):
+            packages[name] = max(packages.get(name, 0), m['cumulative_ms'])
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        'total_import_ms': round(sum(m['self_ms'] for m in modules), 1),
+        'modules_imported': len(modules),
+        'rss_kb': int(proc.stdout.strip().splitlines()[-1]),
+        'watched_loaded': {name: name in loaded for name in WATCHED},
+        'heaviest': [{'module': name, 'cumulative_ms': round(ms, 1)} for name, ms in heaviest]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    prepare_env()
+
+    result = {'revision': git_revision(), 'modes': {}}
+    for mode in ('eager', 'lazy', 'off'):
+        result['modes'][mode] = profile(mode, args.top)
+
+    dump_result(result, args.output)
+
+
+if __name__ == '__main__':
+    main()
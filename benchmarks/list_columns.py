@@ -0,0 +1,182 @@
+"""
+Kiểm tra cột được SELECT trên các trang danh sách + đo tốc độ / bộ nhớ của /blog
+
+- Gọi từng route danh sách qua test client, ghi lại mọi câu SQL đã chạy
+- ✗ nếu câu SELECT nào lấy cột nặng (blogs.content, products.description, products.images),
+  kể cả câu lazy-load phát sinh khi template đọc cột bị defer.
+  substr(blogs.content, ...) của Blog.content_preview được phép (xem app/query_profiles.py)
+- Chạy với ORM_RAISE_ON_LAZY_LOAD=1: lazy-load relationship (N+1) -> route trả 500 -> ✗.
+  Trang chi tiết (DETAIL_ROUTES) cũng được gọi để bắt lazy-load, nhưng không kiểm tra cột nặng
+- Đo req/s và peak bộ nhớ mỗi request (tracemalloc) của /blog với bài viết CONTENT_KB KB,
+  một nửa số bài không có excerpt
+
+Chạy:
+    python -m benchmarks.list_columns                        # exit 1 nếu route nào lấy cột nặng
+    python -m benchmarks.list_columns --content-kb 200 --output list_columns.json
+"""
+import argparse
+import re
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import prepare_env, git_revision, dump_result
+
+HEAVY_COLUMNS = ['blogs.content', 'products.description', 'products.images']
+
+LIST_ROUTES = [
+    '/',
+    '/blog',
+    '/blog?page=2',
+    '/products',
+    '/search?q=c%C3%A1t',
+    '/admin/products',
+    '/admin/blogs',
+    '/admin/categories',
+]
+
+# Trang chi tiết: được lấy cột nặng, chỉ kiểm tra không lazy-load (slug lấy từ dữ liệu mẫu)
+DETAIL_ROUTES = [
+    '/product/{product}',
+    '/blog/{blog}',
+]
+
+_SUBSTR = re.compile(r'substr\([^)]*\)', re.IGNORECASE)
+_FROM = re.compile(r'\sFROM\s', re.IGNORECASE)
+_HEAVY = [(column, re.compile(r'\b' + re.escape(column) + r'\b')) for column in HEAVY_COLUMNS]
+
+
+def heavy_columns(statement):
+    """Các cột nặng trong phần SELECT ... FROM của 1 câu SQL"""
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return []
+    match = _FROM.search(statement)
+    select_list = _SUBSTR.sub('', statement[:match.start()] if match else statement)
+    return [column for column, pattern in _HEAVY if pattern.search(select_list)]
+
+
+def setup(app, content_kb, blogs):
+    """Dữ liệu mẫu (datagen) + content bài viết cỡ content_kb KB, nửa số bài bỏ excerpt"""
+    from app import db
+    from app.models import User, Blog, Product
+    from benchmarks.datagen import generate
+
+    generate(app, products=200, blogs=blogs, media=20)
+    with app.app_context():
+        filler = '<p>' + 'Cát sấy là vật liệu quan trọng trong xây dựng và công nghiệp. ' * 16 + '</p>\n'
+        content = filler * max(1, content_kb * 1024 // len(filler.encode('utf-8')))
+        ids = [row[0] for row in db.session.query(Blog.id)]
+        db.session.bulk_update_mappings(Blog, [
+            {'id': blog_id, 'content': content, 'excerpt': None if blog_id % 2 else 'Tóm tắt bài viết.'}
+            for blog_id in ids
+        ])
+        admin = User.query.filter_by(username='bench-admin').first()
+        if admin is None:
+            admin = User(username='bench-admin', email='bench@example.com', is_admin=True)
+            admin.set_password('bench')
+            db.session.add(admin)
+        db.session.commit()
+        slugs = {
+            'product': db.session.query(Product.slug).filter_by(is_active=True).order_by(Product.id).first()[0],
+            'blog': db.session.query(Blog.slug).filter_by(is_active=True).order_by(Blog.id).first()[0],
+        }
+        return admin.id, slugs
+
+
+def check_routes(app, client, routes):
+    """
+    Mỗi route gọi 1 lần làm nóng (cache, counter lần đầu commit làm expire object...) rồi mới ghi SQL
+    routes: [(route, có kiểm tra cột nặng không)]
+    Returns: {route: {'status', 'queries', 'heavy': [(cột, câu SQL)]}}
+    """
+    from sqlalchemy import event
+    from app import db
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        result = {}
+        for route, check_columns in routes:
+            client.get(route)
+            statements.clear()
+            status = client.get(route).status_code
+            heavy = [(column, statement[:160]) for statement in statements
+                     for column in heavy_columns(statement)] if check_columns else []
+            result[route] = {'status': status, 'queries': len(statements), 'heavy': heavy}
+        return result
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def measure(client, route, requests):
+    """req/s và peak bộ nhớ trung bình mỗi request"""
+    client.get(route)
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(route)
+    seconds = time.perf_counter() - started
+
+    peaks = []
+    for _ in range(min(requests, 10)):
+        tracemalloc.start()
+        response = client.get(route)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        'requests_per_sec': round(requests / seconds, 1),
+        'peak_bytes_per_request': int(sum(peaks) / len(peaks)),
+        'response_bytes': len(response.data),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--content-kb', type=int, default=100, help='Kích thước content mỗi bài viết (KB)')
+    parser.add_argument('--blogs', type=int, default=60)
+    parser.add_argument('--requests', type=int, default=50, help='Số request khi đo /blog')
+    parser.add_argument('--workdir')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    prepare_env(args.workdir, ADMIN_MODE='eager', METRICS_ENABLED='0', ORM_RAISE_ON_LAZY_LOAD='1')
+    from app import create_app
+
+    app = create_app()
+    user_id, slugs = setup(app, args.content_kb, args.blogs)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    routes = check_routes(app, client, [(route, True) for route in LIST_ROUTES]
+                          + [(route.format(**slugs), False) for route in DETAIL_ROUTES])
+    result = {
+        'benchmark': 'list_columns',
+        'revision': git_revision(),
+        'content_kb': args.content_kb,
+        'routes': {route: {'status': info['status'], 'queries': info['queries'],
+                           'heavy_columns': sorted({column for column, _ in info['heavy']})}
+                   for route, info in routes.items()},
+        'blog_list': measure(client, '/blog', args.requests),
+    }
+    dump_result(result, args.output)
+
+    failures = [(route, column, sql) for route, info in routes.items() for column, sql in info['heavy']]
+    failures += [(route, f"HTTP {info['status']}", '') for route, info in routes.items() if info['status'] != 200]
+    if failures:
+        print('\nRoute lấy cột nặng / lỗi (500: thường là lazy-load, xem log):', file=sys.stderr)
+        for route, column, sql in failures:
+            print(f'  ✗ {route}: {column}  {sql}', file=sys.stderr)
+        raise SystemExit(1)
+    print('\n✓ Trang danh sách không lấy cột nặng, không route nào lazy-load', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+Load test các trang public: /, /products (lọc + sắp xếp), /product/<slug>, /blog, /search
+
+2 chế độ:
+- client:   Flask test client trong cùng process (không tính network, đo thuần app + DB)
+- gunicorn: chạy gunicorn local (gunicorn.conf.py) và bắn request song song qua HTTP keep-alive
+
+Dữ liệu sinh bằng benchmarks/datagen.py với seed cố định, danh sách URL cũng sinh từ seed
+nên kết quả giữa các commit so sánh được. Kết quả (RPS, p50/p90/p95/p99 theo route) xuất ra JSON.
+
+Chạy:
+    python -m benchmarks.load_test --mode client --requests 2000 --output before.json
+    python -m benchmarks.load_test --mode gunicorn --workers 4 --concurrency 16 --scale 10
+    python -m benchmarks.load_test --mode client --compare before.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.common import ROOT_DIR, prepare_env, git_revision, percentile, dump_result
+from benchmarks.datagen import generate, sample_urls, scaled_counts
+
+# Tỉ lệ request theo route (gần với traffic thật: chi tiết sản phẩm nhiều nhất)
+ROUTE_WEIGHTS = {
+    'index': 15,
+    'products': 25,
+    'product_detail': 30,
+    'blog': 15,
+    'search': 15,
+}
+SORTS = ['latest', 'price_asc', 'price_desc', 'popular']
+
+
+def build_plan(urls, total, seed=42):
+    """Danh sách (route, path) cố định theo seed"""
+    rng = random.Random(seed)
+    routes = list(ROUTE_WEIGHTS)
+    weights = [ROUTE_WEIGHTS[r] for r in routes]
+    plan = []
+
+    for route in rng.choices(routes, weights=weights, k=total):
+        if route == 'index':
+            path = '/'
+        elif route == 'products':
+            params = [f'sort={rng.choice(SORTS)}']
+            if rng.random() < 0.5:
+                params.append(f"category={rng.choice(urls['categories'])}")
+            if rng.random() < 0.2:
+                params.append(f"search={rng.choice(urls['keywords'])}")
+            if rng.random() < 0.3:
+                params.append(f'page={rng.randint(2, 5)}')
+            path = '/products?' + '&'.join(params)
+        elif route == 'product_detail':
+            path = f"/product/{rng.choice(urls['product_slugs'])}"
+        elif route == 'blog':
+            path = '/blog' if rng.random() < 0.7 else f'/blog?page={rng.randint(2, 4)}'
+        else:
+            path = f"/search?q={rng.choice(urls['keywords'])}"
+        plan.append((route, path))
+
+    return plan
+
+
+def quote_path(path):
+    from urllib.parse import quote
+    return quote(path, safe='/?=&')
+
+
+# ==================== CHẾ ĐỘ TEST CLIENT ====================
+def run_client(app, plan, warmup):
+    client = app.test_client()
+    for _, path in plan[:warmup]:
+        client.get(path)
+
+    samples = []
+    started = time.perf_counter()
+    for route, path in plan:
+        t0 = time.perf_counter()
+        response = client.get(path)
+        response.get_data()
+        samples.append((route, time.perf_counter() - t0, response.status_code))
+    return samples, time.perf_counter() - started
+
+
+# ==================== CHẾ ĐỘ GUNICORN ====================
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/faq')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn không khởi động được')
+
+
+def run_gunicorn(plan, warmup, workers, concurrency):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port))
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                             '--bind', f'127.0.0.1:{port}', 'run:app'],
+                            cwd=ROOT_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        _drive(port, plan[:warmup], concurrency)
+        started = time.perf_counter()
+        samples = _drive(port, plan, concurrency)
+        elapsed = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return samples, elapsed
+
+
+def _drive(port, plan, concurrency):
+    """Chia plan cho N thread, mỗi thread giữ 1 kết nối keep-alive (tự kết nối lại nếu bị đóng)"""
+    samples = []
+    lock = threading.Lock()
+    cursor = iter(plan)
+
+    def worker():
+        conn = None
+        local = []
+        while True:
+            with lock:
+                item = next(cursor, None)
+            if item is None:
+                break
+            route, path = item
+            t0 = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                conn.request('GET', quote_path(path))
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                status = 0
+                if conn is not None:
+                    conn.close()
+                conn = None
+            local.append((route, time.perf_counter() - t0, status))
+        if conn is not None:
+            conn.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+# ==================== TỔNG HỢP ====================
+def summarize(samples, elapsed):
+    def stats(items, seconds):
+        latencies = [s[1] * 1000 for s in items]
+        errors = sum(1 for s in items if s[2] == 0 or s[2] >= 400)
+        return {
+            'requests': len(items),
+            'errors': errors,
+            'rps': round(len(items) / seconds, 1) if seconds else 0,
+            'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p90_ms': round(percentile(latencies, 90), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+        }
+
+    by_route = defaultdict(list)
+    for sample in samples:
+        by_route[sample[0]].append(sample)
+
+    # RPS theo route: số request của route / tổng thời gian chạy (cộng lại = RPS tổng)
+    return {
+        'overall': stats(samples, elapsed),
+        'routes': {route: stats(items, elapsed) for route, items in sorted(by_route.items())}
+    }
+
+
+def compare(result, baseline_path):
+    """In chênh lệch RPS và p95 so với file kết quả trước đó"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    def delta(new, old):
+        return f'{(new - old) / old * 100:+.1f}%' if old else 'n/a'
+
+    print(f"\nSo sánh với {baseline_path} (commit {baseline.get('revision')}):", file=sys.stderr)
+    print(f"{'route':<16}{'rps':>10}{'Δ rps':>10}{'p95 ms':>10}{'Δ p95':>10}", file=sys.stderr)
+    rows = [('overall', result['overall'], baseline.get('overall', {}))]
+    rows += [(name, stats, baseline.get('routes', {}).get(name, {}))
+             for name, stats in result['routes'].items()]
+    for name, new, old in rows:
+        print(f"{name:<16}{new['rps']:>10}{delta(new['rps'], old.get('rps', 0)):>10}"
+              f"{new['p95_ms']:>10}{delta(new['p95_ms'], old.get('p95_ms', 0)):>10}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['client', 'gunicorn'], default='client')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=2, help='Số worker gunicorn')
+    parser.add_argument('--concurrency', type=int, default=8, help='Số kết nối song song (gunicorn)')
+    parser.add_argument('--scale', type=float, default=1, help='Hệ số dữ liệu (xem benchmarks/datagen.py)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', help='Dùng lại thư mục dữ liệu có sẵn (bỏ qua bước sinh dữ liệu nếu đã có)')
+    parser.add_argument('--output')
+    parser.add_argument('--compare', help='File JSON kết quả trước đó để so sánh')
+    args = parser.parse_args()
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+    prepare_env(args.workdir)
+
+    from app import create_app
+    app = create_app()
+    counts = scaled_counts(args.scale)
+    data = generate(app, seed=args.seed, **counts)
+    urls = sample_urls(app, seed=args.seed)
+    plan = build_plan(urls, args.requests, seed=args.seed)
+    warmup = min(args.warmup, len(plan))
+
+    if args.mode == 'client':
+        samples, elapsed = run_client(app, plan, warmup)
+    else:
+        samples, elapsed = run_gunicorn(plan, warmup, args.workers, args.concurrency)
+
+    result = {
+        'benchmark': 'load_test',
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'mode': args.mode,
+        'workers': args.workers if args.mode == 'gunicorn' else 1,
+        'concurrency': args.concurrency if args.mode == 'gunicorn' else 1,
+        'seed': args.seed,
+        'dataset': counts if not data.get('skipped') else {'reused': args.workdir},
+        'seconds': round(elapsed, 2),
+        **summarize(samples, elapsed)
+    }
+    dump_result(result, args.output)
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Microbenchmark các hàm CPU thuần trên trang admin
+
+- calculate_seo_score (Media), calculate_blog_seo_score (Blog)
+- slugify, validate_seo_alt_text, Blog.calculate_reading_time
+
+Corpus cố định: alt text ngắn, bài viết HTML 200 từ và 5.000 từ (sinh từ seed cố định).
+Mỗi case đo ops/giây (lấy round tốt nhất, giống pytest-benchmark) và bộ nhớ cấp phát
+mỗi lần gọi (tracemalloc: peak và phần còn giữ lại sau khi gọi).
+
+Blog không gắn ảnh để không phát sinh query (get_media_seo_info) - chỉ đo phần CPU.
+
+Chạy:
+    python -m benchmarks.micro --save micro_baseline.json        # trên commit gốc
+    python -m benchmarks.micro --compare micro_baseline.json     # exit 1 nếu chậm/tốn bộ nhớ hơn ngưỡng
+    python -m benchmarks.micro --compare micro_baseline.json --threshold 0.15 --filter slugify
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import git_revision, dump_result
+from benchmarks.datagen import TextGenerator
+
+ALT_TEXTS = [
+    'Cát sấy',
+    'Cát sấy khô chất lượng cao cho xây dựng',
+    'Cát thạch anh lọc nước đạt chuẩn, hạt đều, độ sạch cao - giao hàng toàn quốc',
+    'ảnh 123 click here',
+    'Máy lọc nước A.O.Smith chính hãng, lõi RO, bảo hành 5 năm, lắp đặt miễn phí tại Hà Nội '
+    'và TP. Hồ Chí Minh cho mọi đơn hàng',
+]
+
+TITLES = [
+    'Máy lọc nước A.O.Smith',
+    'Cát Sấy Số 1 - Loại 1 (0.15mm - 0.3mm)',
+    'Ứng dụng cát thạch anh trong ngành đúc kim loại tại Đà Nẵng',
+    'ĐẶC ĐIỂM & ƯU ĐIỂM CỦA CÁT SẤY KHÔ!!!',
+]
+
+
+def html_corpus(words, seed=2024):
+    """Bài viết HTML có đúng `words` từ (đoạn văn + tiêu đề h2/h3 + link nội bộ)"""
+    text = TextGenerator(random.Random(seed))
+    parts, count, i = [], 0, 0
+    while count < words:
+        if i and i % 4 == 0:
+            parts.append(f'<h2>Cát sấy cho {text.rng.choice(["xây dựng", "lọc nước", "đúc"])}</h2>')
+            count += 4
+        sentence_words = text.paragraph(4).split()[:words - count]
+        if i % 5 == 2:
+            sentence_words.append('<a href="/products">cát sấy</a>')
+        parts.append(f'<p>{" ".join(sentence_words)}</p>')
+        count += len(sentence_words)
+        i += 1
+    return '\n'.join(parts)
+
+
+def build_cases():
+    """Danh sách (tên, hàm không tham số) cần đo"""
+    from app.models import Media, Blog
+    from app.utils import slugify, validate_seo_alt_text
+    from app.admin.routes import calculate_seo_score, calculate_blog_seo_score
+
+    html_200 = html_corpus(200)
+    html_5000 = html_corpus(5000)
+
+    def make_blog(content):
+        return Blog(
+            title='Cát sấy khô là gì? Ứng dụng của cát sấy trong xây dựng',
+            slug='cat-say-kho-la-gi',
+            meta_description='Cát sấy khô được dùng trong vữa khô, keo dán gạch, lọc nước. '
+                             'Tìm hiểu đặc điểm, ứng dụng và bảng giá cát sấy mới nhất.',
+            focus_keyword='cát sấy',
+            excerpt='Tổng quan về cát sấy khô và ứng dụng.',
+            content=content
+        )
+
+    media_good = Media(filename='cat-say.jpg', filepath='/static/uploads/cat-say.jpg',
+                       alt_text=ALT_TEXTS[2], title='Cát thạch anh lọc nước',
+                       caption='Cát thạch anh lọc nước đạt chuẩn')
+    media_empty = Media(filename='IMG_0001.jpg', filepath='/static/uploads/IMG_0001.jpg')
+    blog_200 = make_blog(html_200)
+    blog_5000 = make_blog(html_5000)
+
+    return [
+        ('slugify/titles', lambda: [slugify(t) for t in TITLES]),
+        ('slugify/200w', lambda: slugify(html_200)),
+        ('validate_seo_alt_text/alt_texts', lambda: [validate_seo_alt_text(a) for a in ALT_TEXTS]),
+        ('calculate_seo_score/good', lambda: calculate_seo_score(media_good)),
+        ('calculate_seo_score/empty', lambda: calculate_seo_score(media_empty)),
+        ('calculate_blog_seo_score/200w', lambda: calculate_blog_seo_score(blog_200)),
+        ('calculate_blog_seo_score/5000w', lambda: calculate_blog_seo_score(blog_5000)),
+        ('calculate_reading_time/200w', blog_200.calculate_reading_time),
+        ('calculate_reading_time/5000w', blog_5000.calculate_reading_time),
+    ]
+
+
+def measure(func, rounds=5, min_time=0.2):
+    """
+    Đo 1 case
+    Returns: ops/giây (round tốt nhất), thời gian mỗi lần gọi, peak bộ nhớ và bộ nhớ còn giữ lại mỗi lần gọi
+    """
+    # Hiệu chỉnh số lần lặp để mỗi round chạy khoảng min_time
+    iterations = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time / 10:
+            break
+        iterations *= 10
+    iterations = max(1, int(iterations * (min_time / max(elapsed, 1e-9))))
+
+    best = float('inf')
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, (time.perf_counter() - t0) / iterations)
+
+    # Bộ nhớ: đo riêng (tracemalloc làm chậm nên không đo chung với thời gian)
+    func()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'ops_per_sec': round(1 / best, 1),
+        'us_per_op': round(best * 1e6, 2),
+        'peak_alloc_bytes': peak - base,
+        'retained_bytes': current - base,
+        'iterations': iterations,
+    }
+
+
+def check_regressions(result, baseline, threshold):
+    """So với baseline: chậm hơn hoặc tốn bộ nhớ hơn quá ngưỡng -> lỗi"""
+    failures = []
+    print(f"\n{'case':<36}{'ops/s':>12}{'Δ ops/s':>10}{'peak B':>10}{'Δ peak':>10}", file=sys.stderr)
+    for name, new in result['cases'].items():
+        old = baseline.get('cases', {}).get(name)
+        if not old:
+            print(f'{name:<36}{new["ops_per_sec"]:>12}{"mới":>10}', file=sys.stderr)
+            continue
+
+        speed = new['ops_per_sec'] / old['ops_per_sec'] - 1
+        memory = (new['peak_alloc_bytes'] - old['peak_alloc_bytes']) / max(old['peak_alloc_bytes'], 1)
+        flag = ''
+        if speed < -threshold:
+            failures.append(f'{name}: ops/s giảm {-speed:.0%}')
+            flag = '  ✗'
+        if memory > threshold and new['peak_alloc_bytes'] - old['peak_alloc_bytes'] > 1024:
+            failures.append(f'{name}: bộ nhớ tăng {memory:.0%}')
+            flag = '  ✗'
+        print(f'{name:<36}{new["ops_per_sec"]:>12}{speed:>+10.1%}'
+              f'{new["peak_alloc_bytes"]:>10}{memory:>+10.1%}{flag}', file=sys.stderr)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='Thời gian tối thiểu mỗi round (giây)')
+    parser.add_argument('--filter', help='Chỉ chạy case có tên chứa chuỗi này')
+    parser.add_argument('--save', help='Ghi kết quả làm baseline')
+    parser.add_argument('--compare', help='File baseline để so sánh')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Ngưỡng regression (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    cases = [(name, func) for name, func in build_cases() if not args.filter or args.filter in name]
+    result = {
+        'benchmark': 'micro',
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'cases': {name: measure(func, args.rounds, args.min_time) for name, func in cases}
+    }
+    dump_result(result, args.save)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        failures = check_regressions(result, baseline, args.threshold)
+        if failures:
+            print('\nRegression vượt ngưỡng:', file=sys.stderr)
+            for failure in failures:
+                print(f'  ✗ {failure}', file=sys.stderr)
+            raise SystemExit(1)
+        print('\n✓ Không có regression vượt ngưỡng', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
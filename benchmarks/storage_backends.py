@@ -0,0 +1,176 @@
+"""
+Kiểm tra vòng đời file trên từng backend storage (app/storage.py) + đo thời gian upload / phục vụ
+
+Mỗi backend: upload N ảnh (một nửa trùng nội dung) -> kiểm tra URL, thumbnail, key_for(url),
+liệt kê (list_files) -> delete_many -> file đã biến mất. Riêng 'local' còn gọi URL qua test client:
+200 + Cache-Control immutable, gửi lại If-None-Match -> 304, đường dẫn ../ -> 404.
+
+- 'local': chạy trên thư mục tạm
+- 's3': cần boto3 + endpoint S3 tương thích, vd MinIO chạy local:
+      docker run -p 9000:9000 minio/minio server /data
+      python -m benchmarks.storage_backends --backend s3 --s3-endpoint http://localhost:9000 \\
+          --s3-bucket ubvn-bench --s3-key minioadmin --s3-secret minioadmin
+  (bucket được tạo nếu chưa có). Thiếu boto3 / endpoint -> bỏ qua, không tính là lỗi
+- 'cloudinary': chỉ chạy khi có CLOUDINARY_* trong môi trường (upload thật, xóa ngay sau đó)
+
+Chạy:
+    python -m benchmarks.storage_backends                    # exit 1 nếu backend nào sai
+    python -m benchmarks.storage_backends --backend local --files 200 --output storage.json
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import prepare_env, git_revision, dump_result
+
+
+def make_images(count, size):
+    """count ảnh JPEG: ảnh thứ i và i + count/2 cùng nội dung (kiểm tra dùng lại file theo nội dung)"""
+    from PIL import Image
+
+    images = []
+    unique = max(1, count // 2)
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.new('RGB', (size, size), ((i % unique) * 37 % 256, 90, 160)).save(buffer, format='JPEG')
+        images.append((f'anh-{i}.jpg', buffer.getvalue()))
+    return images
+
+
+def check_backend(app, backend, images):
+    """Returns: (kết quả đo, list lỗi)"""
+    errors = []
+    started = time.perf_counter()
+    stored = [backend.save(data, 'enterprise/bench', name) for name, data in images]
+    upload_seconds = time.perf_counter() - started
+
+    for (name, data), item in zip(images, stored):
+        if backend.key_for(item.url) != item.key:
+            errors.append(f'key_for({item.url}) != {item.key}')
+        if item.size != len(data) or not item.width:
+            errors.append(f'{name}: size/width sai ({item.size}, {item.width})')
+    keys = list(dict.fromkeys(item.key for item in stored))
+
+    listed = backend.list_files(datetime.utcnow() + timedelta(minutes=1))
+    missing = [key for key in keys if key not in listed]
+    if missing:
+        errors.append(f'list_files thiếu {len(missing)} file')
+
+    serve = {'thumbnail_url': backend.thumbnail_url(stored[0].url, 300)}
+    if backend.name == 'local':
+        serve.update(check_local_serving(app, backend, stored[0], errors))
+
+    started = time.perf_counter()
+    failed = backend.delete_many(keys)
+    delete_seconds = time.perf_counter() - started
+    if failed:
+        errors.append(f'delete_many lỗi {len(failed)} file')
+    leftover = [key for key in keys if key in backend.list_files(datetime.utcnow() + timedelta(minutes=1))]
+    if leftover:
+        errors.append(f'còn {len(leftover)} file sau khi xóa')
+
+    return {
+        'files': len(images),
+        'unique_files': len(keys),
+        'upload_ms_per_file': round(upload_seconds * 1000 / len(images), 2),
+        'delete_ms_total': round(delete_seconds * 1000, 2),
+        **serve,
+    }, errors
+
+
+def check_local_serving(app, backend, item, errors):
+    client = app.test_client()
+    started = time.perf_counter()
+    response = client.get(item.url)
+    serve_ms = (time.perf_counter() - started) * 1000
+    if response.status_code != 200 or 'immutable' not in response.headers.get('Cache-Control', ''):
+        errors.append(f'GET {item.url}: {response.status_code} {response.headers.get("Cache-Control")}')
+    etag = response.headers.get('ETag')
+    if not etag or client.get(item.url, headers={'If-None-Match': etag}).status_code != 304:
+        errors.append('If-None-Match không trả 304')
+    thumb = backend.thumbnail_url(item.url, 300)
+    if thumb == item.url or client.get(thumb).status_code != 200:
+        errors.append(f'thumbnail không phục vụ được: {thumb}')
+    if client.get(backend.url_prefix + '../../config.py').status_code != 404:
+        errors.append('đường dẫn ../ không bị chặn')
+    return {'serve_ms': round(serve_ms, 2), 'cache_control': response.headers.get('Cache-Control')}
+
+
+def s3_backend(app, args):
+    """S3Storage trỏ tới endpoint (MinIO), None nếu thiếu boto3 / endpoint"""
+    from app.storage import S3Storage
+
+    if not args.s3_endpoint:
+        return None, 'chưa có --s3-endpoint'
+    try:
+        import boto3  # noqa: F401
+    except ImportError:
+        return None, 'chưa cài boto3'
+
+    config = dict(app.config, S3_BUCKET=args.s3_bucket, S3_ENDPOINT_URL=args.s3_endpoint,
+                  S3_ACCESS_KEY_ID=args.s3_key, S3_SECRET_ACCESS_KEY=args.s3_secret,
+                  S3_REGION='us-east-1', S3_PREFIX=f'bench-{int(time.time())}/', S3_PUBLIC_URL=None)
+    backend = S3Storage(config)
+    try:
+        backend.client.head_bucket(Bucket=args.s3_bucket)
+    except Exception:
+        backend.client.create_bucket(Bucket=args.s3_bucket)
+    return backend, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', action='append', choices=['local', 's3', 'cloudinary'],
+                        help='Backend cần kiểm tra (mặc định: local, s3, cloudinary nếu có cấu hình)')
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--size', type=int, default=800, help='Cạnh ảnh mẫu (px)')
+    parser.add_argument('--s3-endpoint', default=os.environ.get('S3_ENDPOINT_URL'))
+    parser.add_argument('--s3-bucket', default=os.environ.get('S3_BUCKET', 'ubvn-bench'))
+    parser.add_argument('--s3-key', default=os.environ.get('S3_ACCESS_KEY_ID', 'minioadmin'))
+    parser.add_argument('--s3-secret', default=os.environ.get('S3_SECRET_ACCESS_KEY', 'minioadmin'))
+    parser.add_argument('--workdir')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ubvn-bench-')
+    prepare_env(workdir, METRICS_ENABLED='0', STORAGE_LOCAL_DIR=os.path.join(workdir, 'files'))
+    from app import create_app
+    from app.storage import get_backend
+
+    app = create_app()
+    images = make_images(args.files, args.size)
+    names = args.backend or ['local', 's3', 'cloudinary']
+
+    result = {'benchmark': 'storage_backends', 'revision': git_revision(), 'backends': {}}
+    failures = []
+    with app.app_context():
+        for name in names:
+            if name == 's3':
+                backend, reason = s3_backend(app, args)
+            elif name == 'cloudinary' and not app.config.get('CLOUDINARY_CLOUD_NAME'):
+                backend, reason = None, 'chưa cấu hình CLOUDINARY_*'
+            else:
+                backend, reason = get_backend(name), None
+
+            if backend is None:
+                result['backends'][name] = {'skipped': reason}
+                continue
+            measured, errors = check_backend(app, backend, images)
+            result['backends'][name] = dict(measured, errors=errors)
+            failures += [(name, error) for error in errors]
+
+    dump_result(result, args.output)
+    if failures:
+        print('\nBackend sai:', file=sys.stderr)
+        for name, error in failures:
+            print(f'  ✗ {name}: {error}', file=sys.stderr)
+        raise SystemExit(1)
+    print('\n✓ Các backend đã kiểm tra đều đúng', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
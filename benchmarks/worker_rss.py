@@ -0,0 +1,118 @@
+"""
+Benchmark bộ nhớ mỗi worker gunicorn: có và không có preload
+
+Khởi động gunicorn (gunicorn.conf.py) với WEB_CONCURRENCY worker, gửi vài request
+tới các trang public để worker load đủ templates/dữ liệu, rồi đọc
+/proc/<pid>/smaps_rollup của từng worker:
+- rss_kb:     bộ nhớ thường trú (tính cả phần dùng chung)
+- pss_kb:     phần dùng chung được chia đều cho các process
+- private_kb: phần riêng của worker (USS) - đây là chi phí thật của mỗi worker thêm vào
+
+Chạy (chỉ Linux):  python -m benchmarks.worker_rss [--workers 4] [--output worker_rss.json]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.common import ROOT_DIR, prepare_env, init_db, git_revision, dump_result
+
+PAGES = ['/', '/products', '/product/cat-say-loai-1', '/blog', '/faq', '/contact']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def read_memory(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_kb': fields.get('Rss', 0),
+        'pss_kb': fields.get('Pss', 0),
+        'private_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+
+def child_pids(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/faq', timeout=2).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn không khởi động được')
+
+
+def measure(preload, workers, rounds):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0',
+               WEB_CONCURRENCY=str(workers), PORT=str(port))
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                             '--bind', f'127.0.0.1:{port}', 'run:app'],
+                            cwd=ROOT_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        wait_ready(base_url)
+
+        # Mỗi worker nhận được vài request (gunicorn phân phối ngẫu nhiên)
+        for _ in range(rounds * workers):
+            for page in PAGES:
+                urllib.request.urlopen(base_url + page, timeout=10).read()
+
+        pids = child_pids(proc.pid)
+        per_worker = [read_memory(pid) for pid in pids]
+        master = read_memory(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    def avg(key):
+        return round(sum(w[key] for w in per_worker) / len(per_worker)) if per_worker else 0
+
+    return {
+        'workers': len(per_worker),
+        'master': master,
+        'avg_worker': {key: avg(key) for key in ('rss_kb', 'pss_kb', 'private_kb')},
+        'total_pss_kb': master['pss_kb'] + sum(w['pss_kb'] for w in per_worker),
+        'per_worker': per_worker
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    prepare_env()
+    from app import create_app
+    init_db(create_app())
+
+    result = {
+        'revision': git_revision(),
+        'no_preload': measure(False, args.workers, args.rounds),
+        'preload': measure(True, args.workers, args.rounds)
+    }
+    dump_result(result, args.output)
+
+
+if __name__ == '__main__':
+    main()
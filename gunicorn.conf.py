@@ -0,0 +1,68 @@
+"""
+Cấu hình gunicorn (tự động được đọc khi chạy: gunicorn run:app)
+
+Mặc định bật preload: app được tạo 1 lần trong master, warm sẵn templates,
+matcher SEO và danh mục, sau đó fork ra các worker dùng chung bộ nhớ (copy-on-write).
+Tắt bằng GUNICORN_PRELOAD=0.
+
+Mỗi worker chạy 1 thread nền xử lý hàng đợi công việc (app/jobs.py, JOBS_RUNNER_INTERVAL=0 để tắt):
+xóa ảnh, đồng bộ lại Cloudinary, import ảnh, build sitemap. Hàng đợi nằm trên đĩa của instance web.
+
+Metrics của các worker được ghi vào PROMETHEUS_MULTIPROC_DIR và gộp lại ở /metrics.
+
+Chạy sau proxy của Render: TRUSTED_PROXIES mặc định 1 (IP thật của khách lấy từ X-Forwarded-For,
+dùng cho giới hạn form liên hệ theo IP). Chạy gunicorn trực tiếp ra internet thì đặt TRUSTED_PROXIES=0,
+sau 2 tầng proxy (CDN + Render) thì đặt 2.
+"""
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Phải đặt trước khi load app (Config đọc biến môi trường lúc import)
+os.environ.setdefault('TRUSTED_PROXIES', '1')
+
+# Thư mục chia sẻ metrics giữa các worker: phải có (và sạch) trước khi load app
+prometheus_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'ubvn-prometheus')
+)
+shutil.rmtree(prometheus_dir, ignore_errors=True)
+os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def _flask_app(server):
+    """Lấy Flask app đã load trong master (chỉ có khi preload_app)"""
+    return server.app.wsgi()
+
+
+def when_ready(server):
+    if preload_app:
+        from app.warmup import warm_shared_state
+        result = warm_shared_state(_flask_app(server))
+        server.log.info("Warmed %d templates in %.2fs", result['compiled'], result['seconds'])
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        from app.warmup import prepare_for_fork
+        prepare_for_fork(_flask_app(server))
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app.warmup import after_fork
+        after_fork(_flask_app(server))
+
+
+def post_worker_init(worker):
+    from app.jobs import start_runner
+    start_runner(worker.app.wsgi())
+
+
+def child_exit(server, worker):
+    # Bỏ số liệu gauge của worker đã dừng
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)